@@ -0,0 +1,74 @@
+"""
+Per-request overhead and memory growth of the enrichment path over many stubbed requests.
+
+Modes:
+    per-request    new LeadEnrichmentProcessor and Supabase client for every request
+                   (how /enrich-lead used to work)
+    shared         one processor and client for the process, sessions deleted after
+                   each run (current behaviour)
+    shared-leaky   one processor, sessions kept (what sharing costs without deletion)
+
+    python -m benchmarks.bench_api_overhead --requests 10000
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+MODES = ["per-request", "shared", "shared-leaky"]
+
+
+def rss_mib() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+async def run(mode: str, requests: int) -> None:
+    os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+    os.environ.setdefault("SUPABASE_KEY", "header.payload.signature")
+    from benchmarks.fakes import StubLeadAgent
+    from src.config.supebase_config import get_supabase_client
+    from src.utils.lead_enrichment import LeadEnrichmentProcessor
+
+    agent = StubLeadAgent(name="stub_lead_agent", latency=0)
+    processor = LeadEnrichmentProcessor(agent=agent)
+    supabase = get_supabase_client()
+    if mode == "shared-leaky":
+        async def keep_session(**kwargs):
+            return None
+        processor.session_service.delete_session = keep_session
+
+    rss_before = rss_mib()
+    started = time.perf_counter()
+    for i in range(requests):
+        if mode == "per-request":
+            processor = LeadEnrichmentProcessor(agent=agent)
+            supabase = get_supabase_client()
+        await processor.enrich_single_lead(f"Company {i}", f"Person {i}")
+    elapsed = time.perf_counter() - started
+    print(f"{mode:<13} requests={requests:<6} overhead={elapsed / requests * 1e6:8.0f} us/request "
+          f"rss_growth={rss_mib() - rss_before:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--mode", choices=MODES)
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(run(args.mode, args.requests))
+        return
+    # Each mode runs in its own process so RSS growth is not shared between them.
+    for mode in MODES:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_api_overhead", "--mode", mode,
+             "--requests", str(args.requests)],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
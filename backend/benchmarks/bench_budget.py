@@ -0,0 +1,108 @@
+"""
+Usage accounting and spend caps of batch runs (src/utils/cost_accounting.py).
+
+Runs `process_leads_from_supabase` over `--leads` leads with StubLeadAgent, whose
+three calls per lead report `--prompt-tokens`/`--completion-tokens` each, priced as
+gemini-2.0-flash. Three runs are compared:
+
+- no caps: the estimated cost per lead, and whether every lead stored its usage;
+- `--budget` USD: leads enriched, spend and overshoot over the cap, and leads left
+  claimed (they must be handed back for later runs);
+- `--per-hour` USD with the ceiling's window shortened to `--window` seconds: the
+  spend per window actually reached and the time spent waiting.
+
+    python -m benchmarks.bench_budget --leads 200 --budget 0.1 --per-hour 0.05 --window 2
+
+The exit status is 1 when a cap is overshot by more than the runs in flight can
+explain, a lead is left claimed, or the capped run does not stop although the
+leads cost more than `--budget`.
+"""
+import argparse
+import asyncio
+import math
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from benchmarks.fakes import FakeSupabaseClient, StubLeadAgent, seed_leads
+from src.utils.cost_accounting import BatchBudget
+from src.utils.lead_enrichment import LeadEnrichmentProcessor
+from src.utils.rate_limiter import configure_rate_limits
+
+
+async def run(args, budget: Optional[BatchBudget] = None) -> Dict[str, Any]:
+    supabase = FakeSupabaseClient()
+    seed_leads(supabase, args.leads, distinct_companies=args.leads)
+    agent = StubLeadAgent(
+        name="stub_lead_agent", latency=args.latency,
+        prompt_tokens=args.prompt_tokens, completion_tokens=args.completion_tokens,
+    )
+    processor = LeadEnrichmentProcessor(agent=agent)
+    started_at = time.monotonic()
+    summary = await processor.process_leads_from_supabase(
+        max_concurrency=args.concurrency, supabase=supabase, flush_interval=0.5, budget=budget
+    )
+    rows = supabase.tables["leads_table"].rows
+    return {
+        "summary": summary,
+        "seconds": time.monotonic() - started_at,
+        "with_usage": sum(1 for row in rows if row.get("enrichment_usage")),
+        "claimed": sum(1 for row in rows if row.get("claimed_by")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake seconds per lead")
+    parser.add_argument("--prompt-tokens", type=int, default=3000, help="input tokens per fake model call")
+    parser.add_argument("--completion-tokens", type=int, default=500, help="output tokens per fake model call")
+    parser.add_argument("--budget", type=float, default=0.1, help="USD cap of the capped run")
+    parser.add_argument("--per-hour", type=float, default=0.05, help="USD ceiling per window of the throttled run")
+    parser.add_argument("--window", type=float, default=2.0, help="seconds standing in for the hour")
+    args = parser.parse_args()
+
+    configure_rate_limits({}, default=0)
+    problems = []
+
+    result = asyncio.run(run(args))
+    summary = result["summary"]
+    uncapped_cost = summary["budget"]["cost_usd"]
+    cost_per_lead = uncapped_cost / summary["processed"]
+    print(f"no caps:   {summary['processed']} leads, ${summary['budget']['cost_usd']:.4f} "
+          f"(${cost_per_lead:.6f}/lead, {summary['usage']['model_calls']} model calls, "
+          f"{summary['usage']['input_tokens']} input / {summary['usage']['output_tokens']} output tokens), "
+          f"{result['with_usage']} leads stored their usage")
+    if result["with_usage"] != summary["processed"]:
+        problems.append(f"only {result['with_usage']} of {summary['processed']} leads stored their usage")
+
+    result = asyncio.run(run(args, BatchBudget(max_cost_usd=args.budget)))
+    summary, stats = result["summary"], result["summary"]["budget"]
+    overshoot = stats["cost_usd"] - args.budget
+    print(f"budget:    {summary['processed']} leads, ${stats['cost_usd']:.4f} of ${args.budget:.4f} "
+          f"(overshoot ${max(overshoot, 0):.4f}), stopped: {stats['stopped']}, "
+          f"{summary['skipped']} skipped, {result['claimed']} left claimed")
+    # The run only has to stop when the leads cost more than the cap.
+    if uncapped_cost > args.budget and not stats["stopped"]:
+        problems.append(f"budget run: not stopped although the leads cost ${uncapped_cost:.4f}")
+    if overshoot > args.concurrency * cost_per_lead or result["claimed"]:
+        problems.append(f"budget run: overshoot ${overshoot:.4f}, {result['claimed']} leads left claimed")
+
+    result = asyncio.run(run(args, BatchBudget(max_cost_per_hour=args.per_hour, window_seconds=args.window)))
+    summary, stats = result["summary"], result["summary"]["budget"]
+    # Every window the run started in may hold up to the ceiling.
+    windows = math.ceil(result["seconds"] / args.window)
+    print(f"ceiling:   {summary['processed']} leads, ${stats['cost_usd']:.4f} in {result['seconds']:.1f}s: "
+          f"${stats['cost_usd'] / windows:.4f} per {args.window:g}s window (ceiling ${args.per_hour:.4f}), "
+          f"workers waited {stats['throttled_seconds']:.1f}s")
+    if stats["cost_usd"] / windows > args.per_hour + args.concurrency * cost_per_lead:
+        problems.append("ceiling run: spend rate above the ceiling")
+
+    for problem in problems:
+        print(f"FAILED {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
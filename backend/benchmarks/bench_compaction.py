@@ -0,0 +1,103 @@
+"""
+Structuring prompt size and latency with and without report compaction.
+
+Runs the real StructuringAgent on the sample reports in benchmarks/reports, forced
+onto its LLM path (the local parser would otherwise skip the call for well-formatted
+reports), with FakeGemini as the model. Fake latency is `--base-latency` plus
+`--ms-per-1k-tokens` of prefill per 1k prompt tokens, so it grows with the prompt
+like a real call; `--pad` repeats the report sections to mimic long reports:
+
+    python -m benchmarks.bench_compaction --pad 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from benchmarks.fakes import REPORTS, install_fake_models
+from src.agents.lead_enrich.subagents.structuring_agent import agent as structuring
+from src.utils.metrics import metrics
+from src.utils.report_parser import COMPANY_LABELS, PERSON_LABELS, compact_report
+from src.utils.rate_limiter import configure_rate_limits
+
+
+def prompt_tokens() -> float:
+    counters = metrics.snapshot().get("lead_enrichment_model_tokens_total", {})
+    return sum(v for labels, v in counters.items() if 'agent="StructuringAgent"' in labels and 'type="prompt"' in labels)
+
+
+def pad(report: str, times: int) -> str:
+    """Repeat every sub-bullet and append citations, like a verbose research agent."""
+    lines = []
+    for line in report.splitlines():
+        lines.append(line)
+        if line.startswith("  - "):
+            lines.extend(f"{line} (Source: news archive, accessed August 2025)" for _ in range(times))
+    return "\n".join(lines) + "\n\n### Additional Notes\n" + "- **Recent Activities:** Various public appearances.\n" * times
+
+
+async def structure(runner: Runner, state: dict) -> float:
+    session = await runner.session_service.create_session(app_name="bench", user_id="bench", state=state)
+    started_at = time.perf_counter()
+    async for _ in runner.run_async(
+        user_id="bench", session_id=session.id, new_message=types.Content(role="user", parts=[types.Part(text="Process this lead")])
+    ):
+        pass
+    return time.perf_counter() - started_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pad", type=int, default=0, help="extra copies of each sub-bullet")
+    parser.add_argument("--base-latency", type=float, default=0.4, help="fake seconds per call")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=150.0, help="fake prefill time per 1k prompt tokens")
+    parser.add_argument("--repeat", type=int, default=200, help="compactions timed per sample")
+    args = parser.parse_args()
+
+    configure_rate_limits({}, default=0)
+    install_fake_models(structuring.structuring_agent, latency=args.base_latency)
+    for backend in structuring.structuring_agent.model.backends.values():
+        backend.latency_per_prompt_token = args.ms_per_1k_tokens / 1e6
+    # Force the LLM path for every sample: no parse is trusted.
+    structuring.MIN_LABEL_COVERAGE = 2.0
+    runner = Runner(agent=structuring.structuring_agent, app_name="bench", session_service=InMemorySessionService())
+
+    leads = json.loads((REPORTS / "leads.json").read_text())
+    totals = {"raw": [0.0, 0.0], "compacted": [0.0, 0.0]}
+    print(f"{'sample':<10} {'raw tokens':>10} {'compacted':>10} {'saved':>6} {'raw s':>6} {'compact s':>9} {'us/compact':>10}")
+    for name, lead in leads.items():
+        state = {
+            "company_name": lead["company_name"],
+            "person_name": lead["person_name"],
+            "company_info": pad((REPORTS / f"{name}_company.md").read_text(), args.pad),
+            "person_info": pad((REPORTS / f"{name}_person.md").read_text(), args.pad),
+        }
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            compact_report(state["company_info"], COMPANY_LABELS)
+            compact_report(state["person_info"], PERSON_LABELS)
+        compact_us = (time.perf_counter() - started) / args.repeat * 1e6
+
+        result = {}
+        for mode, enabled in (("raw", "0"), ("compacted", "1")):
+            os.environ["STRUCTURING_COMPACTION"] = enabled
+            before = prompt_tokens()
+            seconds = asyncio.run(structure(runner, dict(state)))
+            result[mode] = (prompt_tokens() - before, seconds)
+            totals[mode][0] += result[mode][0]
+            totals[mode][1] += seconds
+        (raw_tokens, raw_s), (compact_tokens, compact_s) = result["raw"], result["compacted"]
+        print(f"{name:<10} {raw_tokens:>10.0f} {compact_tokens:>10.0f} {1 - compact_tokens / raw_tokens:>6.0%} "
+              f"{raw_s:>6.2f} {compact_s:>9.2f} {compact_us:>10.0f}")
+    (raw_tokens, raw_s), (compact_tokens, compact_s) = totals["raw"], totals["compacted"]
+    print(f"{'total':<10} {raw_tokens:>10.0f} {compact_tokens:>10.0f} {1 - compact_tokens / raw_tokens:>6.0%} "
+          f"{raw_s:>6.2f} {compact_s:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Throughput of `process_leads_from_supabase` at different worker counts.
+
+Runs offline against FakeSupabaseClient and StubLeadAgent, e.g.:
+
+    python -m benchmarks.bench_concurrency --leads 200 --latency 2 --concurrency 1 4 16 64
+"""
+import argparse
+import asyncio
+
+from benchmarks.fakes import FakeSupabaseClient, StubLeadAgent, seed_leads
+from src.utils.lead_enrichment import LeadEnrichmentProcessor
+from src.utils.rate_limiter import configure_rate_limits
+
+
+async def run(leads: int, latency: float, concurrency: int, rpm: int) -> dict:
+    configure_rate_limits({}, default=rpm)
+    supabase = FakeSupabaseClient()
+    seed_leads(supabase, leads)
+    processor = LeadEnrichmentProcessor(agent=StubLeadAgent(name="stub_lead_agent", latency=latency))
+    return await processor.process_leads_from_supabase(max_concurrency=concurrency, supabase=supabase)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--leads", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=1.0, help="fake seconds per lead")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--rpm", type=int, default=0, help="per-model requests/minute (0 = unlimited)")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'leads':>6} {'seconds':>8} {'leads/min':>10}")
+    for concurrency in args.concurrency:
+        summary = asyncio.run(run(args.leads, args.latency, concurrency, args.rpm))
+        print(f"{concurrency:>8} {summary['processed']:>6} "
+              f"{summary['elapsed_seconds']:>8.2f} {summary['leads_per_minute']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Throughput, Supabase round trips and peak memory of the bulk lead import and export.
+
+Imports generated CSV files of increasing size into FakeSupabaseClient, once with one
+insert per row (how scripted `/api/save-contact` POSTs load a list) and once with
+`import_leads` (chunked multi-row inserts), then exports the same number of enriched
+rows. Peak traced memory should not grow with the file size:
+
+    python -m benchmarks.bench_import --rows 1000 10000 50000
+"""
+import argparse
+import asyncio
+import csv
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.fake_supabase import FakeSupabaseClient, FakeTable
+from src.schemas.lead import Contact
+from src.utils.lead_io import CONTACT_COLUMNS, contact_row, export_leads, import_leads, iter_file_lines, parse_records, to_contact_fields
+
+
+class DiscardingTable(FakeTable):
+    """Table that assigns ids but keeps no rows, so stored data does not count as import memory."""
+
+    def insert(self, rows):
+        inserted = []
+        for row in rows:
+            inserted.append({**row, "id": self.next_id})
+            self.next_id += 1
+        return inserted
+
+
+def write_csv(path: Path, rows: int) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CONTACT_COLUMNS)
+        for i in range(rows):
+            row = [f"First{i}", f"Last{i}", f"lead{i}@company{i % 300}.com", "+971500000000", "Dubai", "UAE",
+                   f"Company {i % 300}", "AI; Payments", "Interested in fintech solutions. " * 5]
+            # Every 50th row is cut short, like a hand-edited spreadsheet; it is reported and skipped.
+            writer.writerow(row[:3] if i % 50 == 49 else row)
+
+
+def discarding_client() -> FakeSupabaseClient:
+    supabase = FakeSupabaseClient()
+    supabase.tables["leads_table"] = DiscardingTable(supabase)
+    return supabase
+
+
+async def per_row(path: Path) -> tuple:
+    supabase = discarding_client()
+    async for _, record, error in parse_records(iter_file_lines(path), "csv"):
+        if error is None:
+            try:
+                row = contact_row(Contact.model_validate(to_contact_fields(record)))
+            except ValueError:
+                continue
+            await asyncio.to_thread(supabase.table("leads_table").insert([row]).execute)
+    return supabase.round_trips, None
+
+
+async def bulk(path: Path, chunk_size: int) -> tuple:
+    supabase = discarding_client()
+    summary = await import_leads(iter_file_lines(path), "csv", supabase, chunk_size)
+    return supabase.round_trips, summary
+
+
+async def export(rows: int) -> tuple:
+    supabase = FakeSupabaseClient()
+    supabase.table("leads_table")
+    supabase.tables["leads_table"].insert([
+        {"first_name": f"First{i}", "last_name": f"Last{i}", "company": f"Company {i}", "enrichment_flag": True,
+         "enrichment_status": "Success", "company_technologies": ["AWS", "Go"], "company_industry": "Finance"}
+        for i in range(rows)
+    ])
+    tracemalloc.start()
+    written = 0
+    async for text in export_leads(supabase, "csv"):
+        written += len(text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return supabase.round_trips, peak, written
+
+
+def measure(coroutine) -> tuple:
+    tracemalloc.start()
+    started = time.perf_counter()
+    round_trips, summary = asyncio.run(coroutine)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, round_trips, peak, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--skip-per-row", action="store_true", help="only run the bulk import")
+    args = parser.parse_args()
+
+    print(f"{'mode':<9} {'rows':>7} {'seconds':>8} {'rows/s':>9} {'round trips':>12} {'peak MB':>8}  result")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = Path(tmp) / f"leads_{rows}.csv"
+            write_csv(path, rows)
+            modes = {"bulk": bulk(path, args.chunk_size)}
+            if not args.skip_per_row:
+                modes = {"per-row": per_row(path), **modes}
+            for mode, coroutine in modes.items():
+                elapsed, round_trips, peak, summary = measure(coroutine)
+                result = (f"inserted={summary['inserted']} invalid={summary['invalid']}" if summary else "")
+                print(f"{mode:<9} {rows:>7} {elapsed:>8.2f} {rows / elapsed:>9.0f} {round_trips:>12} "
+                      f"{peak / 2 ** 20:>8.1f}  {result}")
+            round_trips, peak, written = asyncio.run(export(rows))
+            print(f"{'export':<9} {rows:>7} {'':>8} {'':>9} {round_trips:>12} {peak / 2 ** 20:>8.1f}  "
+                  f"{written / 2 ** 20:.1f} MB written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Latency, cost and output quality per lead with tiered model routing vs a single model.
+
+Runs the real agent graph with FakeGemini. A share `--freeform-share` of research
+reports is written freeform (as models often do for hard leads), so the report parser
+cannot structure them and the structuring agent calls its model. A cheap tier is
+`--lite-speedup` times faster than the strong model, but answers a share of its calls
+incompletely, which the router escalates: `--weak-share` of research calls (incomplete
+report) and `--structuring-weak-share` of structuring calls (JSON with most fields
+missing). Cost is estimated from the (fake) token counts and `--price` per model, plus
+GROUNDED_CALL_PRICE for every research call that ran google_search (escalated calls
+pay for it again). Quality is the mean share of `DataEnrichment` fields filled in the
+stored leads.
+
+Three setups are compared: every agent on gemini-2.0-flash, the default tiers (only
+the structuring agent routed through gemini-2.0-flash-lite), and the research agents
+also routed through gemini-2.5-flash-lite (opt-in through MODEL_TIERS):
+
+    python -m benchmarks.bench_model_routing --leads 40 --freeform-share 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+from typing import Optional
+
+from benchmarks.fakes import REPORTS, FakeSupabaseClient, install_fake_models, seed_leads
+from src.agents.lead_enrich.agent import root_agent
+from src.agents.lead_enrich.subagents.company_research_agent import company_research_agent
+from src.agents.lead_enrich.subagents.person_research_agent import person_research_agent
+from src.agents.lead_enrich.subagents.structuring_agent import structuring_agent
+from src.schemas.lead import DataEnrichment
+from src.utils.cost_accounting import DEFAULT_MODEL_PRICES, get_price_table
+from src.utils.lead_enrichment import LeadEnrichmentProcessor
+from src.utils.metrics import metrics
+from src.utils.model_routing import completeness, routing_stats
+from src.utils.rate_limiter import configure_rate_limits
+
+ROUTED_AGENTS = (company_research_agent, person_research_agent, structuring_agent)
+FREEFORM = {
+    "company_research_agent": (REPORTS / "freeform_company.md").read_text(),
+    "person_research_agent": (REPORTS / "freeform_person.md").read_text(),
+}
+# Incomplete answers of a cheap tier.
+WEAK = {
+    "company_research_agent": (REPORTS / "freeform_company.md").read_text(),
+    "person_research_agent": (REPORTS / "bank_person.md").read_text(),
+    "StructuringAgent": json.dumps({"company_name": "Tabby FZ-LLC", "person_full_name": "Hosam Arab"}),
+}
+
+
+def grounded_calls() -> int:
+    """Calls of the current fake backends that ran google_search."""
+    return sum(
+        backend.calls
+        for agent in ROUTED_AGENTS
+        for backend in agent.model.backends.values()
+        if backend.searches
+    )
+
+
+def token_cost(prices: dict, grounded_call_price: float, agent: Optional[str] = None) -> float:
+    """Estimated USD of the model tokens so far (of one agent if given), plus the grounded calls."""
+    cost = grounded_calls() * grounded_call_price
+    for labels, tokens in metrics.snapshot().get("lead_enrichment_model_tokens_total", {}).items():
+        if agent is not None and f'agent="{agent}"' not in labels:
+            continue
+        model = labels.split('model="')[1].split('"')[0]
+        prompt_price, completion_price = prices.get(model, (0.0, 0.0))
+        cost += tokens * (prompt_price if 'type="prompt"' in labels else completion_price) / 1e6
+    return cost
+
+
+def model_calls() -> dict:
+    calls: dict = {}
+    for labels, count in metrics.snapshot().get("lead_enrichment_model_calls_total", {}).items():
+        model = labels.split('model="')[1].split('"')[0]
+        calls[model] = calls.get(model, 0) + count
+    return calls
+
+
+def install(tiers: str, args) -> None:
+    os.environ["MODEL_TIERS"] = tiers
+    install_fake_models(root_agent, latency=args.latency)
+    for agent in ROUTED_AGENTS:
+        router = agent.model
+        strong = router.backends[router.tiers[-1]]
+        if agent.name in FREEFORM:
+            strong.weak_text, strong.weak_rate = FREEFORM[agent.name], args.freeform_share
+        if len(router.tiers) > 1:
+            cheap = router.backends[router.tiers[0]]
+            cheap.latency = args.latency / args.lite_speedup
+            cheap.weak_text = WEAK[agent.name]
+            cheap.weak_rate = args.structuring_weak_share if agent is structuring_agent else args.weak_share
+            if agent.name in FREEFORM:
+                # The cheap tier's complete answers are freeform as often as the strong model's.
+                cheap.weak_rate = 1 - (1 - args.weak_share) * (1 - args.freeform_share)
+
+
+async def run(leads: int, concurrency: int) -> tuple:
+    supabase = FakeSupabaseClient()
+    seed_leads(supabase, leads, distinct_companies=leads)
+    processor = LeadEnrichmentProcessor()
+    summary = await processor.process_leads_from_supabase(max_concurrency=concurrency, supabase=supabase)
+    return summary, supabase.tables["leads_table"].rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per strong model call")
+    parser.add_argument("--lite-speedup", type=float, default=2.0)
+    parser.add_argument("--freeform-share", type=float, default=0.5, help="share of research reports the parser cannot structure")
+    parser.add_argument("--weak-share", type=float, default=0.3, help="share of cheap-tier research answers that are incomplete")
+    parser.add_argument("--structuring-weak-share", type=float, default=0.1,
+                        help="share of cheap-tier structuring answers that are incomplete")
+    parser.add_argument("--price", action="append", default=[], help="model=prompt_usd/completion_usd per 1M tokens")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # USD per 1M prompt / completion tokens; override with --price model=in/out.
+    prices = dict(DEFAULT_MODEL_PRICES)
+    grounded_call_price = get_price_table().grounded_call_price
+    for item in args.price:
+        model, value = item.split("=", 1)
+        prompt_price, completion_price = value.split("/")
+        prices[model] = (float(prompt_price), float(completion_price))
+    # Every lead pays for research: no rate limit and no company report cache.
+    configure_rate_limits({}, default=0)
+    os.environ["COMPANY_CACHE_TTL_SECONDS"] = "0"
+    os.environ["COMPANY_CACHE_PATH"] = ""
+
+    setups = {
+        "single": ",".join(f"{agent.name}=gemini-2.0-flash" for agent in ROUTED_AGENTS),
+        "default": "",
+        "research-tiered": ",".join(
+            f"{agent.name}={'gemini-2.0-flash-lite' if agent is structuring_agent else 'gemini-2.5-flash-lite'}>gemini-2.0-flash"
+            for agent in ROUTED_AGENTS
+        ),
+    }
+    print(f"{'setup':<16} {'leads':>6} {'s/lead':>7} {'usd/1k leads':>13} {'structuring usd/1k':>19} {'quality':>8}  model calls")
+    for name, tiers in setups.items():
+        # Same fake answers for every setup.
+        random.seed(args.seed)
+        install(tiers, args)
+        calls_before, routing_before = model_calls(), routing_stats()
+        cost_before = token_cost(prices, 0.0)
+        structuring_before = token_cost(prices, 0.0, structuring_agent.name)
+        summary, rows = asyncio.run(run(args.leads, args.concurrency))
+        calls = {m: c - calls_before.get(m, 0) for m, c in model_calls().items() if c - calls_before.get(m, 0)}
+        # The backends are new for every setup, so their grounded calls need no baseline.
+        cost = (token_cost(prices, grounded_call_price) - cost_before) / summary["processed"] * 1000
+        structuring = (token_cost(prices, 0.0, structuring_agent.name) - structuring_before) / summary["processed"] * 1000
+        quality = sum(completeness(row, DataEnrichment.model_fields) for row in rows) / len(rows)
+        print(f"{name:<16} {summary['processed']:>6} {summary['elapsed_seconds'] / summary['processed'] * args.concurrency:>7.3f} "
+              f"{cost:>13.4f} {structuring:>19.4f} {quality:>8.1%}  {calls}")
+        for agent, models in routing_stats().items():
+            for model, stats in models.items():
+                before = routing_before.get(agent, {}).get(model, {"answered": 0, "escalated": 0})
+                answered = stats["answered"] - before["answered"]
+                escalated = stats["escalated"] - before["escalated"]
+                if answered or escalated:
+                    print(f"  {agent:<24} {model:<22} answered={answered:<4} escalated={escalated:<4} "
+                          f"rate={escalated / (answered + escalated):.0%}")
+
+if __name__ == "__main__":
+    main()
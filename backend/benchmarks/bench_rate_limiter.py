@@ -0,0 +1,85 @@
+"""
+Behaviour of the adaptive limiter and retries against a throttling fake model.
+
+Fires `--calls` concurrent model calls through `RateLimitedModel` at a FakeGemini
+that answers 429 beyond `--capacity` concurrent calls (and 503 for a share
+`--error-rate` of calls), in three setups: no retries, retries with the adaptive
+limit, and retries with a fixed ceiling equal to the capacity (the best static
+setting, which in practice is unknown):
+
+    python -m benchmarks.bench_rate_limiter --calls 200 --capacity 8 --latency 0.2
+"""
+import argparse
+import asyncio
+import time
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from benchmarks.fakes import FakeGemini
+from src.utils.metrics import metrics
+from src.utils.rate_limiter import RateLimitedModel, configure_rate_limits, configure_retries, get_rate_limiter
+
+MODEL = "gemini-2.0-flash"
+
+
+def retries_so_far() -> float:
+    return sum(metrics.snapshot().get("lead_enrichment_model_retries_total", {}).values())
+
+
+async def call(model: RateLimitedModel) -> bool:
+    request = LlmRequest(model=MODEL, contents=[types.Content(role="user", parts=[types.Part(text="ping")])])
+    try:
+        async for _ in model.generate_content_async(request):
+            pass
+    except Exception:
+        return False
+    return True
+
+
+async def run(calls: int, fake: FakeGemini) -> dict:
+    model = RateLimitedModel(model=MODEL, backend=fake)
+    retries_before = retries_so_far()
+    started = time.monotonic()
+    results = await asyncio.gather(*(call(model) for _ in range(calls)))
+    limiter = get_rate_limiter(MODEL)
+    return {
+        "ok": sum(results),
+        "failed": calls - sum(results),
+        "attempts": fake.calls,
+        "throttled": fake.rejected,
+        "retries": retries_so_far() - retries_before,
+        "wait": limiter.total_wait_seconds / max(limiter.total_requests, 1),
+        "limit": limiter.concurrency_limit,
+        "seconds": time.monotonic() - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--capacity", type=int, default=8, help="concurrent calls the fake model accepts")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per successful call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls failing with 503")
+    parser.add_argument("--base-delay", type=float, default=0.1, help="first retry backoff bound in seconds")
+    parser.add_argument("--max-retries", type=int, default=8)
+    args = parser.parse_args()
+
+    setups = {
+        "no-retry": ({}, 0),
+        "adaptive": ({}, args.max_retries),
+        "fixed": ({MODEL: args.capacity}, args.max_retries),
+    }
+    print(f"{'setup':<9} {'ok':>5} {'failed':>6} {'attempts':>8} {'429/503':>8} {'retries':>7} "
+          f"{'wait/call':>9} {'limit':>6} {'seconds':>8}")
+    for name, (concurrency, max_retries) in setups.items():
+        configure_rate_limits({}, concurrency=concurrency)
+        configure_retries(max_retries, base_delay=args.base_delay, max_delay=args.base_delay * 32)
+        fake = FakeGemini(model=MODEL, latency=args.latency, capacity=args.capacity, error_rate=args.error_rate)
+        r = asyncio.run(run(args.calls, fake))
+        print(f"{name:<9} {r['ok']:>5} {r['failed']:>6} {r['attempts']:>8} {r['throttled']:>8} {r['retries']:>7.0f} "
+              f"{r['wait']:>9.3f} {r['limit']:>6.1f} {r['seconds']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Cost of keeping enriched leads fresh: full re-enrichment vs incremental refresh.
+
+Seeds enriched leads whose field groups are stale in the given proportions, then
+runs the real agent graph with FakeGemini (no network) in two modes: resetting
+`enrichment_flag` and re-enriching everything, and `refresh_stale_leads`, which
+only researches the stale groups. Model calls, tokens and google_search queries are
+read from the pipeline metrics:
+
+    python -m benchmarks.bench_refresh --leads 200 --news-stale 0.8 --person-stale 0.2 --profile-stale 0.1
+"""
+import argparse
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.fakes import FakeSupabaseClient, install_fake_models, seed_leads
+from src.agents.lead_enrich.agent import root_agent
+from src.utils.lead_enrichment import LeadEnrichmentProcessor
+from src.utils.lead_freshness import refreshed_at_column
+from src.utils.metrics import metrics
+from src.utils.rate_limiter import configure_rate_limits
+
+COUNTERS = {
+    "model calls": ("lead_enrichment_model_calls_total", None),
+    "prompt tokens": ("lead_enrichment_model_tokens_total", 'type="prompt"'),
+    "completion tokens": ("lead_enrichment_model_tokens_total", 'type="completion"'),
+    "searches": ("lead_enrichment_tool_calls_total", None),
+}
+
+
+def seed_enriched_leads(count: int, stale: dict, seed: int) -> FakeSupabaseClient:
+    supabase = FakeSupabaseClient()
+    seed_leads(supabase, count, distinct_companies=count)
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    for row in supabase.tables["leads_table"].rows:
+        row.update(enrichment_flag=True, enrichment_status="Success", enriched_at=now.isoformat())
+        for group, share in stale.items():
+            age = timedelta(days=365) if rng.random() < share else timedelta(days=1)
+            row[refreshed_at_column(group)] = (now - age).isoformat()
+    return supabase
+
+
+def totals() -> dict:
+    snapshot = metrics.snapshot()
+    return {
+        name: sum(v for labels, v in snapshot.get(metric, {}).items() if selector is None or selector in labels)
+        for name, (metric, selector) in COUNTERS.items()
+    }
+
+
+async def run(mode: str, supabase: FakeSupabaseClient, concurrency: int) -> dict:
+    processor = LeadEnrichmentProcessor()
+    before = totals()
+    if mode == "full":
+        for row in supabase.tables["leads_table"].rows:
+            row["enrichment_flag"] = False
+        summary = await processor.process_leads_from_supabase(max_concurrency=concurrency, supabase=supabase)
+    else:
+        summary = await processor.refresh_stale_leads(max_concurrency=concurrency, supabase=supabase)
+    after = totals()
+    return {**summary, **{name: after[name] - before[name] for name in COUNTERS}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake seconds per model call")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--profile-stale", type=float, default=0.1, help="share of leads with a stale company profile")
+    parser.add_argument("--news-stale", type=float, default=0.8, help="share of leads with stale news/hiring")
+    parser.add_argument("--person-stale", type=float, default=0.2, help="share of leads with a stale person profile")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Both modes pay for every research call: no rate limit and no company report cache.
+    configure_rate_limits({}, default=0)
+    os.environ["COMPANY_CACHE_TTL_SECONDS"] = "0"
+    os.environ["COMPANY_CACHE_PATH"] = ""
+    install_fake_models(root_agent, latency=args.latency)
+    stale = {
+        "company_profile": args.profile_stale,
+        "company_news": args.news_stale,
+        "person_profile": args.person_stale,
+    }
+
+    print(f"{'mode':<8} {'leads':>6} " + " ".join(f"{name:>17}" for name in COUNTERS) + f" {'seconds':>8}")
+    for mode in ("full", "refresh"):
+        supabase = seed_enriched_leads(args.leads, stale, args.seed)
+        result = asyncio.run(run(mode, supabase, args.concurrency))
+        print(f"{mode:<8} {result['processed']:>6} "
+              + " ".join(f"{result[name]:>17.0f}" for name in COUNTERS)
+              + f" {result['elapsed_seconds']:>8.2f}")
+        if mode == "refresh":
+            print(f"refreshed groups: {result.get('refreshed_groups', {})}")
+
+
+if __name__ == "__main__":
+    main()
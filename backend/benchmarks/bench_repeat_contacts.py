@@ -0,0 +1,127 @@
+"""
+Savings of the entity index (src/utils/entity_index.py) for repeat contacts.
+
+1. API: a contact is saved and enriched through `/api/save-contact` and
+   `/api/enrich-lead` (models answered by FakeGemini after `--latency` seconds), then
+   the same person submits the form again with another inquiry. Reports the time from
+   saving each contact until its lead is enriched, and the model calls it took.
+2. Batch: `--leads` unenriched leads, `--repeat-share` of them from people enriched
+   earlier, are processed by `process_leads_from_supabase` (StubLeadAgent) with and
+   without reuse. Reports pipeline runs, reused leads and elapsed time.
+
+    python -m benchmarks.bench_repeat_contacts --latency 0.5 --leads 200 --repeat-share 0.3
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Tuple
+
+from benchmarks.fake_supabase import FakeSupabaseClient
+
+CONTACT = {
+    "firstName": "Ada",
+    "lastName": "Lovelace",
+    "email": "Ada.Lovelace@example.com",
+    "contactNumber": "+44 20 0000 0000",
+    "city": "London",
+    "country": "United Kingdom",
+    "company": "Tabby",
+    "interestedIn": ["Digital Banking"],
+    "inquiry": "Interested in fintech solutions",
+}
+
+
+def model_calls() -> float:
+    from src.utils.metrics import metrics
+
+    return sum(metrics.snapshot().get("lead_enrichment_model_calls_total", {}).values())
+
+
+def api_round(client, inquiry: str) -> Tuple[int, float, float]:
+    """Save and enrich one contact; return the enrich-lead status code, seconds and model calls."""
+    calls_before = model_calls()
+    started_at = time.monotonic()
+    lead_id = client.post("/api/save-contact", json={**CONTACT, "inquiry": inquiry}).json()["lead_id"]
+    response = client.post("/api/enrich-lead", json={
+        "lead_id": lead_id,
+        "company_name": CONTACT["company"],
+        "person_name": f"{CONTACT['firstName']} {CONTACT['lastName']}",
+    })
+    job_id = response.json()["job_id"]
+    while client.get(f"/api/enrich-jobs/{job_id}").json()["status"] not in ("succeeded", "failed"):
+        time.sleep(0.01)
+    return response.status_code, time.monotonic() - started_at, model_calls() - calls_before
+
+
+def run_api(latency: float) -> None:
+    from fastapi.testclient import TestClient
+
+    from benchmarks.fakes import install_fake_models
+    from src.agents.lead_enrich.agent import root_agent
+    from src.config import supebase_config
+
+    supabase = FakeSupabaseClient()
+    supebase_config.get_supabase_client = lambda: supabase
+    from src.main import app
+
+    install_fake_models(root_agent, latency=latency)
+    with TestClient(app) as client:
+        print(f"{'contact':<10} {'enrich-lead':>11} {'seconds':>8} {'model calls':>11}")
+        for name, inquiry in (("first", "Interested in fintech solutions"), ("repeat", "Following up on my inquiry")):
+            status, seconds, calls = api_round(client, inquiry)
+            print(f"{name:<10} {status:>11} {seconds:>8.3f} {calls:>11.0f}")
+
+
+def seed(supabase: FakeSupabaseClient, leads: int, repeat_share: float) -> None:
+    """Insert leads of which `repeat_share` have an enriched earlier lead of the same person."""
+    from src.utils.entity_index import entity_keys
+
+    now = datetime.now(timezone.utc).isoformat()
+    repeats = int(leads * repeat_share)
+    rows = []
+    for i in range(leads):
+        person = {"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"lead{i}@company{i}.com", "company": f"Company {i}"}
+        keys = entity_keys(person["first_name"], person["last_name"], person["email"], person["company"])
+        if i < repeats:
+            rows.append({**person, **keys, "enrichment_status": "Success", "enrichment_flag": True,
+                         "enriched_at": now, "company_name": person["company"], "person_full_name": f"First{i} Last{i}"})
+        rows.append({**person, **keys, "enrichment_flag": False})
+    supabase.table("leads_table")
+    supabase.tables["leads_table"].insert(rows)
+
+
+async def run_batch(leads: int, repeat_share: float, latency: float, reuse: bool) -> Dict[str, Any]:
+    from benchmarks.fakes import StubLeadAgent
+    from src.utils.lead_enrichment import LeadEnrichmentProcessor
+
+    supabase = FakeSupabaseClient()
+    seed(supabase, leads, repeat_share)
+    processor = LeadEnrichmentProcessor(agent=StubLeadAgent(name="stub_lead_agent", latency=latency))
+    return await processor.process_leads_from_supabase(max_concurrency=4, supabase=supabase, reuse_enrichments=reuse)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake seconds per model call (API) / per lead (batch)")
+    parser.add_argument("--leads", type=int, default=200)
+    parser.add_argument("--repeat-share", type=float, default=0.3)
+    args = parser.parse_args()
+
+    os.environ.update(ENRICHMENT_JOB_STORE="memory", COMPANY_CACHE_PATH="", AGENT_WARMUP="eager",
+                      LANGFUSE_PUBLIC_KEY="", LANGFUSE_SECRET_KEY="")
+    from src.utils.rate_limiter import configure_rate_limits
+
+    configure_rate_limits({}, default=0)
+    run_api(args.latency)
+
+    print(f"\n{'reuse':<6} {'leads':>6} {'reused':>7} {'pipeline runs':>13} {'seconds':>8}")
+    for reuse in (False, True):
+        summary = asyncio.run(run_batch(args.leads, args.repeat_share, args.latency, reuse))
+        print(f"{str(reuse).lower():<6} {summary['processed']:>6} {summary['reused']:>7} "
+              f"{summary['runs_started']:>13} {summary['elapsed_seconds']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
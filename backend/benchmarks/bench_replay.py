@@ -0,0 +1,183 @@
+"""
+End-to-end replay benchmark of the enrichment pipeline, runnable offline and in CI.
+
+Runs `process_leads_from_supabase` through the real `root_agent` graph (parallel
+research agents, report parser, structuring agent, routing, rate limiter, company
+cache, single-flight and buffered writer) against FakeSupabaseClient. Model and
+google_search calls are answered by ReplayGemini from recorded responses
+(benchmarks/recordings/pipeline.jsonl), sleeping the recorded latency times
+`--latency-scale`. For every concurrency level it reports leads/sec, p50/p95 lead
+latency, peak traced memory, and model calls and Supabase round trips per lead:
+
+    python -m benchmarks.bench_replay --leads 128 --concurrency 1 4 16 64
+
+In CI, compare against a saved baseline; the exit status is 1 when a lead fails or a
+metric regresses by more than `--tolerance`:
+
+    python -m benchmarks.bench_replay --save-baseline benchmarks/recordings/baseline.json
+    python -m benchmarks.bench_replay --baseline benchmarks/recordings/baseline.json
+
+New recordings can be captured from live Gemini (needs GOOGLE_API_KEY) for the leads
+in benchmarks/reports/leads.json:
+
+    python -m benchmarks.bench_replay --record benchmarks/recordings/pipeline.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.fakes import (
+    RECORDINGS,
+    REPORTS,
+    FakeSupabaseClient,
+    install_recorders,
+    install_replay_models,
+    load_recordings,
+    seed_leads,
+)
+from src.agents.lead_enrich.agent import root_agent
+from src.utils import company_cache
+from src.utils.lead_enrichment import LeadEnrichmentProcessor
+from src.utils.metrics import metrics
+from src.utils.rate_limiter import configure_rate_limits
+
+# Metric -> (whether a higher value is better, smallest change that counts as a regression).
+# The absolute floor keeps small values (e.g. 0.02 round trips per lead) from flapping.
+CHECKED = {
+    "leads_per_second": (True, 0.5),
+    "p50_seconds": (False, 0.05),
+    "p95_seconds": (False, 0.05),
+    "peak_memory_mb": (False, 1.0),
+    "model_calls_per_lead": (False, 0.05),
+    "round_trips_per_lead": (False, 0.05),
+}
+
+
+class TimedProcessor(LeadEnrichmentProcessor):
+    """Processor that records the latency of every enrichment run."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies: List[float] = []
+
+    async def _run_pipeline(self, *args, **kwargs):
+        started_at = time.monotonic()
+        try:
+            return await super()._run_pipeline(*args, **kwargs)
+        finally:
+            self.latencies.append(time.monotonic() - started_at)
+
+
+def quantile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def model_calls() -> float:
+    return sum(metrics.snapshot().get("lead_enrichment_model_calls_total", {}).values())
+
+
+async def run(leads: int, companies: int, concurrency: int) -> Dict[str, float]:
+    # Every level starts cold: a fresh in-memory company cache and Supabase table.
+    company_cache._company_cache = None
+    supabase = FakeSupabaseClient()
+    seed_leads(supabase, leads, distinct_companies=companies)
+    processor = TimedProcessor()
+    calls_before = model_calls()
+    tracemalloc.start()
+    summary = await processor.process_leads_from_supabase(max_concurrency=concurrency, supabase=supabase)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rows = supabase.tables["leads_table"].rows
+    failed = sum(1 for row in rows if row.get("enrichment_status") != "Success")
+    return {
+        "leads": len(rows),
+        "failed": failed,
+        "seconds": summary["elapsed_seconds"],
+        "leads_per_second": summary["processed"] / summary["elapsed_seconds"] if summary["elapsed_seconds"] else 0.0,
+        "p50_seconds": quantile(processor.latencies, 0.5),
+        "p95_seconds": quantile(processor.latencies, 0.95),
+        "peak_memory_mb": peak / 2 ** 20,
+        "model_calls_per_lead": (model_calls() - calls_before) / len(rows),
+        "round_trips_per_lead": supabase.round_trips / len(rows),
+    }
+
+
+def regressions(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    problems = []
+    for level, result in results.items():
+        expected = baseline.get(level)
+        if expected is None:
+            continue
+        for name, (higher_is_better, min_delta) in CHECKED.items():
+            if not expected.get(name):
+                continue
+            worse_by = expected[name] - result[name] if higher_is_better else result[name] - expected[name]
+            if worse_by > min_delta and worse_by / expected[name] > tolerance:
+                problems.append(f"concurrency {level}: {name} {result[name]:.3f} vs baseline {expected[name]:.3f}")
+    return problems
+
+
+async def record(path: Path) -> None:
+    """Enrich the sample leads with live Gemini and append every model answer to `path`."""
+    install_recorders(root_agent, path)
+    processor = LeadEnrichmentProcessor()
+    for lead in json.loads((REPORTS / "leads.json").read_text()).values():
+        await processor.enrich_single_lead(lead["company_name"], lead["person_name"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=128)
+    parser.add_argument("--companies", type=int, default=None, help="distinct companies (default: one per lead)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--latency-scale", type=float, default=0.01, help="multiplier of the recorded latencies")
+    parser.add_argument("--recordings", type=Path, default=RECORDINGS / "pipeline.jsonl")
+    parser.add_argument("--baseline", type=Path, help="fail on regressions against this baseline")
+    parser.add_argument("--save-baseline", type=Path, help="write the results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative regression")
+    parser.add_argument("--record", type=Path, help="record live Gemini answers to this file instead")
+    args = parser.parse_args()
+
+    if args.record:
+        asyncio.run(record(args.record))
+        print(f"Recorded responses to {args.record}")
+        return
+
+    configure_rate_limits({}, default=0)
+    os.environ["COMPANY_CACHE_PATH"] = ""
+    install_replay_models(root_agent, load_recordings(args.recordings), args.latency_scale)
+
+    results = {}
+    print(f"{'workers':>8} {'leads':>6} {'failed':>6} {'leads/s':>8} {'p50 s':>7} {'p95 s':>7} "
+          f"{'peak MB':>8} {'calls/lead':>10} {'trips/lead':>10}")
+    for concurrency in args.concurrency:
+        result = asyncio.run(run(args.leads, args.companies or args.leads, concurrency))
+        results[str(concurrency)] = result
+        print(f"{concurrency:>8} {result['leads']:>6} {result['failed']:>6} {result['leads_per_second']:>8.1f} "
+              f"{result['p50_seconds']:>7.3f} {result['p95_seconds']:>7.3f} {result['peak_memory_mb']:>8.1f} "
+              f"{result['model_calls_per_lead']:>10.2f} {result['round_trips_per_lead']:>10.2f}")
+
+    # Results are only comparable between runs with the same workload.
+    settings = {"leads": args.leads, "companies": args.companies or args.leads, "latency_scale": args.latency_scale}
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps({"settings": settings, "results": results}, indent=2) + "\n")
+    problems = [f"concurrency {level}: {r['failed']} leads failed" for level, r in results.items() if r["failed"]]
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline["settings"] != settings:
+            sys.exit(f"Baseline was recorded with {baseline['settings']}, this run uses {settings}")
+        problems += regressions(results, baseline["results"], args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Parse time and field accuracy of the deterministic report parser.
+
+Runs over the sample reports in benchmarks/reports (`<name>_company.md`,
+`<name>_person.md` and the hand-labelled `<name>_expected.json`):
+
+    python -m benchmarks.bench_report_parser --repeat 1000
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from src.agents.lead_enrich.subagents.structuring_agent.agent import parse_is_trusted
+from src.utils.report_parser import parse_reports
+
+REPORTS = Path(__file__).parent / "reports"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    leads = json.loads((REPORTS / "leads.json").read_text())
+    total_correct = total_fields = 0
+    print(f"{'sample':<10} {'us/parse':>9} {'coverage':>9} {'accuracy':>9} {'path':>7}  wrong fields")
+    for name, lead in leads.items():
+        company = (REPORTS / f"{name}_company.md").read_text()
+        person = (REPORTS / f"{name}_person.md").read_text()
+        expected = json.loads((REPORTS / f"{name}_expected.json").read_text())
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            parsed, coverage = parse_reports(company, person, lead["company_name"], lead["person_name"])
+        elapsed = (time.perf_counter() - started) / args.repeat
+
+        if parse_is_trusted(parsed, coverage):
+            actual = parsed.model_dump()
+            wrong = [field for field, value in expected.items() if actual.get(field) != value]
+            correct = len(expected) - len(wrong)
+            total_correct += correct
+            total_fields += len(expected)
+            path, accuracy = "parser", f"{correct / len(expected):.0%}"
+        else:
+            wrong, path, accuracy = [], "llm", "-"
+        print(f"{name:<10} {elapsed * 1e6:>9.0f} {coverage:>9.0%} {accuracy:>9} {path:>7}  {', '.join(wrong)}")
+
+    if total_fields:
+        print(f"field accuracy on parsed samples: {total_correct / total_fields:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Cold-start cost of the API: import time and time to the first successful request.
+
+1. Runs `python -X importtime -c "import src.main"` and reports the total import time,
+   the heaviest top-level packages and whether google-adk was imported at all.
+2. For every AGENT_WARMUP mode, starts the app with uvicorn in a subprocess (Supabase
+   replaced by FakeSupabaseClient, Langfuse disabled) and measures the time from
+   process start until `POST /api/save-contact` first returns 200, and until the
+   enrichment pipeline reports it is ready:
+
+    python -m benchmarks.bench_startup --modes background lazy eager
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+CONTACT = {
+    "firstName": "Ada",
+    "lastName": "Lovelace",
+    "email": "ada@example.com",
+    "contactNumber": "+44 20 0000 0000",
+    "city": "London",
+    "country": "United Kingdom",
+    "company": "Analytical Engines",
+    "interestedIn": ["Lead enrichment"],
+    "inquiry": "How fast can you enrich a lead?",
+}
+
+
+def import_times() -> Tuple[float, Dict[str, float], bool]:
+    """
+    Import src.main in a fresh interpreter.
+
+    Returns:
+        The total import time and the self time per top-level package, in seconds, and
+        whether google-adk was imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        capture_output=True, text=True, check=True,
+    )
+    total = 0.0
+    per_package: Dict[str, float] = defaultdict(float)
+    imports_adk = False
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, module = match.groups()
+        per_package[module.split(".")[0]] += int(self_us) / 1e6
+        imports_adk = imports_adk or module.startswith("google.adk")
+        if module == "src.main":
+            total = int(cumulative_us) / 1e6
+    return total, per_package, imports_adk
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_200(mode: str, timeout: float) -> Tuple[Optional[float], Optional[float]]:
+    """Start the app with AGENT_WARMUP=mode; return seconds to the first 200 and to pipeline readiness."""
+    port = free_port()
+    env = {**os.environ, "AGENT_WARMUP": mode, "LANGFUSE_PUBLIC_KEY": "", "LANGFUSE_SECRET_KEY": ""}
+    started = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--serve", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    ready: List[float] = []
+
+    def watch_log():
+        for line in server.stderr:
+            if "Lead enrichment pipeline ready" in line:
+                ready.append(time.monotonic() - started)
+
+    threading.Thread(target=watch_log, daemon=True).start()
+    first_200 = None
+    client = httpx.Client(trust_env=False, timeout=timeout)
+    try:
+        while time.monotonic() - started < timeout and server.poll() is None:
+            try:
+                response = client.post(f"http://127.0.0.1:{port}/api/save-contact", json=CONTACT)
+            except httpx.TransportError:
+                time.sleep(0.01)
+                continue
+            if response.status_code != 200:
+                raise RuntimeError(f"save-contact returned {response.status_code}: {response.text}")
+            first_200 = time.monotonic() - started
+            break
+        # Give the background build the chance to finish so its readiness can be reported.
+        while mode != "lazy" and not ready and time.monotonic() - started < timeout and server.poll() is None:
+            time.sleep(0.05)
+    finally:
+        client.close()
+        server.terminate()
+        server.wait()
+    return first_200, ready[0] if ready else None
+
+
+def serve(port: int) -> None:
+    """Run the app against FakeSupabaseClient (used by the subprocesses of `time_to_first_200`)."""
+    import uvicorn
+
+    from benchmarks.fake_supabase import FakeSupabaseClient
+    from src.config import supebase_config
+
+    supebase_config.get_supabase_client = FakeSupabaseClient
+    from src.main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["background", "lazy", "eager"])
+    parser.add_argument("--top", type=int, default=8, help="heaviest packages to list")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    total, per_package, imports_adk = import_times()
+    print(f"import src.main: {total:.2f} s, google.adk imported: {imports_adk}")
+    for package, seconds in sorted(per_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:<24} {seconds:6.3f} s")
+
+    print(f"\n{'AGENT_WARMUP':<12} {'first 200 s':>12} {'pipeline ready s':>17}")
+    for mode in args.modes:
+        first_200, ready = time_to_first_200(mode, args.timeout)
+        print(f"{mode:<12} {_seconds(first_200):>12} {_seconds(ready):>17}")
+
+
+def _seconds(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+if __name__ == "__main__":
+    main()
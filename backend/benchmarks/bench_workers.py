@@ -0,0 +1,98 @@
+"""
+Horizontal scaling of lease-based batch workers.
+
+Runs `--workers` copies of `process_leads_from_supabase`, each with its own processor
+and worker id as separate processes would, against one FakeSupabaseClient whose
+`claim_leads`/`renew_lead_leases`/`release_leads` RPCs emulate supabase.sql.
+StubLeadAgent takes `--latency` seconds per lead, longer than `--lease-seconds`, so
+leads are only kept by renewing their lease. `--crashed` leads start out claimed by a
+worker that died (expired leases) and must be recovered. For each worker count it
+reports leads/sec, the speedup over one worker, leads written more than once and
+leases recovered:
+
+    python -m benchmarks.bench_workers --leads 400 --workers 1 2 4 8 --concurrency 4
+
+The exit status is 1 when a lead is enriched twice or left unenriched.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from benchmarks.fakes import FakeSupabaseClient, StubLeadAgent, bulk_update_leads, seed_leads
+from src.utils.lead_enrichment import LeadEnrichmentProcessor
+from src.utils.rate_limiter import configure_rate_limits
+
+
+async def run(leads: int, workers: int, concurrency: int, latency: float, lease_seconds: int, crashed: int) -> Dict[str, Any]:
+    supabase = FakeSupabaseClient()
+    seed_leads(supabase, leads, distinct_companies=leads)
+    expired = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+    for row in supabase.tables["leads_table"].rows[:crashed]:
+        row.update(enrichment_status="processing", claimed_by="crashed-worker", lease_expires_at=expired)
+
+    writes: Counter = Counter()
+
+    def counting_bulk_update(client: FakeSupabaseClient, payload: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        writes.update(item["id"] for item in payload)
+        return bulk_update_leads(client, payload)
+
+    supabase.rpc_handlers["bulk_update_leads"] = counting_bulk_update
+    agent = StubLeadAgent(name="stub_lead_agent", latency=latency)
+    started_at = time.monotonic()
+    summaries = await asyncio.gather(*(
+        LeadEnrichmentProcessor(agent=agent).process_leads_from_supabase(
+            max_concurrency=concurrency,
+            supabase=supabase,
+            flush_interval=0.5,
+            lease_seconds=lease_seconds,
+            worker_id=f"worker-{i}",
+        )
+        for i in range(workers)
+    ))
+    elapsed = time.monotonic() - started_at
+    rows = supabase.tables["leads_table"].rows
+    return {
+        "processed": sum(summary["processed"] for summary in summaries),
+        "seconds": elapsed,
+        "leads_per_second": len(writes) / elapsed,
+        "duplicates": sum(count - 1 for count in writes.values()),
+        "unenriched": sum(1 for row in rows if row.get("enrichment_status") != "Success" or row.get("claimed_by")),
+        "recovered": sum(summary["leases"]["recovered"] for summary in summaries),
+        "lease_trips_per_lead": sum(summary["leases"]["lease_round_trips"] for summary in summaries) / len(rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--concurrency", type=int, default=4, help="leads enriched at once per worker")
+    parser.add_argument("--latency", type=float, default=1.5, help="fake seconds per lead")
+    parser.add_argument("--lease-seconds", type=int, default=1)
+    parser.add_argument("--crashed", type=int, default=20, help="leads left claimed by a crashed worker")
+    args = parser.parse_args()
+
+    configure_rate_limits({}, default=0)
+    problems = []
+    baseline = None
+    print(f"{'workers':>8} {'leads':>6} {'seconds':>8} {'leads/s':>8} {'speedup':>8} "
+          f"{'duplicates':>10} {'recovered':>9} {'lease trips/lead':>16}")
+    for workers in args.workers:
+        result = asyncio.run(run(args.leads, workers, args.concurrency, args.latency, args.lease_seconds, args.crashed))
+        baseline = baseline or result["leads_per_second"]
+        print(f"{workers:>8} {result['processed']:>6} {result['seconds']:>8.2f} {result['leads_per_second']:>8.1f} "
+              f"{result['leads_per_second'] / baseline:>8.2f} {result['duplicates']:>10} {result['recovered']:>9} "
+              f"{result['lease_trips_per_lead']:>16.2f}")
+        if result["duplicates"] or result["unenriched"]:
+            problems.append(f"{workers} workers: {result['duplicates']} duplicate and {result['unenriched']} unenriched leads")
+    for problem in problems:
+        print(f"FAILED {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
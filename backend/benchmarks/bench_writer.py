@@ -0,0 +1,60 @@
+"""
+Round trips needed to write back 1,000 enrichment results.
+
+Compares one `update_lead_in_supabase` call per lead with `BufferedLeadWriter`:
+
+    python -m benchmarks.bench_writer --leads 1000 --batch-size 100
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fake_supabase import FakeSupabaseClient, seed_leads
+from src.utils.lead_writer import BufferedLeadWriter, update_lead_in_supabase
+
+
+def enrichment(lead_id: int) -> dict:
+    return {
+        "company_name": f"Company {lead_id}",
+        "person_full_name": f"Person {lead_id}",
+        "company_technologies": ["Python", "AWS"],
+    }
+
+
+def per_row(leads: int) -> FakeSupabaseClient:
+    supabase = FakeSupabaseClient()
+    seed_leads(supabase, leads)
+    for lead_id in range(1, leads + 1):
+        update_lead_in_supabase(supabase, lead_id, enrichment(lead_id))
+    return supabase
+
+
+async def buffered(leads: int, batch_size: int) -> FakeSupabaseClient:
+    supabase = FakeSupabaseClient()
+    seed_leads(supabase, leads)
+    async with BufferedLeadWriter(supabase, max_batch_size=batch_size) as writer:
+        for lead_id in range(1, leads + 1):
+            await writer.add(lead_id, enrichment(lead_id))
+    return supabase
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--leads", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    for label, run in [
+        ("per-row", lambda: per_row(args.leads)),
+        ("buffered", lambda: asyncio.run(buffered(args.leads, args.batch_size))),
+    ]:
+        started = time.perf_counter()
+        supabase = run()
+        elapsed = time.perf_counter() - started
+        # seed_leads does not go through execute(), so every round trip is a write.
+        per_1000 = supabase.round_trips / args.leads * 1000
+        print(f"{label:<9} round_trips={supabase.round_trips:<6} per_1000_leads={per_1000:<8.1f} time={elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
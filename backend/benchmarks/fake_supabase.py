@@ -0,0 +1,349 @@
+"""
+In-memory stand-in for Supabase used by the benchmarks.
+
+FakeSupabaseClient implements the subset of the supabase-py query builder used by
+the backend and counts every `execute()` call as one HTTP round trip. RPCs of
+supabase.sql are emulated one at a time under a lock, which makes a claim as atomic
+as `FOR UPDATE SKIP LOCKED` does in Postgres. It is kept apart from benchmarks.fakes
+so that it can be used without importing google-adk.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+
+class FakeResponse:
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+
+
+class FakeQuery:
+    """Chainable query builder evaluated against the rows of one FakeTable."""
+
+    def __init__(self, table: "FakeTable"):
+        self.table = table
+        self.action = "select"
+        self.columns: Optional[List[str]] = None
+        self.payload: Any = None
+        self.filters: List[Any] = []
+        self.order_by: Optional[str] = None
+        self.row_limit: Optional[int] = None
+
+    def select(self, columns: str = "*") -> "FakeQuery":
+        if columns != "*":
+            self.columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, rows) -> "FakeQuery":
+        self.action, self.payload = "insert", rows
+        return self
+
+    def update(self, data: Dict[str, Any]) -> "FakeQuery":
+        self.action, self.payload = "update", data
+        return self
+
+    def upsert(self, rows, on_conflict: str = "id") -> "FakeQuery":
+        self.action, self.payload = "upsert", rows
+        return self
+
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: _normalize(row.get(column)) == _normalize(value))
+        return self
+
+    def gt(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def is_(self, column: str, value: str) -> "FakeQuery":
+        self.filters.append(lambda row: _matches(row.get(column), "is", value))
+        return self
+
+    def or_(self, filters: str) -> "FakeQuery":
+        """PostgREST `or` filter, e.g. 'a.is.null,a.lt.2025-01-01'."""
+        conditions = [item.split(".", 2) for item in filters.split(",")]
+        self.filters.append(lambda row: any(_matches(row.get(c), op, v) for c, op, v in conditions))
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "FakeQuery":
+        wanted = {_normalize(v) for v in values}
+        self.filters.append(lambda row: _normalize(row.get(column)) in wanted)
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "FakeQuery":
+        self.order_by = column
+        return self
+
+    def limit(self, count: int) -> "FakeQuery":
+        self.row_limit = count
+        return self
+
+    def execute(self) -> FakeResponse:
+        self.table.client.round_trips += 1
+        if self.action == "insert":
+            return FakeResponse(self.table.insert(self.payload))
+        if self.action == "upsert":
+            return FakeResponse(self.table.upsert(self.payload))
+        rows = [row for row in self.table.rows if all(f(row) for f in self.filters)]
+        if self.action == "update":
+            for row in rows:
+                row.update(self.payload)
+            return FakeResponse([dict(row) for row in rows])
+        if self.order_by:
+            rows.sort(key=lambda row: row[self.order_by])
+        if self.row_limit is not None:
+            rows = rows[: self.row_limit]
+        if self.columns:
+            return FakeResponse([{c: row.get(c) for c in self.columns} for row in rows])
+        return FakeResponse([dict(row) for row in rows])
+
+
+class FakeTable:
+    def __init__(self, client: "FakeSupabaseClient"):
+        self.client = client
+        self.rows: List[Dict[str, Any]] = []
+        self.next_id = 1
+
+    def insert(self, rows) -> List[Dict[str, Any]]:
+        inserted = []
+        for row in rows if isinstance(rows, list) else [rows]:
+            row = dict(row)
+            row.setdefault("id", self.next_id)
+            if isinstance(row["id"], int):  # job ids are UUID strings
+                self.next_id = max(self.next_id, row["id"]) + 1
+            self.rows.append(row)
+            inserted.append(dict(row))
+        return inserted
+
+    def upsert(self, rows) -> List[Dict[str, Any]]:
+        by_id = {row["id"]: row for row in self.rows}
+        result = []
+        for row in rows if isinstance(rows, list) else [rows]:
+            if row.get("id") in by_id:
+                by_id[row["id"]].update(row)
+                result.append(dict(by_id[row["id"]]))
+            else:
+                result.extend(self.insert([row]))
+        return result
+
+
+class FakeRpc:
+    def __init__(self, client: "FakeSupabaseClient", fn: str, params: Dict[str, Any]):
+        self.client, self.fn, self.params = client, fn, params
+
+    def execute(self) -> FakeResponse:
+        self.client.round_trips += 1
+        handler = self.client.rpc_handlers[self.fn]
+        with self.client.lock:
+            return FakeResponse(handler(self.client, **self.params))
+
+
+class FakeSupabaseClient:
+    """Minimal in-memory replacement for `supabase.Client`."""
+
+    def __init__(self):
+        self.tables: Dict[str, FakeTable] = {}
+        self.rpc_handlers: Dict[str, Any] = {
+            "bulk_update_leads": bulk_update_leads,
+            "claim_leads": claim_leads,
+            "claim_leads_by_id": claim_leads_by_id,
+            "renew_lead_leases": renew_lead_leases,
+            "release_leads": release_leads,
+            "match_enriched_leads": match_enriched_leads,
+            "take_over_enrichment_jobs": take_over_enrichment_jobs,
+        }
+        self.round_trips = 0
+        self.lock = threading.Lock()
+
+    def table(self, name: str) -> FakeQuery:
+        if name not in self.tables:
+            self.tables[name] = FakeTable(self)
+        return FakeQuery(self.tables[name])
+
+    def rpc(self, fn: str, params: Dict[str, Any]) -> FakeRpc:
+        return FakeRpc(self, fn, params)
+
+
+def bulk_update_leads(client: FakeSupabaseClient, payload: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """In-memory version of the `bulk_update_leads` function in supabase.sql."""
+    rows = {row["id"]: row for row in client.tables["leads_table"].rows}
+    updated = []
+    for item in payload:
+        item = dict(item)
+        row = rows.get(item["id"])
+        if row is None:
+            continue
+        if "claimed_by_expected" in item and row.get("claimed_by") != item.pop("claimed_by_expected"):
+            continue
+        row.update(item)
+        updated.append({"lead_id": item["id"]})
+    return updated
+
+
+def claim_leads(client: FakeSupabaseClient, worker_id: str, batch_size: int, lease_seconds: int) -> List[Dict[str, Any]]:
+    """In-memory version of the `claim_leads` function in supabase.sql."""
+    now = datetime.now(timezone.utc)
+    claimed = []
+    for row in sorted(client.tables["leads_table"].rows, key=lambda row: row["id"]):
+        if len(claimed) == batch_size:
+            break
+        if row.get("enrichment_flag") or (row.get("enrichment_status") == "processing" and not _expired(row, now)):
+            continue
+        claimed.append(_claim(row, worker_id, now, lease_seconds))
+    return claimed
+
+
+def claim_leads_by_id(client: FakeSupabaseClient, worker_id: str, lead_ids: List[int], lease_seconds: int) -> List[Dict[str, Any]]:
+    """In-memory version of the `claim_leads_by_id` function in supabase.sql."""
+    now = datetime.now(timezone.utc)
+    wanted = set(lead_ids)
+    return [
+        _claim(row, worker_id, now, lease_seconds)
+        for row in client.tables["leads_table"].rows
+        if row["id"] in wanted and not (row.get("enrichment_status") == "processing" and not _expired(row, now))
+    ]
+
+
+def _claim(row: Dict[str, Any], worker_id: str, now: datetime, lease_seconds: int) -> Dict[str, Any]:
+    claimed = {
+        "id": row["id"],
+        "company": row.get("company"),
+        "first_name": row.get("first_name"),
+        "last_name": row.get("last_name"),
+        "recovered": row.get("claimed_by") is not None,
+    }
+    row.update(
+        enrichment_status="processing",
+        status_before_claim=(
+            row.get("status_before_claim") if row.get("enrichment_status") == "processing"
+            else row.get("enrichment_status")
+        ),
+        claimed_by=worker_id,
+        lease_expires_at=(now + timedelta(seconds=lease_seconds)).isoformat(),
+    )
+    return claimed
+
+
+def renew_lead_leases(client: FakeSupabaseClient, worker_id: str, lead_ids: List[int], lease_seconds: int) -> List[Dict[str, Any]]:
+    """In-memory version of the `renew_lead_leases` function in supabase.sql."""
+    expires_at = (datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)).isoformat()
+    renewed = []
+    for row in _held(client, worker_id, lead_ids):
+        row["lease_expires_at"] = expires_at
+        renewed.append({"lead_id": row["id"]})
+    return renewed
+
+
+def release_leads(client: FakeSupabaseClient, worker_id: str, lead_ids: List[int]) -> List[Dict[str, Any]]:
+    """In-memory version of the `release_leads` function in supabase.sql."""
+    released = []
+    for row in _held(client, worker_id, lead_ids):
+        row.update(
+            enrichment_status=row.get("status_before_claim") or "pending",
+            status_before_claim=None, claimed_by=None, lease_expires_at=None,
+        )
+        released.append({"lead_id": row["id"]})
+    return released
+
+
+def match_enriched_leads(client: FakeSupabaseClient, lead_ids: List[int], max_age_seconds: int) -> List[Dict[str, Any]]:
+    """In-memory version of the `match_enriched_leads` function in supabase.sql."""
+    rows = client.tables["leads_table"].rows
+    by_id = {row["id"]: row for row in rows}
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+    matches = []
+    for lead_id in lead_ids:
+        lead = by_id.get(lead_id)
+        if lead is None:
+            continue
+        candidates = [
+            row for row in rows
+            if row["id"] != lead_id
+            and row.get("enrichment_status") == "Success"
+            and row.get("enriched_at") and datetime.fromisoformat(row["enriched_at"]) >= cutoff
+            and (_same_key(row, lead, "email_key") or _same_key(row, lead, "person_key"))
+        ]
+        if candidates:
+            best = max(candidates, key=lambda row: (_same_key(row, lead, "email_key"), row["enriched_at"]))
+            matches.append({
+                "lead_id": lead_id,
+                "matched_on": "email" if _same_key(best, lead, "email_key") else "name_company",
+                "source": dict(best),
+            })
+    return matches
+
+
+def take_over_enrichment_jobs(
+    client: FakeSupabaseClient, new_owner: str, stale_seconds: float, max_jobs: int
+) -> List[Dict[str, Any]]:
+    """In-memory version of the `take_over_enrichment_jobs` function in supabase.sql."""
+    client.table("enrichment_jobs")
+    now = datetime.now(timezone.utc)
+    taken = []
+    for job in sorted(client.tables["enrichment_jobs"].rows, key=lambda job: job["created_at"]):
+        if len(taken) == max_jobs:
+            break
+        heartbeat_at = job.get("heartbeat_at")
+        stale = heartbeat_at is None or datetime.fromisoformat(heartbeat_at) < now - timedelta(seconds=stale_seconds)
+        if job.get("status") in ("queued", "running") and stale:
+            job.update(owner=new_owner, heartbeat_at=now.isoformat())
+            taken.append(dict(job))
+    return taken
+
+
+def _same_key(row: Dict[str, Any], lead: Dict[str, Any], column: str) -> bool:
+    return row.get(column) is not None and row.get(column) == lead.get(column)
+
+
+def _held(client: FakeSupabaseClient, worker_id: str, lead_ids: List[int]) -> List[Dict[str, Any]]:
+    wanted = set(lead_ids)
+    return [
+        row for row in client.tables["leads_table"].rows
+        if row["id"] in wanted and row.get("claimed_by") == worker_id and row.get("enrichment_status") == "processing"
+    ]
+
+
+def _expired(row: Dict[str, Any], now: datetime) -> bool:
+    return row.get("lease_expires_at") is None or datetime.fromisoformat(row["lease_expires_at"]) < now
+
+
+def _normalize(value: Any) -> Any:
+    """PostgREST compares filter values as text, so 'false' matches False."""
+    if isinstance(value, bool):
+        return str(value).lower()
+    return value
+
+
+def _matches(value: Any, op: str, operand: str) -> bool:
+    if op == "is":
+        return value is None if operand == "null" else _normalize(value) == operand
+    if value is None:
+        return False
+    if op == "eq":
+        return str(_normalize(value)) == operand
+    value, operand = _comparable(value), _comparable(operand)
+    return value < operand if op == "lt" else value > operand
+
+
+def _comparable(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+    return value
+
+
+def seed_leads(client: FakeSupabaseClient, count: int, distinct_companies: int = 300) -> None:
+    """Insert `count` unenriched leads spread over `distinct_companies` companies."""
+    client.table("leads_table")
+    client.tables["leads_table"].insert([
+        {
+            "first_name": f"First{i}",
+            "last_name": f"Last{i}",
+            "email": f"lead{i}@company{i % distinct_companies}.com",
+            "company": f"Company {i % distinct_companies}",
+            "inquiry": "Interested in fintech solutions. " * 20,
+            "enrichment_flag": False,
+        }
+        for i in range(count)
+    ])
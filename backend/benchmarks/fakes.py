@@ -0,0 +1,267 @@
+"""
+In-memory stand-ins for Supabase, Gemini and the ADK agent graph used by the benchmarks.
+
+The Supabase fakes live in benchmarks.fake_supabase and are re-exported here. FakeGemini
+answers model calls of the real agents with the sample reports in benchmarks/reports;
+ReplayGemini answers them with recorded responses (benchmarks/recordings), which
+RecordingModel captures from live calls.
+"""
+import asyncio
+import json
+import random
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.events import Event, EventActions
+from google.adk.models import BaseLlm, Gemini, LlmResponse
+from google.genai import errors, types
+
+from benchmarks.fake_supabase import (  # noqa: F401
+    FakeResponse,
+    FakeQuery,
+    FakeRpc,
+    FakeSupabaseClient,
+    FakeTable,
+    bulk_update_leads,
+    seed_leads,
+)
+from src.utils.model_routing import TieredModel
+from src.utils.rate_limiter import RateLimitedModel, get_rate_limiter
+
+
+class StubLeadAgent(BaseAgent):
+    """
+    Agent that sleeps instead of calling Gemini.
+
+    Each of the `model_calls` fake calls takes `latency / model_calls` seconds; the
+    first three write `company_info`, `person_info` and `Lead_enriched` like the real
+    pipeline does. With `prompt_tokens`/`completion_tokens`, their events report that
+    token usage like model responses do.
+    """
+
+    latency: float = 1.0
+    model_calls: int = 3
+    model: str = "gemini-2.0-flash"
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    async def _run_async_impl(self, ctx):
+        state = ctx.session.state
+        outputs = [
+            ("company_info", f"### Firmographics\n- **Company Name:** {state.get('company_name', '')}"),
+            ("person_info", f"### Professional Profile\n- **Full Name:** {state.get('person_name', '')}"),
+            ("Lead_enriched", {
+                "company_name": state.get("company_name", ""),
+                "person_full_name": state.get("person_name", ""),
+                "company_industry": "Finance",
+            }),
+        ]
+        for call in range(self.model_calls):
+            limiter = get_rate_limiter(self.model)
+            acquired_limit = await limiter.acquire()
+            try:
+                await asyncio.sleep(self.latency / self.model_calls)
+            finally:
+                await limiter.release(acquired_limit)
+            if call < len(outputs):
+                key, value = outputs[call]
+                yield Event(
+                    author=self.name,
+                    invocation_id=ctx.invocation_id,
+                    actions=EventActions(state_delta={key: value}),
+                    usage_metadata=types.GenerateContentResponseUsageMetadata(
+                        prompt_token_count=self.prompt_tokens, candidates_token_count=self.completion_tokens
+                    ) if self.prompt_tokens or self.completion_tokens else None,
+                )
+
+
+REPORTS = Path(__file__).parent / "reports"
+
+
+class FakeGemini(BaseLlm):
+    """
+    Model that sleeps `latency` seconds and answers with a fixed text instead of calling Gemini.
+
+    Token usage is estimated at four characters per token, and answers of agents with
+    tools report `searches` google_search queries, so the metrics callbacks record
+    the same series as with the real model.
+
+    Throttling can be injected: calls beyond `capacity` concurrent ones fail with 429
+    RESOURCE_EXHAUSTED, and a share `error_rate` of calls fails with 503 UNAVAILABLE.
+    A share `weak_rate` of calls is answered with `weak_text` (e.g. an incomplete report).
+    `latency_per_prompt_token` adds prefill time proportional to the prompt size.
+    """
+
+    text: str = ""
+    weak_text: str = ""
+    weak_rate: float = 0.0
+    latency: float = 0.0
+    latency_per_prompt_token: float = 0.0
+    searches: int = 0
+    capacity: int = 0
+    error_rate: float = 0.0
+    in_flight: int = 0
+    calls: int = 0
+    rejected: int = 0
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        self.calls += 1
+        if self.capacity and self.in_flight >= self.capacity:
+            self.rejected += 1
+            await asyncio.sleep(self.latency / 10)
+            raise errors.ClientError(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": "Quota exceeded"}})
+        if self.error_rate and random.random() < self.error_rate:
+            self.rejected += 1
+            raise errors.ServerError(503, {"error": {"code": 503, "status": "UNAVAILABLE", "message": "Overloaded"}})
+        prompt = str(llm_request.config.system_instruction or "") + str(llm_request.contents)
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(self.latency + len(prompt) // 4 * self.latency_per_prompt_token)
+        finally:
+            self.in_flight -= 1
+        text = self.weak_text if self.weak_rate and random.random() < self.weak_rate else self.text
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4
+            ),
+            grounding_metadata=(
+                types.GroundingMetadata(web_search_queries=[f"query {i}" for i in range(self.searches)])
+                if self.searches else None
+            ),
+        )
+
+
+def install_fake_models(agent: BaseAgent, latency: float = 0.0, sample: str = "tabby", searches: int = 3) -> None:
+    """
+    Replace the model of every LlmAgent under `agent` with FakeGemini.
+
+    Research agents answer with the `<sample>_company.md` / `<sample>_person.md`
+    reports, the structuring agent with `<sample>_expected.json`. Agents with tiered
+    routing get one FakeGemini per tier.
+    """
+    answers = {
+        "company_info": (REPORTS / f"{sample}_company.md").read_text(),
+        "person_info": (REPORTS / f"{sample}_person.md").read_text(),
+        "Lead_enriched": json.dumps(json.loads((REPORTS / f"{sample}_expected.json").read_text())),
+    }
+    _install_backends(agent, lambda sub_agent, model: FakeGemini(
+        model=model,
+        text=answers[sub_agent.output_key],
+        latency=latency,
+        searches=searches if sub_agent.tools else 0,
+    ))
+
+
+RECORDINGS = Path(__file__).parent / "recordings"
+
+
+class ReplayGemini(BaseLlm):
+    """
+    Model that answers with responses recorded from live calls of one agent.
+
+    The recording is picked by a hash of the system instruction, which holds the
+    lead's company and person, so every call for the same lead replays the same
+    response. Each replay sleeps the recorded latency times `latency_scale` and
+    reports the recorded token usage and google_search queries.
+    """
+
+    recordings: List[Dict[str, Any]] = []
+    latency_scale: float = 1.0
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        self.calls += 1
+        key = str(llm_request.config.system_instruction or "") if llm_request.config else ""
+        recording = self.recordings[zlib.crc32(key.encode()) % len(self.recordings)]
+        await asyncio.sleep(recording["latency_seconds"] * self.latency_scale)
+        queries = recording.get("search_queries") or []
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=recording["text"])]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=recording["prompt_tokens"],
+                candidates_token_count=recording["completion_tokens"],
+            ),
+            grounding_metadata=types.GroundingMetadata(web_search_queries=queries) if queries else None,
+        )
+
+
+class RecordingModel(BaseLlm):
+    """Model wrapper that appends every answer of `backend` to the JSONL file `path`."""
+
+    backend: BaseLlm
+    agent: str
+    path: str
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        started_at = time.monotonic()
+        parts: List[str] = []
+        usage = grounding = None
+        async for response in self.backend.generate_content_async(llm_request, stream):
+            parts.extend(part.text for part in (response.content.parts if response.content else []) if part.text)
+            usage = response.usage_metadata or usage
+            grounding = response.grounding_metadata or grounding
+            yield response
+        record = {
+            "agent": self.agent,
+            "model": self.model,
+            "latency_seconds": round(time.monotonic() - started_at, 3),
+            "text": "".join(parts),
+            "prompt_tokens": (usage.prompt_token_count or 0) if usage else 0,
+            "completion_tokens": (usage.candidates_token_count or 0) if usage else 0,
+            "search_queries": list(grounding.web_search_queries or []) if grounding else [],
+        }
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def load_recordings(path: Path = RECORDINGS / "pipeline.jsonl") -> Dict[str, List[Dict[str, Any]]]:
+    """Read a JSONL file of recorded responses, grouped by agent name."""
+    recordings: Dict[str, List[Dict[str, Any]]] = {}
+    for line in Path(path).read_text().splitlines():
+        if line.strip():
+            record = json.loads(line)
+            recordings.setdefault(record["agent"], []).append(record)
+    return recordings
+
+
+def install_replay_models(agent: BaseAgent, recordings: Dict[str, List[Dict[str, Any]]], latency_scale: float = 1.0) -> None:
+    """Replace the model of every LlmAgent under `agent` with ReplayGemini over its recordings."""
+    missing = [a.name for a in _llm_agents(agent) if not recordings.get(a.name)]
+    if missing:
+        raise ValueError(f"No recorded responses for {', '.join(missing)}")
+    _install_backends(agent, lambda sub_agent, model: ReplayGemini(
+        model=model, recordings=recordings[sub_agent.name], latency_scale=latency_scale
+    ))
+
+
+def install_recorders(agent: BaseAgent, path: Path) -> None:
+    """Record the live Gemini answers of every LlmAgent under `agent` to `path`."""
+    _install_backends(agent, lambda sub_agent, model: RecordingModel(
+        model=model, backend=Gemini(model=model), agent=sub_agent.name, path=str(path)
+    ))
+
+
+def _install_backends(agent: BaseAgent, make: Callable[[LlmAgent, str], BaseLlm]) -> None:
+    """Give every LlmAgent under `agent` the backend model `make(agent, model_name)`."""
+    for sub_agent in _llm_agents(agent):
+        # Keep the routing, limiter and retries in the loop; only the API call is replaced.
+        # The Gemini model name is kept too: ADK only allows google_search on Gemini 2 models.
+        if isinstance(sub_agent.model, TieredModel):
+            sub_agent.model.configure()
+            sub_agent.model.backends = {tier: make(sub_agent, tier) for tier in sub_agent.model.tiers}
+        elif isinstance(sub_agent.model, RateLimitedModel):
+            sub_agent.model.backend = make(sub_agent, sub_agent.model.model)
+        else:
+            sub_agent.model = make(sub_agent, sub_agent.canonical_model.model)
+
+
+def _llm_agents(agent: BaseAgent) -> List[LlmAgent]:
+    return [a for a in (agent, *_descendants(agent)) if isinstance(a, LlmAgent)]
+
+
+def _descendants(agent: BaseAgent) -> List[BaseAgent]:
+    return [d for child in agent.sub_agents for d in (child, *_descendants(child))]
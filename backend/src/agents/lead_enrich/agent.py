@@ -1,8 +1,10 @@
 from google.adk.agents import ParallelAgent, SequentialAgent
+from src.agents.lead_enrich.subagents.company_news_agent import company_news_agent
 from src.agents.lead_enrich.subagents.company_research_agent import company_research_agent
 from src.agents.lead_enrich.subagents.person_research_agent import person_research_agent
 from src.agents.lead_enrich.subagents.structuring_agent import structuring_agent
 from google.adk.agents.callback_context import CallbackContext 
+from src.utils.metrics import record_agent_time, start_agent_timer
 import logging
 
         
@@ -23,13 +25,17 @@ def set_lead_info(callback_context: CallbackContext):
 # --- 1. Create Parallel Agent to gather information concurrently ---
 lead_info_gatherer = ParallelAgent(
     name="lead_info_gatherer",
-    sub_agents=[company_research_agent, person_research_agent],
-    before_agent_callback= set_lead_info
+    # company_news_agent only runs on refreshes that need news but not the full company profile.
+    sub_agents=[company_research_agent, company_news_agent, person_research_agent],
+    before_agent_callback=[set_lead_info, start_agent_timer],
+    after_agent_callback=record_agent_time,
 )
 
 # --- 2. Create Sequential Pipeline to gather info in parallel, then synthesize ---
 root_agent = SequentialAgent(
     name="lead_scoring_agent",
     sub_agents=[lead_info_gatherer, structuring_agent],
+    before_agent_callback=start_agent_timer,
+    after_agent_callback=record_agent_time,
 )
 
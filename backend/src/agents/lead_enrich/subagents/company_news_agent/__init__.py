@@ -0,0 +1 @@
+from .agent import company_news_agent
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+This agent is responsible for refreshing only the recent news and hiring trends of a Company.
+"""
+
+from google.adk.agents import LlmAgent
+from google.adk.tools import google_search
+from src.utils.lead_freshness import run_for_news_only_refresh
+from src.utils.metrics import record_agent_time, record_model_call, start_agent_timer, start_model_timer
+from src.utils.rate_limiter import RateLimitedModel
+
+# --- Constants ---
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# Company News Agent
+company_news_agent = LlmAgent(
+    name="company_news_agent",
+    model=RateLimitedModel(model=GEMINI_MODEL),
+    instruction="""**Persona:** You are a professional market researcher tracking company developments. Your goal is to report what changed recently at a given company, based *only* on verifiable information from trusted sources.
+
+**Task:** Research the latest news and hiring activity of the company '{company_name}'.
+
+**Instructions:**
+1. **Search Strategy:**
+   - Use the `google_search` tool, prioritizing the company's newsroom, its LinkedIn page and careers page, and reputable business news (e.g., Bloomberg, Reuters, TechCrunch).
+   - Only consider the last 12 months.
+2. **Data Extraction:**
+   - Extract only information that directly matches the data points below.
+   - If a data point is unavailable after a thorough search, explicitly state 'Not Found'.
+3. **Citation Requirement:**
+   - For each data point, include a brief citation (e.g., 'Source: Company Website, accessed August 2025').
+4. **Output Format:**
+   - Return a single markdown document with the exact headings below. Do not add extra fields or speculative data.
+
+**Data Points to Collect:**
+
+### Company Intelligence
+- **Company Name:** The official legal name.
+- **Hiring Trends:** Recent hiring activities (e.g., 'Hiring AI engineers', 'Hiring freeze announced').
+- **Recent News (Last 12 Months):** 2-3 significant events (e.g., 'Launched AI platform, Jan 2025').
+
+```""",
+    description="Refreshes the recent news and hiring trends of a company using Google Search.",
+    tools=[google_search],
+    # Fills the same slot as the full company report, which it replaces on news-only refreshes.
+    output_key="company_info",
+    before_agent_callback=[run_for_news_only_refresh, start_agent_timer],
+    after_agent_callback=record_agent_time,
+    before_model_callback=start_model_timer,
+    after_model_callback=record_model_call,
+)
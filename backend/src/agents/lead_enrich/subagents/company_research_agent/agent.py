@@ -2,16 +2,48 @@
 This agent is responsible for gathering and analyzing Company information.
 """
 
+from typing import Optional
 from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
 from google.adk.tools import google_search
+from google.genai import types
+from src.utils.company_cache import get_company_cache
+from src.utils.lead_freshness import skip_unless_refreshing
+from src.utils.metrics import record_agent_time, record_model_call, start_agent_timer, start_model_timer
+from src.utils.model_routing import TieredModel, score_company_report
 
 # --- Constants ---
 GEMINI_MODEL = "gemini-2.0-flash"
+# Single tier by default: the lighter models cost as much per token, and every
+# escalation pays for the grounded search twice. MODEL_TIERS can add cheaper tiers
+# (see src.utils.model_routing).
+MODEL_TIERS = [GEMINI_MODEL]
+
+
+def use_cached_company_info(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Callback to skip the research when a fresh report for the company is cached"""
+    if callback_context.state.get("force_refresh"):
+        return None
+    report = get_company_cache().get(callback_context.state.get("company_name", ""))
+    if report is None:
+        return None
+    callback_context.state["company_info"] = report
+    return types.Content(role="model", parts=[types.Part(text=report)])  # skip the agent
+
+
+def cache_company_info(callback_context: CallbackContext) -> None:
+    """Callback to store the freshly researched company report in the cache"""
+    report = callback_context.state.get("company_info")
+    if report:
+        get_company_cache().set(callback_context.state.get("company_name", ""), report)
+    return None
 
 # Company Research Agent
 company_research_agent = LlmAgent(
     name="company_research_agent",
-    model=GEMINI_MODEL,
+    model=TieredModel(
+        model=GEMINI_MODEL, agent="company_research_agent", default_tiers=MODEL_TIERS, scorer=score_company_report
+    ),
     instruction="""**Persona:** You are a professional market researcher with expertise in business intelligence. Your goal is to produce a concise, factual report on a given company based *only* on verifiable, recent information from trusted sources.
 
 **Task:** Research the company '{company_name}' and compile a detailed report based on the data points below. 
@@ -58,4 +90,9 @@ company_research_agent = LlmAgent(
     description="Gathers and analyzes company information using Google Search, prioritizing recent and authoritative sources.",
     tools=[google_search],
     output_key="company_info",
+    # A skip or cache hit ends the agent before the timer starts, so only real research is timed.
+    before_agent_callback=[skip_unless_refreshing("company_profile"), use_cached_company_info, start_agent_timer],
+    after_agent_callback=[cache_company_info, record_agent_time],
+    before_model_callback=start_model_timer,
+    after_model_callback=record_model_call,
 )
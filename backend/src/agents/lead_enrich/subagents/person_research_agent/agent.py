@@ -5,14 +5,23 @@ This agent is responsible for gathering and analyzing Person information.
 
 from google.adk.agents import LlmAgent
 from google.adk.tools import google_search
+from src.utils.lead_freshness import skip_unless_refreshing
+from src.utils.metrics import record_agent_time, record_model_call, start_agent_timer, start_model_timer
+from src.utils.model_routing import TieredModel, score_person_report
 
 # --- Constants ---
 GEMINI_MODEL = "gemini-2.0-flash"
+# Single tier by default: the lighter models cost as much per token, and every
+# escalation pays for the grounded search twice. MODEL_TIERS can add cheaper tiers
+# (see src.utils.model_routing).
+MODEL_TIERS = [GEMINI_MODEL]
 
 # Person Research Agent
 person_research_agent = LlmAgent(
     name="person_research_agent",
-    model=GEMINI_MODEL,
+    model=TieredModel(
+        model=GEMINI_MODEL, agent="person_research_agent", default_tiers=MODEL_TIERS, scorer=score_person_report
+    ),
     instruction="""**Persona:** You are a professional recruitment consultant specializing in executive profiling. Your task is to create a concise, professional brief on a person associated with a specific company, using only verifiable, recent data.
 
 **Task:** Research the person named '{person_name}' who is employed at or associated with the company '{company_name}'.
@@ -55,4 +64,8 @@ person_research_agent = LlmAgent(
     description="Gathers and analyzes person information for a specific company, prioritizing LinkedIn and company websites.",
     tools=[google_search],
     output_key="person_info",
+    before_agent_callback=[skip_unless_refreshing("person_profile"), start_agent_timer],
+    after_agent_callback=record_agent_time,
+    before_model_callback=start_model_timer,
+    after_model_callback=record_model_call,
 )
\ No newline at end of file
@@ -1,19 +1,88 @@
 """
 This agent is responsible for structring the gathered data in a structured output.
 """
+import os
+from typing import Optional
 from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
 import warnings
+from src.config.logging_config import logger
 from src.schemas.lead import DataEnrichment
+from src.utils.lead_freshness import fields_of
+from src.utils.metrics import metrics, record_agent_time, record_model_call, start_agent_timer, start_model_timer
+from src.utils.model_routing import TieredModel, score_structured_output
+from src.utils.report_parser import (
+    COMPANY_LABELS,
+    MIN_LABEL_COVERAGE,
+    PERSON_LABELS,
+    compact_report,
+    estimate_tokens,
+    parse_reports,
+)
 
 warnings.filterwarnings('ignore')
 
 # --- Constants ---
 GEMINI_MODEL = "gemini-2.0-flash"
+# Cheapest first; the next model is only used when an answer is incomplete (see src.utils.model_routing).
+MODEL_TIERS = ["gemini-2.0-flash-lite", GEMINI_MODEL]
+
+
+def parse_is_trusted(parsed: Optional[DataEnrichment], coverage: float) -> bool:
+    """Whether a local parse of the reports can replace the structuring LLM call"""
+    return (
+        parsed is not None
+        and coverage >= MIN_LABEL_COVERAGE
+        and bool(parsed.company_name)
+        and bool(parsed.person_full_name)
+    )
+
+
+def use_parsed_reports(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Callback to skip the LLM call when the reports follow the expected format"""
+    state = callback_context.state
+    refresh_groups = state.get("refresh_groups")
+    parsed, coverage = parse_reports(
+        state.get("company_info", ""),
+        state.get("person_info", ""),
+        company_name=state.get("company_name", ""),
+        person_name=state.get("person_name", ""),
+        expected_fields=fields_of(refresh_groups) if refresh_groups is not None else None,
+    )
+    if not parse_is_trusted(parsed, coverage):
+        metrics.increment("lead_enrichment_structuring_total", path="llm")
+        return None
+    metrics.increment("lead_enrichment_structuring_total", path="parser")
+    state["Lead_enriched"] = parsed.model_dump()
+    return types.Content(role="model", parts=[types.Part(text=parsed.model_dump_json())])  # skip the agent
+
+
+def compact_reports(callback_context: CallbackContext) -> None:
+    """Callback to shrink the reports templated into the prompt (disable with STRUCTURING_COMPACTION=0)"""
+    state = callback_context.state
+    company_report = state.get("company_info", "") or ""
+    person_report = state.get("person_info", "") or ""
+    raw_tokens = estimate_tokens(company_report) + estimate_tokens(person_report)
+    if os.getenv("STRUCTURING_COMPACTION", "1") != "0":
+        company_report = compact_report(company_report, COMPANY_LABELS)
+        person_report = compact_report(person_report, PERSON_LABELS)
+    state["structuring_company_info"] = company_report
+    state["structuring_person_info"] = person_report
+    compact_tokens = estimate_tokens(company_report) + estimate_tokens(person_report)
+    metrics.observe("lead_enrichment_structuring_input_tokens", raw_tokens, stage="raw")
+    metrics.observe("lead_enrichment_structuring_input_tokens", compact_tokens, stage="compacted")
+    logger.info(
+        f"Structuring input for {state.get('company_name', '')}: "
+        f"{raw_tokens} report tokens, {compact_tokens} after compaction"
+    )
 
 # Structuring Agent
 structuring_agent = LlmAgent(
     name="StructuringAgent",
-    model=GEMINI_MODEL,
+    model=TieredModel(
+        model=GEMINI_MODEL, agent="StructuringAgent", default_tiers=MODEL_TIERS, scorer=score_structured_output
+    ),
     instruction=(
         """**Persona:** You are a meticulous data processing agent. Your sole purpose is to extract information from provided text and structure it perfectly into a JSON object according to a given schema.
 
@@ -28,10 +97,10 @@ structuring_agent = LlmAgent(
         **Inputs:**
 
         ### Company Report ###
-        {company_info}
+        {structuring_company_info}
         
         ### Person Report ###
-        {person_info}
+        {structuring_person_info}
 
         **Output:**
         Should follow DataEnrichment schema
@@ -39,5 +108,9 @@ structuring_agent = LlmAgent(
     ),
     description="Extracts and structures data from company and person research into a JSON object.",
     output_schema=DataEnrichment,
-    output_key="Lead_enriched"
+    output_key="Lead_enriched",
+    before_agent_callback=[use_parsed_reports, compact_reports, start_agent_timer],
+    after_agent_callback=record_agent_time,
+    before_model_callback=start_model_timer,
+    after_model_callback=record_model_call,
 )
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Process-wide resources shared by the API routes.
+
+They are created once in the app lifespan (see `src.main`) and stored on `app.state`,
+so requests reuse one Supabase client (and its pooled HTTP connections), one ADK
+runner/session service, and one job queue instead of building them per request.
+
+Importing google-adk and building the agent graph takes seconds, so the processor is
+built by a `ProcessorLoader` off the startup path (see AGENT_WARMUP), and Langfuse is
+initialised in the background: routes that do not enrich are served right away.
+"""
+import asyncio
+import os
+from typing import TYPE_CHECKING, Optional
+from fastapi import Request
+from src.config.langfuse_config import init_langfuse
+from src.config.logging_config import logger
+from src.utils.enrichment_jobs import EnrichmentJobQueue
+from supabase import Client
+
+if TYPE_CHECKING:
+    from src.utils.lead_enrichment import LeadEnrichmentProcessor
+
+
+WARMUP_MODES = ("background", "lazy", "eager")
+
+
+class ProcessorLoader:
+    """
+    Builds the shared `LeadEnrichmentProcessor` once, in a worker thread.
+
+    Usage:
+        loader = ProcessorLoader()
+        loader.start()                  # begin importing google-adk in the background
+        processor = await loader.get()  # waits for the build if it is still running
+    """
+
+    def __init__(self):
+        self.langfuse = None
+        self._task: Optional[asyncio.Task] = None
+        self._processor: Optional["LeadEnrichmentProcessor"] = None
+
+    def start(self) -> None:
+        """Start building the processor unless it is already built or being built."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(asyncio.to_thread(self._build))
+
+    async def get(self) -> "LeadEnrichmentProcessor":
+        """Return the processor, building it first if needed."""
+        self.start()
+        # Shielded so that a cancelled request does not cancel the build shared with others.
+        return await asyncio.shield(self._task)
+
+    def set_langfuse(self, langfuse) -> None:
+        """Export pipeline runs to Langfuse from now on (also for an already built processor)."""
+        self.langfuse = langfuse
+        if self._processor is not None:
+            self._processor.langfuse = langfuse
+
+    def _build(self) -> "LeadEnrichmentProcessor":
+        # Imports google-adk and builds the agent graph.
+        from src.utils.lead_enrichment import LeadEnrichmentProcessor
+
+        self._processor = LeadEnrichmentProcessor(langfuse=self.langfuse)
+        logger.info("Lead enrichment pipeline ready")
+        return self._processor
+
+
+async def init_telemetry(loader: ProcessorLoader) -> None:
+    """Initialise Langfuse (which checks the credentials over the network) without blocking startup."""
+    try:
+        loader.set_langfuse(await asyncio.to_thread(init_langfuse))
+    except Exception as e:
+        logger.warning(f"Langfuse initialisation failed, export disabled: {e}")
+
+
+async def warm_up(loader: ProcessorLoader) -> None:
+    """
+    Prepare the processor according to AGENT_WARMUP.
+
+    "background" (default) builds it right after startup without delaying it, "lazy"
+    on the first request that enriches, "eager" before the app starts serving.
+    """
+    mode = os.getenv("AGENT_WARMUP", "background")
+    if mode not in WARMUP_MODES:
+        raise ValueError(f"AGENT_WARMUP must be one of {', '.join(WARMUP_MODES)}, got {mode!r}")
+    if mode == "eager":
+        await loader.get()
+    elif mode == "background":
+        loader.start()
+
+
+def get_supabase(request: Request) -> Client:
+    return request.app.state.supabase
+
+
+async def get_processor(request: Request) -> "LeadEnrichmentProcessor":
+    return await request.app.state.processor_loader.get()
+
+
+def get_job_queue(request: Request) -> EnrichmentJobQueue:
+    return request.app.state.job_queue
@@ -1,39 +1,58 @@
-import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
-from typing import List
+import asyncio
+from supabase import Client
+from src.api.dependencies import get_job_queue, get_supabase
 from src.schemas.lead import Contact
 from src.config.logging_config import logger
-from fastapi import HTTPException, APIRouter
-
-load_dotenv()
+from src.utils.enrichment_jobs import EnrichmentJobQueue
+from src.utils.lead_io import DEFAULT_CHUNK_SIZE, FORMATS, contact_row, import_leads, iter_text_lines
+from fastapi import Depends, HTTPException, APIRouter, Request, Response
 
 router = APIRouter()
 
-# Initialize Supabase client
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
-
 @router.post("/save-contact")
-async def save_contact(contact: Contact):
+async def save_contact(contact: Contact, supabase: Client = Depends(get_supabase)):
     try:
-        data_to_insert = {
-            "first_name": contact.firstName,
-            "last_name": contact.lastName,
-            "email": contact.email,
-            "contact_number": contact.contactNumber,
-            "city": contact.city,
-            "country": contact.country,
-            "company": contact.company,
-            "interested_in": ", ".join(contact.interestedIn),
-            "inquiry": contact.inquiry,
-            "enrichment_flag": False
-        }
-        response = supabase.table('leads_table').insert([data_to_insert]).execute()
+        data_to_insert = contact_row(contact)
+        query = supabase.table('leads_table').insert([data_to_insert])
+        response = await asyncio.to_thread(query.execute)
         inserted_id = response.data[0]['id']  # Extract the auto-generated ID
         logger.info(f"Saved contact: {contact.email}, ID: {inserted_id}")
         return {"message": "Contact saved successfully", "lead_id": inserted_id}
     except Exception as e:
         logger.error(f"Error saving contact: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/import-contacts")
+async def import_contacts(
+    request: Request,
+    response: Response,
+    format: str = "csv",
+    enrich: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    supabase: Client = Depends(get_supabase),
+    job_queue: EnrichmentJobQueue = Depends(get_job_queue),
+):
+    """
+    Bulk insert the contacts of a CSV or JSONL request body.
+
+    The body is streamed, validated and inserted in chunks; invalid rows are skipped
+    and listed in the response. With `enrich=true` an enrichment job is submitted for
+    every imported lead, like `/enrich-lead`, and the response is 202 with their
+    `job_ids` under `enrichment`; leads that do not fit in the job queue are counted
+    as `not_queued` and left for the next batch run (large imports are better run
+    with `python -m src.utils.lead_io import <file> --enrich`).
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be positive")
+    try:
+        summary = await import_leads(
+            iter_text_lines(request.stream()), format, supabase, chunk_size, job_queue=job_queue if enrich else None
+        )
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"body is not valid UTF-8: {e}")
+    if enrich:
+        response.status_code = 202
+    return summary
@@ -1,16 +1,156 @@
-from fastapi import APIRouter
+import asyncio
+import json
+import os
+from typing import TYPE_CHECKING, Awaitable, Callable
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from supabase import Client
+from src.api.dependencies import get_job_queue, get_processor, get_supabase
 from src.schemas.lead import EnrichedLead
-from src.utils.lead_enrichment import LeadEnrichmentProcessor, update_lead_in_supabase
-from src.config.supebase_config import get_supabase_client
-from src.config.langfuse_config import init_langfuse
+from src.utils.entity_index import reuse_enrichment
+from src.utils.enrichment_jobs import (
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_WORKERS,
+    EnrichmentJobQueue,
+    QueueFullError,
+    create_job_store,
+)
+from src.utils.lead_io import FORMATS, export_leads
+from src.utils.lead_queue import LeadClaimedError, claimed_lead
+from src.utils.lead_writer import update_lead_in_supabase
+
+if TYPE_CHECKING:
+    from src.utils.lead_enrichment import LeadEnrichmentProcessor
 
 router = APIRouter()
-init_langfuse()
-
-@router.post("/enrich-lead")
-async def enrich_lead(lead: EnrichedLead):
-    processor = LeadEnrichmentProcessor()
-    enriched_data = await processor.enrich_single_lead(lead.company_name, lead.person_name)
-    supabase = get_supabase_client()
-    update_lead_in_supabase(supabase, lead.lead_id, enriched_data)
-    return enriched_data
\ No newline at end of file
+
+
+def format_sse(event: str, data) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def create_job_queue(
+    get_processor_fn: Callable[[], Awaitable["LeadEnrichmentProcessor"]], supabase: Client
+) -> EnrichmentJobQueue:
+    """
+    Build the job queue whose workers enrich leads with the shared processor and client.
+
+    The processor is awaited per job, so jobs accepted while it is still being built
+    wait for it instead of delaying startup. The lead is claimed while it is enriched;
+    a job for a lead another worker is enriching fails with `LeadClaimedError`.
+    """
+
+    async def enrich_and_save(lead: EnrichedLead):
+        processor = await get_processor_fn()
+        async with claimed_lead(supabase, lead.lead_id) as worker_id:
+            if worker_id is None:
+                raise LeadClaimedError(f"Lead {lead.lead_id} is being enriched by another worker")
+            enriched_data = await processor.enrich_single_lead(
+                lead.company_name, lead.person_name, force_refresh=lead.force_refresh
+            )
+            await asyncio.to_thread(update_lead_in_supabase, supabase, lead.lead_id, enriched_data, worker_id)
+        return enriched_data
+
+    return EnrichmentJobQueue(
+        enrich_and_save,
+        create_job_store(lambda: supabase),
+        max_queue_size=int(os.getenv("ENRICHMENT_JOB_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)),
+        workers=int(os.getenv("ENRICHMENT_JOB_WORKERS", DEFAULT_WORKERS)),
+    )
+
+
+@router.post("/enrich-lead", status_code=202)
+async def enrich_lead(
+    lead: EnrichedLead,
+    response: Response,
+    job_queue: EnrichmentJobQueue = Depends(get_job_queue),
+    supabase: Client = Depends(get_supabase),
+):
+    """
+    Enqueue the enrichment of a lead (202 with the job), or, when the same person was
+    enriched recently, copy that enrichment right away (200 with the finished job).
+    """
+    if not lead.force_refresh:
+        result = await reuse_enrichment(supabase, lead.lead_id)
+        if result is not None:
+            job = await job_queue.record(lead, result)
+            response.status_code = 200
+            return {"job_id": job["id"], "status": job["status"]}
+    try:
+        job = await job_queue.submit(lead)
+    except QueueFullError as e:
+        return JSONResponse(status_code=503, content={"detail": str(e)}, headers={"Retry-After": "30"})
+    return {"job_id": job["id"], "status": job["status"]}
+
+
+@router.post("/enrich-lead/stream")
+async def stream_enrich_lead(
+    lead: EnrichedLead,
+    processor: "LeadEnrichmentProcessor" = Depends(get_processor),
+    supabase: Client = Depends(get_supabase),
+):
+    """Enrich a lead and stream each stage (company report, person report, structured fields, usage) as it finishes."""
+
+    async def events():
+        if not lead.force_refresh:
+            result = await reuse_enrichment(supabase, lead.lead_id)
+            if result is not None:
+                yield format_sse("structured", result)
+                yield format_sse("saved", {"lead_id": lead.lead_id})
+                return
+        async with claimed_lead(supabase, lead.lead_id) as worker_id:
+            if worker_id is None:
+                error = f"Lead {lead.lead_id} is being enriched by another worker"
+                yield format_sse("error", {"lead_id": lead.lead_id, "error_details": error})
+                return
+            enriched_data = {}
+            async for update in processor.stream_enrichment(
+                lead.company_name, lead.person_name, force_refresh=lead.force_refresh
+            ):
+                if update["stage"] in ("structured", "error"):
+                    enriched_data = update["data"]
+                elif update["stage"] == "usage":
+                    enriched_data = {**enriched_data, "usage": update["data"]}
+                yield format_sse(update["stage"], update["data"])
+            try:
+                await asyncio.to_thread(update_lead_in_supabase, supabase, lead.lead_id, enriched_data, worker_id)
+            except Exception as e:
+                yield format_sse("error", {"lead_id": lead.lead_id, "error_details": str(e)})
+                return
+        yield format_sse("saved", {"lead_id": lead.lead_id})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.get("/enrich-jobs/{job_id}")
+async def get_enrich_job(job_id: str, job_queue: EnrichmentJobQueue = Depends(get_job_queue)):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/enrich-jobs/{job_id}/events")
+async def stream_enrich_job(job_id: str, job_queue: EnrichmentJobQueue = Depends(get_job_queue)):
+    if await job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        async for job in job_queue.watch(job_id):
+            yield format_sse(job["status"], job)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.get("/export-leads")
+async def export_enriched_leads(format: str = "csv", supabase: Client = Depends(get_supabase)):
+    """Stream every enriched lead as CSV or JSONL."""
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_leads(supabase, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="enriched_leads.{format}"'},
+    )
@@ -2,19 +2,25 @@
 import os
 import base64
 from dotenv import load_dotenv
-from langfuse import get_client
+from src.config.logging_config import logger
 
 # Load environment variables from .env
 load_dotenv()
 
 def init_langfuse():
-    """Initialize and authenticate the Langfuse client with OpenTelemetry setup."""
+    """
+    Initialize and authenticate the Langfuse client with OpenTelemetry setup.
+
+    Returns None when the Langfuse credentials are not configured, so the app also runs
+    offline; metrics are still available at `/metrics`.
+    """
     public_key = os.getenv("LANGFUSE_PUBLIC_KEY")
     secret_key = os.getenv("LANGFUSE_SECRET_KEY")
     host = os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
 
     if not public_key or not secret_key:
-        raise ValueError("❌ Missing LANGFUSE_PUBLIC_KEY or LANGFUSE_SECRET_KEY in .env")
+        logger.warning("LANGFUSE_PUBLIC_KEY or LANGFUSE_SECRET_KEY missing in .env, Langfuse export disabled")
+        return None
 
     # Build Basic Auth header for OpenTelemetry
     auth_header = base64.b64encode(f"{public_key}:{secret_key}".encode()).decode()
@@ -23,14 +29,16 @@ def init_langfuse():
     os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"] = f"{host}/api/public/otel"
     os.environ["OTEL_EXPORTER_OTLP_HEADERS"] = f"Authorization=Basic {auth_header}"
 
-    # Initialize Langfuse client
+    # Initialize Langfuse client (imported here: langfuse pulls in OpenTelemetry)
+    from langfuse import get_client
+
     langfuse = get_client()
 
     # Verify connection
     if langfuse.auth_check():
-        print("Langfuse client authenticated successfully")
+        logger.info("Langfuse client authenticated successfully")
     else:
-        print("Langfuse authentication failed. Check your credentials.")
+        logger.warning("Langfuse authentication failed. Check your credentials.")
 
     return langfuse
 
@@ -1,11 +1,30 @@
-
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.api.routes.leads import router as leads_router
+from src.api.dependencies import ProcessorLoader, init_telemetry, warm_up
+from src.api.routes.leads import router as leads_router, create_job_queue
 from src.api.routes.contacts import router as contacts_router
+from src.api.routes.metrics import router as metrics_router
 from src.config.logging_config import configure_logging
+from src.config.supebase_config import get_supabase_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the resources shared by all requests (see src.api.dependencies)."""
+    app.state.supabase = get_supabase_client()
+    app.state.processor_loader = ProcessorLoader()
+    telemetry = asyncio.create_task(init_telemetry(app.state.processor_loader))
+    await warm_up(app.state.processor_loader)
+    app.state.job_queue = create_job_queue(app.state.processor_loader.get, app.state.supabase)
+    await app.state.job_queue.start()
+    yield
+    await app.state.job_queue.stop()
+    telemetry.cancel()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +37,7 @@ app.add_middleware(
 configure_logging()
 app.include_router(leads_router, prefix="/api")
 app.include_router(contacts_router, prefix="/api")
+app.include_router(metrics_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -21,6 +21,7 @@ class EnrichedLead(BaseModel):
     lead_id: int = Field(..., description="The unique ID of the lead in the Supabase leads_table")
     company_name: str = Field(..., description="The official name of the company associated with the lead")
     person_name: str = Field(..., description="Full name of the lead/contact person")
+    force_refresh: bool = Field(False, description="Research the company again even if a cached report is fresh")
 
 
 class DataEnrichment(BaseModel):
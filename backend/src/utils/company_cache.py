@@ -0,0 +1,169 @@
+"""
+Cache of company research reports.
+
+Most leads work for a small set of companies, so the `company_research_agent` report is
+cached per normalized company name. Entries expire after a TTL, the in-memory cache is
+bounded (least recently used entries are evicted first), and entries can optionally be
+persisted in a local SQLite file so they survive restarts and are shared by processes
+on the same host.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 10000
+
+_LEGAL_SUFFIXES = {
+    "inc", "incorporated", "llc", "ltd", "limited", "plc", "gmbh", "ag", "sa", "bv",
+    "corp", "corporation", "co", "company", "pjsc", "psc", "fz", "fzco", "fze", "pte",
+    "pvt", "group", "holding", "holdings",
+}
+
+
+def normalize_company_key(company: str) -> str:
+    """
+    Normalize a company name or domain into a cache key.
+
+    "Example Corp.", "example corp" and "https://www.example.com/about" all map to
+    "example".
+    """
+    key = company.strip().lower()
+    key = re.sub(r"^[a-z]+://", "", key)
+    key = re.sub(r"^www\.", "", key)
+    if re.fullmatch(r"[a-z0-9.-]+\.[a-z]{2,}(/.*)?", key):
+        # A domain: keep only the registrable name ("example.co.uk" -> "example").
+        key = key.split("/", 1)[0]
+        key = re.sub(r"(\.[a-z]{2,3})?\.[a-z]{2,}$", "", key)
+    words = re.sub(r"[^a-z0-9]+", " ", key).split()
+    while len(words) > 1 and words[-1] in _LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+class CompanyResearchCache:
+    """TTL + LRU cache of company reports, optionally backed by SQLite."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        path: Optional[str] = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl_seconds: Age after which a report is stale and researched again.
+            max_entries: Maximum number of reports kept in memory.
+            path: SQLite file to persist reports in; memory only when omitted.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "create table if not exists company_research_cache "
+                "(company_key text primary key, report text not null, stored_at real not null)"
+            )
+            self._db.commit()
+
+    def get(self, company: str) -> Optional[str]:
+        """Return the fresh cached report for a company, or None."""
+        key = normalize_company_key(company)
+        with self._lock:
+            entry = self._entries.get(key) or self._load(key)
+            if entry is not None and time.time() - entry[0] >= self.ttl_seconds:
+                self._remove(key)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict_overflow()
+            self.hits += 1
+            return entry[1]
+
+    def set(self, company: str, report: str) -> None:
+        """Store the report of a company."""
+        key = normalize_company_key(company)
+        if not key:
+            return
+        entry = (time.time(), report)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict_overflow()
+            if self._db is not None:
+                self._db.execute(
+                    "insert or replace into company_research_cache (company_key, stored_at, report) "
+                    "values (?, ?, ?)",
+                    (key, *entry),
+                )
+                self._db.commit()
+
+    def invalidate(self, company: str) -> None:
+        """Drop the cached report of a company."""
+        with self._lock:
+            self._remove(normalize_company_key(company))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+    def _load(self, key: str) -> Optional[Tuple[float, str]]:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "select stored_at, report from company_research_cache where company_key = ?", (key,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _remove(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("delete from company_research_cache where company_key = ?", (key,))
+            self._db.commit()
+
+    def _evict_overflow(self) -> None:
+        # Only the in-memory copy is bounded; persisted reports stay until they expire.
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+_company_cache: Optional[CompanyResearchCache] = None
+
+
+def get_company_cache() -> CompanyResearchCache:
+    """Return the process-wide company research cache, configured from the environment."""
+    global _company_cache
+    if _company_cache is None:
+        load_dotenv()
+        _company_cache = CompanyResearchCache(
+            ttl_seconds=float(os.getenv("COMPANY_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+            max_entries=int(os.getenv("COMPANY_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            path=os.getenv("COMPANY_CACHE_PATH") or None,
+        )
+    return _company_cache
@@ -0,0 +1,283 @@
+"""
+Accounting of model usage and estimated cost, and spend caps for batch runs.
+
+Each pipeline run adds up its model calls from the ADK events (`add_event_usage`):
+calls, input/output tokens and google_search queries, in total and per agent, and the
+estimated cost from the price table. Answers of cheaper tiers that the model router
+discarded (see `src.utils.model_routing`) arrive with the answer that replaced them
+and are counted as well. The usage is returned with the enrichment
+result, stored with the lead (`enrichment_usage` in `supabase.sql`) and summed per
+batch by `BatchBudget`, which also stops or throttles the batch at the configured caps.
+
+Prices are read from the environment on first use, in USD per million input/output
+tokens per model and per model call grounded with google_search (billed per prompt,
+whatever the number of queries):
+    MODEL_PRICES="gemini-2.0-flash=0.10/0.40,gemini-2.5-flash-lite=0.10/0.40"
+    GROUNDED_CALL_PRICE=0.035
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+from dotenv import load_dotenv
+from src.config.logging_config import logger
+from src.utils.metrics import metrics
+
+
+# USD per million input and output tokens; MODEL_PRICES overrides or adds models.
+DEFAULT_MODEL_PRICES = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+# USD per model call grounded with google_search.
+DEFAULT_GROUNDED_CALL_PRICE = 0.035
+DEFAULT_WINDOW_SECONDS = 3600.0
+
+
+class PriceTable:
+    """Estimates the cost of model calls from per-model token prices."""
+
+    def __init__(self, model_prices: Dict[str, Tuple[float, float]], grounded_call_price: float):
+        """
+        Initialize the price table.
+
+        Args:
+            model_prices: USD per million (input, output) tokens per model.
+            grounded_call_price: USD per call that ran google_search queries.
+        """
+        self.model_prices = model_prices
+        self.grounded_call_price = grounded_call_price
+        self._unpriced: Set[str] = set()
+
+    def call_cost(self, model: str, input_tokens: int, output_tokens: int, search_queries: int) -> Optional[float]:
+        """Estimated USD cost of one model call, or None when the model has no price."""
+        prices = self.model_prices.get(model)
+        if prices is None:
+            if model not in self._unpriced:
+                self._unpriced.add(model)
+                logger.warning(f"No price configured for model {model!r}, its calls are counted without cost")
+            return None
+        input_price, output_price = prices
+        return (
+            input_tokens * input_price / 1e6
+            + output_tokens * output_price / 1e6
+            + (self.grounded_call_price if search_queries else 0.0)
+        )
+
+
+def _parse_prices(raw: str) -> Dict[str, Tuple[float, float]]:
+    """Parse 'model=input/output,model=input/output' into a dictionary."""
+    prices = {}
+    for item in raw.split(","):
+        if "=" not in item or "/" not in item:
+            continue
+        model, value = item.split("=", 1)
+        input_price, output_price = value.split("/", 1)
+        prices[model.strip()] = (float(input_price), float(output_price))
+    return prices
+
+
+_price_table: Optional[PriceTable] = None
+
+
+def get_price_table() -> PriceTable:
+    """Return the process-wide price table, configured from the environment."""
+    global _price_table
+    if _price_table is None:
+        load_dotenv()
+        _price_table = PriceTable(
+            {**DEFAULT_MODEL_PRICES, **_parse_prices(os.getenv("MODEL_PRICES", ""))},
+            float(os.getenv("GROUNDED_CALL_PRICE", DEFAULT_GROUNDED_CALL_PRICE)),
+        )
+    return _price_table
+
+
+def merge_usage(total: Dict[str, Any], usage: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the counters of `usage` (nested per agent and model) to `total`, in place."""
+    for key, value in usage.items():
+        if isinstance(value, dict):
+            merge_usage(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def response_tokens(response) -> Optional[Dict[str, int]]:
+    """Input/output tokens and google_search queries of a model response (an ADK event
+    or `LlmResponse`), or None when it reports no usage."""
+    tokens = response.usage_metadata
+    if tokens is None:
+        return None
+    grounding = response.grounding_metadata
+    return {
+        "input_tokens": tokens.prompt_token_count or 0,
+        # Thinking tokens are billed as output.
+        "output_tokens": (tokens.candidates_token_count or 0) + (tokens.thoughts_token_count or 0),
+        "search_queries": len(grounding.web_search_queries or []) if grounding is not None else 0,
+    }
+
+
+def add_event_usage(usage: Dict[str, Any], event, default_model: str) -> None:
+    """
+    Add the model calls reported by an ADK event to the usage of a pipeline run.
+
+    Events without `usage_metadata` (state changes of non-LLM steps, cache hits and
+    the local report parser) are not model calls and are ignored. Calls whose answer
+    the router discarded are listed in the event's `custom_metadata["discarded_usage"]`
+    and counted under their own model, also as `discarded_calls`.
+
+    Args:
+        usage: Usage of the run, updated in place.
+        event: An event of `Runner.run_async`.
+        default_model: Model of the event's agent; a routed call reports the model
+            that answered in its `custom_metadata` instead.
+    """
+    if event.partial:
+        return
+    metadata = event.custom_metadata or {}
+    for discarded in metadata.get("discarded_usage", []):
+        tokens = {key: value for key, value in discarded.items() if key != "model"}
+        _add_call(usage, event.author, discarded["model"], tokens, discarded=True)
+    tokens = response_tokens(event)
+    if tokens is not None:
+        _add_call(usage, event.author, metadata.get("model", default_model), tokens)
+
+
+def _add_call(usage: Dict[str, Any], agent: str, model: str, tokens: Dict[str, int], discarded: bool = False) -> None:
+    cost = get_price_table().call_cost(model, tokens["input_tokens"], tokens["output_tokens"], tokens["search_queries"])
+    call = {
+        "model_calls": 1,
+        **tokens,
+        "cost_usd": cost or 0.0,
+        "unpriced_calls": int(cost is None),
+    }
+    if discarded:
+        call["discarded_calls"] = 1
+    merge_usage(usage, {**call, "agents": {agent: {**call, "models": {model: 1}}}})
+    if cost:
+        metrics.increment("lead_enrichment_cost_usd_total", cost, agent=agent, model=model)
+
+
+class BatchBudget:
+    """
+    Usage totals of a batch run, with an optional spend cap and hourly spend ceiling.
+
+    Every pipeline run of the batch is started with `acquire` and its usage recorded
+    with `record`. Both caps count the runs in flight at the average run cost so far.
+    Once the spend plus the runs in flight reach `max_cost_usd`, `acquire` returns
+    False and the batch stops. While the spend of the last `window_seconds` plus the
+    runs in flight reach `max_cost_per_hour`, `acquire` waits until enough of that
+    spend is older than the window (or a run finishes).
+
+    Usage:
+        budget = BatchBudget(max_cost_usd=5.0)
+        if await budget.acquire():
+            result = await processor.enrich_single_lead(company_name, person_name)
+            budget.record(result.get("usage"))
+    """
+
+    def __init__(
+        self,
+        max_cost_usd: Optional[float] = None,
+        max_cost_per_hour: Optional[float] = None,
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+    ):
+        """
+        Initialize the budget.
+
+        Args:
+            max_cost_usd: Estimated USD the batch may spend; None for no cap.
+            max_cost_per_hour: Estimated USD the batch may spend per `window_seconds`;
+                None for no ceiling.
+            window_seconds: Length of the window of `max_cost_per_hour` (one hour).
+        """
+        self.max_cost_usd = max_cost_usd
+        self.max_cost_per_hour = max_cost_per_hour
+        self.window_seconds = window_seconds
+        self.usage: Dict[str, Any] = {}
+        self.runs = 0
+        self.shared_runs = 0
+        self.in_flight = 0
+        self.stopped = False
+        self.throttled_seconds = 0.0
+        self._recent: Deque[Tuple[float, float]] = deque()
+
+    @property
+    def spent(self) -> float:
+        """Estimated USD spent by the finished runs."""
+        return self.usage.get("cost_usd", 0.0)
+
+    @property
+    def paid_runs(self) -> int:
+        """Finished runs that paid for their own pipeline run (not shared with another)."""
+        return self.runs - self.shared_runs
+
+    def in_flight_cost(self) -> float:
+        """Expected USD of the runs in flight, at the average cost of the finished paid runs."""
+        return self.in_flight * self.spent / self.paid_runs if self.paid_runs else 0.0
+
+    def exhausted(self) -> bool:
+        """Whether the batch has to stop starting runs (it stays stopped once it did)."""
+        if self.stopped or self.max_cost_usd is None:
+            return self.stopped
+        if self.spent + self.in_flight_cost() >= self.max_cost_usd:
+            self.stopped = True
+            metrics.increment("lead_enrichment_budget_events_total", event="stopped")
+            logger.warning(
+                f"Batch budget of ${self.max_cost_usd:.4f} reached (${self.spent:.4f} spent, "
+                f"{self.in_flight} runs in flight), no more leads are started"
+            )
+        return self.stopped
+
+    async def acquire(self) -> bool:
+        """Wait until a run may start within the hourly ceiling; False when the budget is exhausted."""
+        if self.exhausted():
+            return False
+        while self.max_cost_per_hour is not None:
+            now = time.monotonic()
+            while self._recent and self._recent[0][0] <= now - self.window_seconds:
+                self._recent.popleft()
+            if sum(cost for _, cost in self._recent) + self.in_flight_cost() < self.max_cost_per_hour:
+                break
+            # Without recent spend only runs in flight count; check again once some finished.
+            wait = self._recent[0][0] + self.window_seconds - now if self._recent else self.window_seconds / 60
+            metrics.increment("lead_enrichment_budget_events_total", event="throttled")
+            logger.info(f"Hourly spend ceiling of ${self.max_cost_per_hour:.4f} reached, waiting {wait:.1f}s")
+            await asyncio.sleep(wait)
+            self.throttled_seconds += wait
+            if self.exhausted():
+                return False
+        self.in_flight += 1
+        return True
+
+    def record(self, usage: Optional[Dict[str, Any]]) -> None:
+        """Record the usage of a run started with `acquire` (None if it reported none).
+
+        A run that joined another caller's run (`{"shared_run": True}`, see
+        `LeadEnrichmentProcessor.enrich_single_lead`) costs nothing and is left out of
+        the average run cost, so joins do not lower the estimate of the runs in flight.
+        """
+        self.in_flight -= 1
+        self.runs += 1
+        if usage and usage.get("shared_run"):
+            self.shared_runs += 1
+        elif usage:
+            merge_usage(self.usage, usage)
+            self._recent.append((time.monotonic(), usage.get("cost_usd", 0.0)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the caps, runs, estimated spend, whether the batch was stopped and the
+        seconds its workers waited at the hourly ceiling (summed over workers)."""
+        return {
+            "max_cost_usd": self.max_cost_usd,
+            "max_cost_per_hour": self.max_cost_per_hour,
+            "runs": self.runs,
+            "shared_runs": self.shared_runs,
+            "cost_usd": self.spent,
+            "cost_per_run_usd": self.spent / self.paid_runs if self.paid_runs else 0.0,
+            "stopped": self.stopped,
+            "throttled_seconds": self.throttled_seconds,
+        }
@@ -0,0 +1,310 @@
+"""
+Background enrichment jobs for the API.
+
+`POST /api/enrich-lead` only enqueues a job; a pool of workers runs the enrichment and
+records each status change in a job store. Jobs are persisted in the Supabase
+`enrichment_jobs` table so unfinished jobs are picked up again after a restart, and
+the queue is bounded so that a burst of requests is rejected instead of piling up.
+
+Every job records the process that owns it (`owner`) and a `heartbeat_at` the owner
+renews while the job is unfinished. Processes only recover jobs whose heartbeat is
+stale, through the `take_over_enrichment_jobs` RPC in `supabase.sql`, so several API
+replicas can share the table without running each other's jobs.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from src.config.logging_config import logger
+from src.schemas.lead import EnrichedLead
+from src.utils.lead_queue import default_worker_id
+from supabase import Client
+
+
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_WORKERS = 4
+DEFAULT_HEARTBEAT_SECONDS = 15.0
+FINISHED_STATUSES = ("succeeded", "failed")
+UNFINISHED_STATUSES = ("queued", "running")
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class InMemoryJobStore:
+    """Job store kept in process memory (for tests and single-process development)."""
+
+    def __init__(self):
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+
+    def save(self, job: Dict[str, Any]) -> None:
+        self.jobs[job["id"]] = dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    def heartbeat(self, owner: str) -> None:
+        now = _now()
+        for job in self.jobs.values():
+            if job.get("owner") == owner and job["status"] in UNFINISHED_STATUSES:
+                job["heartbeat_at"] = now
+
+    def take_over_stale(self, owner: str, stale_seconds: float, max_jobs: int) -> List[Dict[str, Any]]:
+        stale_before = (datetime.now(timezone.utc) - timedelta(seconds=stale_seconds)).isoformat()
+        taken = []
+        for job in sorted(self.jobs.values(), key=lambda job: job["created_at"]):
+            if len(taken) == max_jobs:
+                break
+            if job["status"] in UNFINISHED_STATUSES and (job.get("heartbeat_at") or "") < stale_before:
+                job.update(owner=owner, heartbeat_at=_now())
+                taken.append(dict(job))
+        return taken
+
+
+class SupabaseJobStore:
+    """Job store backed by the Supabase 'enrichment_jobs' table."""
+
+    def __init__(self, supabase: Client):
+        self.supabase = supabase
+
+    def save(self, job: Dict[str, Any]) -> None:
+        self.supabase.table('enrichment_jobs').upsert(job).execute()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        response = self.supabase.table('enrichment_jobs').select('*').eq('id', job_id).execute()
+        return response.data[0] if response.data else None
+
+    def heartbeat(self, owner: str) -> None:
+        (
+            self.supabase.table('enrichment_jobs')
+            .update({'heartbeat_at': _now()})
+            .eq('owner', owner)
+            .in_('status', list(UNFINISHED_STATUSES))
+            .execute()
+        )
+
+    def take_over_stale(self, owner: str, stale_seconds: float, max_jobs: int) -> List[Dict[str, Any]]:
+        response = self.supabase.rpc(
+            'take_over_enrichment_jobs',
+            {'new_owner': owner, 'stale_seconds': stale_seconds, 'max_jobs': max_jobs},
+        ).execute()
+        return sorted(response.data or [], key=lambda job: job["created_at"])
+
+
+class EnrichmentJobQueue:
+    """
+    Bounded queue of enrichment jobs processed by a pool of async workers.
+
+    Usage:
+        jobs = EnrichmentJobQueue(enrich, InMemoryJobStore())
+        await jobs.start()
+        job = await jobs.submit(lead)
+        ...
+        await jobs.stop()
+    """
+
+    def __init__(
+        self,
+        enrich: Callable[[EnrichedLead], Awaitable[Dict[str, Any]]],
+        store,
+        max_queue_size: int = DEFAULT_QUEUE_SIZE,
+        workers: int = DEFAULT_WORKERS,
+        owner: Optional[str] = None,
+        heartbeat_seconds: float = DEFAULT_HEARTBEAT_SECONDS,
+    ):
+        """
+        Initialize the job queue.
+
+        Args:
+            enrich: Coroutine function that enriches and saves one lead and returns the result.
+            store: Job store (`InMemoryJobStore` or `SupabaseJobStore`).
+            max_queue_size: Maximum number of queued jobs before submissions are rejected.
+            workers: Number of jobs processed at the same time.
+            owner: Name of this process in the jobs' `owner` (`default_worker_id()` if omitted).
+            heartbeat_seconds: How often the heartbeat of owned jobs is renewed; jobs
+                without a heartbeat for four times as long are taken over.
+        """
+        self.enrich = enrich
+        self.store = store
+        self.workers = workers
+        self.owner = owner or default_worker_id()
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_queue_size = max_queue_size
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        # Queue slots of submitted jobs that are being saved.
+        self._reserved = 0
+        self._tasks: List[asyncio.Task] = []
+        self._updated = asyncio.Condition()
+
+    async def start(self) -> None:
+        """Start the workers and the heartbeat, which also recovers jobs of stopped processes."""
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._keep_alive()))
+
+    async def stop(self) -> None:
+        """Cancel the workers; unfinished jobs are recovered once their heartbeat is stale."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, lead: EnrichedLead) -> Dict[str, Any]:
+        """
+        Create a job for a lead and enqueue it.
+
+        Raises:
+            QueueFullError: If the queue is at capacity.
+        """
+        # The slot is reserved before saving, so concurrent submits and recoveries
+        # cannot overfill the queue and the request never waits for a slot.
+        if self._free_slots() <= 0:
+            raise QueueFullError("Enrichment queue is full, retry later")
+        self._reserved += 1
+        try:
+            job = _new_job(lead, status="queued", owner=self.owner)
+            await asyncio.to_thread(self.store.save, job)
+        finally:
+            self._reserved -= 1
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            await self._update(job, status="failed", error="Enrichment queue was full")
+            raise QueueFullError("Enrichment queue is full, retry later")
+        return job
+
+    async def record(self, lead: EnrichedLead, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a job that succeeded without being queued, e.g. a lead that reused an earlier enrichment."""
+        job = _new_job(lead, status="succeeded", result=result, owner=self.owner)
+        await asyncio.to_thread(self.store.save, job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job by id, or None if it does not exist."""
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def watch(self, job_id: str, poll_interval: float = 5.0) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the job whenever its status changes, until it is finished.
+
+        Changes made by this process are reported immediately; the store is also
+        re-read every `poll_interval` seconds for jobs run by another process.
+        """
+        last_status = None
+        while True:
+            job = await self.get(job_id)
+            if job is None:
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield job
+            if job["status"] in FINISHED_STATUSES:
+                return
+            async with self._updated:
+                try:
+                    await asyncio.wait_for(self._updated.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def recover(self) -> int:
+        """
+        Take over and enqueue jobs whose owner stopped renewing their heartbeat; returns their number.
+
+        Only as many jobs as the queue has free slots are taken over, so recovery never
+        waits for a slot (and never holds up the heartbeat); the rest stay stale for
+        this or another process to take over later.
+        """
+        free = self._free_slots()
+        if free <= 0:
+            return 0
+        self._reserved += free
+        try:
+            jobs = await asyncio.to_thread(self.store.take_over_stale, self.owner, 4 * self.heartbeat_seconds, free)
+        finally:
+            self._reserved -= free
+        if jobs:
+            logger.info(f"Recovering {len(jobs)} unfinished enrichment jobs of stopped processes")
+        for job in jobs:
+            self._queue.put_nowait(job)
+        return len(jobs)
+
+    def _free_slots(self) -> int:
+        return self.max_queue_size - self._queue.qsize() - self._reserved
+
+    async def _keep_alive(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.store.heartbeat, self.owner)
+                await self.recover()
+            except Exception as e:
+                logger.error(f"Error renewing the heartbeat of enrichment jobs of {self.owner}: {e}")
+            await asyncio.sleep(self.heartbeat_seconds)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception:
+                logger.exception(f"Unexpected error in enrichment job {job['id']}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        await self._update(job, status="running")
+        lead = EnrichedLead(
+            lead_id=job["lead_id"],
+            company_name=job["company_name"],
+            person_name=job["person_name"],
+            force_refresh=job.get("force_refresh") or False,
+        )
+        try:
+            result = await self.enrich(lead)
+        except Exception as e:
+            logger.error(f"Enrichment job {job['id']} failed: {e}")
+            await self._update(job, status="failed", error=str(e))
+            return
+        if result.get("enrichment_status") == "Error":
+            await self._update(job, status="failed", result=result, error=result.get("error_details"))
+        else:
+            await self._update(job, status="succeeded", result=result)
+
+    async def _update(self, job: Dict[str, Any], **changes: Any) -> None:
+        now = _now()
+        job.update(changes, updated_at=now, heartbeat_at=now)
+        await asyncio.to_thread(self.store.save, job)
+        async with self._updated:
+            self._updated.notify_all()
+
+
+def create_job_store(supabase_factory: Callable[[], Client]):
+    """Return the job store selected by ENRICHMENT_JOB_STORE ('supabase' or 'memory')."""
+    if os.getenv("ENRICHMENT_JOB_STORE", "supabase") == "memory":
+        return InMemoryJobStore()
+    return SupabaseJobStore(supabase_factory())
+
+
+def _new_job(
+    lead: EnrichedLead, status: str, owner: str, result: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    now = _now()
+    return {
+        "id": str(uuid.uuid4()),
+        "lead_id": lead.lead_id,
+        "company_name": lead.company_name,
+        "person_name": lead.person_name,
+        "force_refresh": lead.force_refresh,
+        "status": status,
+        "result": result,
+        "error": None,
+        "owner": owner,
+        "heartbeat_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,170 @@
+"""
+Index of enriched people, so repeat contacts reuse an earlier enrichment.
+
+Every lead stores two normalized keys of the person behind it: `email_key` (the
+normalized email) and `person_key` (normalized full name and company). The
+`match_enriched_leads` RPC in `supabase.sql` looks up, for a batch of leads, the most
+recently enriched other lead with the same email (or else the same name and company)
+enriched within the freshness window (ENTITY_INDEX_MAX_AGE_DAYS). The person and
+company fields of that lead are then copied instead of running the agent pipeline.
+
+Rows inserted before the keys existed are indexed with:
+
+    python -m src.utils.entity_index backfill
+"""
+import argparse
+import asyncio
+import os
+from datetime import timedelta
+from typing import Any, Dict, Optional, Sequence
+from dotenv import load_dotenv
+from src.config.logging_config import logger
+from src.config.supebase_config import get_supabase_client
+from src.utils.company_cache import normalize_company_key
+from src.utils.lead_queue import claimed_lead
+from src.utils.lead_reader import DEFAULT_PAGE_SIZE, iter_unindexed_leads_from_supabase
+from src.utils.lead_writer import ENRICHMENT_COLUMNS, build_reused_lead_update, write_lead_update
+from src.utils.metrics import metrics
+from supabase import Client
+
+
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+def normalize_person_name(person_name: str) -> str:
+    """Lowercase a person's name and collapse its whitespace."""
+    return " ".join(person_name.lower().split())
+
+
+def email_key(email: Optional[str]) -> Optional[str]:
+    """Normalized email, or None when there is none."""
+    key = (email or "").strip().lower()
+    return key or None
+
+
+def person_key(person_name: str, company: str) -> Optional[str]:
+    """Normalized "name|company" key, or None unless both parts are known."""
+    name, company_key = normalize_person_name(person_name), normalize_company_key(company or "")
+    return f"{name}|{company_key}" if name and company_key else None
+
+
+def entity_keys(first_name: str, last_name: str, email: Optional[str], company: str) -> Dict[str, Optional[str]]:
+    """The `email_key` and `person_key` columns of a leads_table row."""
+    return {
+        "email_key": email_key(email),
+        "person_key": person_key(f"{first_name or ''} {last_name or ''}", company),
+    }
+
+
+def get_max_age() -> Optional[timedelta]:
+    """Freshness window from ENTITY_INDEX_MAX_AGE_DAYS; None (reuse disabled) when it is 0."""
+    load_dotenv()
+    days = float(os.getenv("ENTITY_INDEX_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS))
+    return timedelta(days=days) if days > 0 else None
+
+
+async def find_enriched_matches(
+    supabase: Client, lead_ids: Sequence[int], max_age: timedelta
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Find a recently enriched lead of the same person for each of `lead_ids`.
+
+    Args:
+        supabase: Supabase client.
+        lead_ids: Leads to look up (one round trip for all of them).
+        max_age: Only leads enriched within this window are reused.
+
+    Returns:
+        For each lead with a match, its `matched_on` ("email" or "name_company") and
+        the matched row as `source`.
+    """
+    if not lead_ids:
+        return {}
+    response = await asyncio.to_thread(
+        supabase.rpc(
+            'match_enriched_leads',
+            {'lead_ids': list(lead_ids), 'max_age_seconds': int(max_age.total_seconds())},
+        ).execute
+    )
+    matches = {row['lead_id']: row for row in response.data or []}
+    for match in matches.values():
+        metrics.increment("lead_enrichment_entity_matches_total", matched_on=match['matched_on'])
+    return matches
+
+
+def reused_result(match: Dict[str, Any]) -> Dict[str, Any]:
+    """Enrichment result of a reused lead, as returned to API clients."""
+    source = match['source']
+    result = {key: source.get(key) for key in ENRICHMENT_COLUMNS}
+    result.update(reused_from=source['id'], matched_on=match['matched_on'])
+    return result
+
+
+async def reuse_enrichment(
+    supabase: Client, lead_id: int, max_age: Optional[timedelta] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Copy the enrichment of a recently enriched lead of the same person to `lead_id`.
+
+    Lookup and write errors are logged and treated as no match, so the caller falls
+    back to running the pipeline. The lead is claimed while the copy is written, and
+    is left alone when another worker is enriching it.
+
+    Args:
+        supabase: Supabase client.
+        lead_id: Lead to enrich.
+        max_age: Freshness window (`get_max_age()` by default).
+
+    Returns:
+        The copied result (see `reused_result`), or None when there is no match or
+        reuse is disabled.
+    """
+    max_age = max_age if max_age is not None else get_max_age()
+    if max_age is None:
+        return None
+    try:
+        match = (await find_enriched_matches(supabase, [lead_id], max_age)).get(lead_id)
+    except Exception as e:
+        logger.error(f"Entity index lookup for lead {lead_id} failed: {e}")
+        return None
+    if match is None:
+        return None
+    async with claimed_lead(supabase, lead_id) as worker_id:
+        if worker_id is None:
+            logger.info(f"Lead {lead_id} is being enriched by another worker, not reusing lead {match['source']['id']}")
+            return None
+        try:
+            await asyncio.to_thread(
+                write_lead_update, supabase, build_reused_lead_update(lead_id, match['source']), worker_id
+            )
+        except Exception:
+            return None
+    logger.info(f"Reused the enrichment of lead {match['source']['id']} for lead {lead_id} (matched on {match['matched_on']})")
+    return reused_result(match)
+
+
+async def backfill_entity_keys(supabase: Client, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+    """Set `email_key`/`person_key` on rows that have neither; returns the number of rows indexed."""
+    indexed = 0
+    async for page in iter_unindexed_leads_from_supabase(supabase, page_size):
+        rows = [
+            {"id": lead["id"], **entity_keys(lead.get("first_name"), lead.get("last_name"), lead.get("email"), lead.get("company"))}
+            for lead in page
+        ]
+        await asyncio.to_thread(supabase.rpc('bulk_update_leads', {'payload': rows}).execute)
+        indexed += len(rows)
+        logger.info(f"Indexed {indexed} leads")
+    return indexed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Maintain the entity index of leads_table.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    backfill = subcommands.add_parser("backfill", help="index rows inserted before the entity keys existed")
+    backfill.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    args = parser.parse_args()
+    await backfill_entity_keys(get_supabase_client(), args.page_size)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
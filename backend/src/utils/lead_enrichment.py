@@ -5,49 +5,216 @@ Lead Scoring Supabase Integration System
 This module integrates Supabase data processing with the Google ADK lead scoring agent.
 It reads leads from a Supabase table, processes them through the agent, and saves the results back to the table.
 """
+import argparse
 import asyncio
+import copy
+import os
+import time
 import uuid
-from typing import Any, Dict, List
-import pandas as pd
+from datetime import timedelta
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+from google.adk.agents import BaseAgent
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 from src.agents.lead_enrich.agent import root_agent
+from src.config.langfuse_config import init_langfuse, update_trace
 from src.config.supebase_config import get_supabase_client
 from src.config.logging_config import logger
+from src.utils.company_cache import get_company_cache, normalize_company_key
+from src.utils.cost_accounting import BatchBudget, add_event_usage
+from src.utils.entity_index import find_enriched_matches, get_max_age, normalize_person_name
+from src.utils.lead_freshness import get_group_ttls
+from src.utils.lead_queue import DEFAULT_LEASE_SECONDS, LeadLeaseQueue
+from src.utils.lead_reader import DEFAULT_PAGE_SIZE, iter_stale_leads_from_supabase
+from src.utils.metrics import metrics
+from src.utils.model_routing import routing_stats
+from src.utils.rate_limiter import limiter_stats
+from src.utils.lead_writer import DEFAULT_BATCH_SIZE, DEFAULT_FLUSH_INTERVAL, BufferedLeadWriter, build_reused_lead_update
 from supabase import  Client
 
 
+DEFAULT_MAX_CONCURRENCY = 4
+# Session state keys written by the pipeline agents, and the stage each one completes.
+STAGE_KEYS = {
+    "company_info": "company_report",
+    "person_info": "person_report",
+    "Lead_enriched": "structured",
+}
+
+
+def lead_key(company_name: str, person_name: str) -> Tuple[str, str]:
+    """Normalized (company, person) pair identifying duplicate enrichment requests."""
+    return normalize_company_key(company_name), normalize_person_name(person_name)
+
+
+def model_name(agent: Optional[BaseAgent]) -> str:
+    """Name of the model an agent calls ("" for agents without one)."""
+    model = getattr(agent, "model", "")
+    return model if isinstance(model, str) else getattr(model, "model", "")
+
+
 class LeadEnrichmentProcessor:
     """Main class for enriching leads from Supabase through Google ADK agents."""
 
-    def __init__(self):
-        """Initialize the lead enrichment processor."""
+    def __init__(self, agent: BaseAgent = root_agent, langfuse=None):
+        """
+        Initialize the lead enrichment processor.
+
+        Args:
+            agent: Root agent of the enrichment pipeline (defaults to `root_agent`).
+            langfuse: Langfuse client from `init_langfuse`; each pipeline run is then
+                exported as a trace. Optional.
+        """
+        self.langfuse = langfuse
         self.session_service = InMemorySessionService()
         self.app_name = "Lead Enrichment"
         self.user_id = "supabase_processor"
         self.runner = Runner(
-            agent=root_agent,
+            agent=agent,
             app_name=self.app_name,
             session_service=self.session_service,
         )
+        # Single-flight: one shared pipeline run per in-flight (company, person) key.
+        self._in_flight: Dict[Tuple[str, str, bool, Optional[Tuple[str, ...]]], asyncio.Future] = {}
+        self.runs_started = 0
+        self.runs_saved = 0
+
+    def dedup_stats(self) -> Dict[str, int]:
+        """Return how many pipeline runs were started and how many were saved by coalescing."""
+        return {"runs_started": self.runs_started, "runs_saved": self.runs_saved}
 
-    async def enrich_single_lead(self, company_name: str, person_name: str) -> Dict[str, Any]:
+    async def enrich_single_lead(
+        self,
+        company_name: str,
+        person_name: str,
+        force_refresh: bool = False,
+        groups: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
         """
         Enrich a single lead through the Google ADK agent pipeline.
 
         Args:
             company_name: Name of the company.
             person_name: Name of the person.
+            force_refresh: Research the company again even if a cached report is fresh.
+            groups: Field groups to refresh (see `src.utils.lead_freshness`); only the
+                research agents they need run. None runs the full pipeline.
+
+        Concurrent calls for the same normalized company and person share one pipeline
+        run and each receive a copy of its result. The run's usage is only reported to
+        the call that started it; the others get `usage` = {"shared_run": True}, so
+        the run is paid for once.
 
         Returns:
-            A dictionary containing the enriched lead data.
+            A dictionary containing the enriched lead data, with the model usage and
+            estimated cost of the run under `usage` (see `src.utils.cost_accounting`).
+        """
+        refresh_groups = tuple(sorted(groups)) if groups is not None else None
+        key = (*lead_key(company_name, person_name), force_refresh, refresh_groups)
+        run = self._in_flight.get(key)
+        if run is None:
+            run = asyncio.ensure_future(
+                self._run_pipeline(company_name, person_name, force_refresh, refresh_groups)
+            )
+            self._in_flight[key] = run
+            run.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.runs_started += 1
+            joined = False
+        else:
+            logger.info(f"Joining in-flight enrichment of {company_name} - {person_name}")
+            self.runs_saved += 1
+            joined = True
+        # Shielded so that a cancelled caller does not cancel the run shared with others.
+        result = copy.deepcopy(await asyncio.shield(run))
+        if joined and "usage" in result:
+            result["usage"] = {"shared_run": True}
+        return result
+
+    async def _run_pipeline(
+        self,
+        company_name: str,
+        person_name: str,
+        force_refresh: bool,
+        groups: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """Run the agent pipeline once and return `Lead_enriched` (or an error dictionary)."""
+        if self.langfuse is None:
+            return await self._collect_result(company_name, person_name, force_refresh, groups)
+        with self.langfuse.start_as_current_span(name="lead_enrichment"):
+            started_at = time.monotonic()
+            enriched_data = await self._collect_result(company_name, person_name, force_refresh, groups)
+            update_trace(
+                self.langfuse,
+                input_data={"company_name": company_name, "person_name": person_name},
+                output_data=enriched_data,
+                user_id=self.user_id,
+                session_id=f"{company_name} - {person_name}",
+                tags=["lead_enrichment"],
+                metadata={
+                    "force_refresh": force_refresh,
+                    "refresh_groups": list(groups) if groups is not None else None,
+                    "elapsed_seconds": time.monotonic() - started_at,
+                    "enrichment_status": enriched_data.get("enrichment_status", "Success"),
+                },
+            )
+        return enriched_data
+
+    async def _collect_result(
+        self,
+        company_name: str,
+        person_name: str,
+        force_refresh: bool,
+        groups: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        enriched_data: Dict[str, Any] = {}
+        async for update in self.stream_enrichment(company_name, person_name, force_refresh, groups):
+            if update["stage"] in ("structured", "error"):
+                enriched_data = update["data"]
+            elif update["stage"] == "usage":
+                enriched_data = {**enriched_data, "usage": update["data"]}
+        return enriched_data
+
+    async def stream_enrichment(
+        self,
+        company_name: str,
+        person_name: str,
+        force_refresh: bool = False,
+        groups: Optional[Sequence[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the agent pipeline in a fresh session and yield each result as it is ready.
+
+        The stages are read from the state changes of the ADK events, so the company and
+        person reports are available as soon as their (parallel) agent finishes, before
+        the structuring step has run.
+
+        Args:
+            company_name: Name of the company.
+            person_name: Name of the person.
+            force_refresh: Research the company again even if a cached report is fresh.
+            groups: Field groups to refresh; None runs the full pipeline.
+
+        Yields:
+            Dictionaries with a `stage` ("company_report", "person_report", "structured"
+            or "error") and its `data`, and last the model usage of the run ("usage",
+            see `src.utils.cost_accounting`).
         """
         session_id = str(uuid.uuid4())
+        usage: Dict[str, Any] = {}
         logger.info(f"Processing lead: {company_name} - {person_name}")
 
         try:
-            initial_state = {"company_name": company_name, "person_name": person_name}
+            initial_state = {
+                "company_name": company_name,
+                "person_name": person_name,
+                "force_refresh": force_refresh,
+                "refresh_groups": list(groups) if groups is not None else None,
+            }
+            if groups is not None:
+                # Reports of skipped research agents stay empty in the structuring prompt.
+                initial_state.update(company_info="", person_info="")
             await self.session_service.create_session(
                 app_name=self.app_name,
                 session_id=session_id,
@@ -61,64 +228,398 @@ class LeadEnrichmentProcessor:
                     role="user", parts=[types.Part(text="Process this lead")]
                 ),
             ):
-                if event.is_final_response():
-                    pass
-            final_session = await self.session_service.get_session(
-                app_name=self.app_name, user_id=self.user_id, session_id=session_id
-            )
-            enriched_data = final_session.state.get("Lead_enriched", {})
-            return enriched_data
+                add_event_usage(usage, event, model_name(self.runner.agent.find_agent(event.author)))
+                for key, value in (event.actions.state_delta or {}).items():
+                    if key in STAGE_KEYS:
+                        yield {"stage": STAGE_KEYS[key], "data": value}
         except Exception as e:
             logger.error(f"Error enriching lead {company_name}: {e}")
-            return {
-                "company_name": company_name,
-                "person_name": person_name,
-                "enrichment_status": "Error",
-                "error_details": str(e),
+            yield {
+                "stage": "error",
+                "data": {
+                    "company_name": company_name,
+                    "person_name": person_name,
+                    "enrichment_status": "Error",
+                    "error_details": str(e),
+                },
             }
+        finally:
+            # Sessions are only needed during the run; drop them so a long-lived
+            # processor does not accumulate every lead's state in memory.
+            await self.session_service.delete_session(
+                app_name=self.app_name, user_id=self.user_id, session_id=session_id
+            )
+        yield {"stage": "usage", "data": usage}
+
+    async def process_leads_from_supabase(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        supabase: Optional[Client] = None,
+        claim_batch_size: Optional[int] = None,
+        write_batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+        worker_id: Optional[str] = None,
+        reuse_enrichments: bool = True,
+        budget: Optional[BatchBudget] = None,
+    ) -> Dict[str, Any]:
+        """
+        Orchestrates the claiming, processing, and saving of leads from/to Supabase.
+
+        Unenriched leads are claimed in batches through a `LeadLeaseQueue`, so any
+        number of worker processes can run this at the same time without enriching a
+        lead twice, and fed through a bounded queue to a pool of `max_concurrency`
+        workers. Leads of a batch with the same normalized company and person are
+        grouped and enriched once; duplicates across batches share the run while it is
+        in flight, and leads of a person enriched within ENTITY_INDEX_MAX_AGE_DAYS copy
+        that enrichment (see `src.utils.entity_index`). Results go to a
+        `BufferedLeadWriter`, which writes them back in bulk and clears their claims
+        (leads whose lease this worker lost to another one are not written).
+        Model calls are additionally paced, and retried when throttled, by
+        `src.utils.rate_limiter`. The model usage and estimated cost of every run are
+        stored with its leads and summed per batch by a `BatchBudget`, which stops
+        claiming leads at its spend cap and throttles the batch at its hourly ceiling.
+
+        Args:
+            max_concurrency: Maximum number of leads enriched at the same time.
+            supabase: Client to read from and write to (a new one is created if omitted).
+            claim_batch_size: Number of leads claimed per round trip (twice
+                `max_concurrency` by default, so workers do not hoard leads).
+            write_batch_size: Number of finished leads written per bulk update.
+            flush_interval: Maximum seconds a finished lead waits before being written.
+            lease_seconds: Lease of claimed leads; renewed while they are processed.
+            worker_id: Name of this worker in `claimed_by` (see `default_worker_id`).
+            reuse_enrichments: Copy the enrichment of recently enriched leads of the
+                same person instead of running the pipeline.
+            budget: Spend cap and hourly ceiling of the run; leads it cannot afford are
+                handed back for later runs. Without one, usage is accounted without caps.
+
+        Returns:
+            A summary with processed/failed/reused/skipped counts, write accounting,
+            pipeline runs saved by deduplication, lease accounting, model usage and
+            estimated cost (`usage`, `budget`), elapsed seconds and leads per minute.
+        """
+        supabase = supabase or get_supabase_client()
+        claim_batch_size = claim_batch_size or 2 * max(max_concurrency, 1)
+        async with LeadLeaseQueue(supabase, claim_batch_size, lease_seconds, worker_id) as leases:
+            summary = await self._process_pages(
+                leases.claimed_pages,
+                supabase, max_concurrency, claim_batch_size, write_batch_size, flush_interval,
+                on_finished=leases.finish,
+                reuse_max_age=get_max_age() if reuse_enrichments else None,
+                budget=budget,
+                claimed_by=leases.worker_id,
+            )
+        summary["leases"] = leases.stats()
+        return summary
+
+    async def refresh_stale_leads(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        supabase: Optional[Client] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        write_batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        ttls: Optional[Dict[str, timedelta]] = None,
+        budget: Optional[BatchBudget] = None,
+    ) -> Dict[str, Any]:
+        """
+        Re-enrich only the stale field groups of already enriched leads.
+
+        Works like `process_leads_from_supabase`, but reads the leads selected by
+        `iter_stale_leads_from_supabase`, runs only the research agents their stale
+        groups need (e.g. news only), and merges the refreshed fields into the row.
+        Refreshes read pages instead of claiming leads, so only one should run at a time.
+
+        Args:
+            max_concurrency: Maximum number of leads refreshed at the same time.
+            supabase: Client to read from and write to (a new one is created if omitted).
+            page_size: Number of leads fetched per keyset page.
+            write_batch_size: Number of finished leads written per bulk update.
+            flush_interval: Maximum seconds a finished lead waits before being written.
+            ttls: Age after which each field group is stale (`get_group_ttls()` by default).
+            budget: Spend cap and hourly ceiling of the refresh (no caps by default).
+
+        Returns:
+            The summary of `process_leads_from_supabase`, plus the number of leads
+            refreshed per field group.
+        """
+        supabase = supabase or get_supabase_client()
+        ttls = ttls or get_group_ttls()
+        return await self._process_pages(
+            lambda: iter_stale_leads_from_supabase(supabase, ttls, page_size),
+            supabase, max_concurrency, page_size, write_batch_size, flush_interval,
+            budget=budget,
+        )
+
+    async def process_lead_pages(
+        self,
+        pages: Callable[[], AsyncIterator[List[Dict[str, Any]]]],
+        supabase: Optional[Client] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        write_batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        reuse_enrichments: bool = True,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+        worker_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Enrich leads from any source of pages, e.g. rows as they are bulk imported.
+
+        Works like `process_leads_from_supabase`, but the pages come from `pages()`
+        instead of leads claimed from `leads_table`. Each lead needs the `id`,
+        `company`, `first_name` and `last_name` columns. The leads of every page are
+        claimed by id first; leads another worker already claimed are left to it.
+
+        Args:
+            pages: Returns an async iterator of pages of leads.
+            supabase: Client to write to (a new one is created if omitted).
+            max_concurrency: Maximum number of leads enriched at the same time.
+            page_size: Expected number of leads per page (sizes the work queue).
+            write_batch_size: Number of finished leads written per bulk update.
+            flush_interval: Maximum seconds a finished lead waits before being written.
+            reuse_enrichments: Copy the enrichment of recently enriched leads of the
+                same person instead of running the pipeline.
+            lease_seconds: Lease of claimed leads; renewed while they are processed.
+            worker_id: Name of this worker in `claimed_by` (see `default_worker_id`).
+
+        Returns:
+            The summary of `process_leads_from_supabase`.
+        """
+        supabase = supabase or get_supabase_client()
+        async with LeadLeaseQueue(supabase, max(page_size, 1), lease_seconds, worker_id) as leases:
+
+            async def claimed_pages() -> AsyncIterator[List[Dict[str, Any]]]:
+                async for page in pages():
+                    claimed = {row["id"] for row in await leases.claim_ids([lead["id"] for lead in page])}
+                    page = [lead for lead in page if lead["id"] in claimed]
+                    if page:
+                        yield page
 
-    async def process_leads_from_supabase(self) -> None:
-        """Orchestrates the reading, processing, and saving of leads from/to Supabase."""
-        supabase = get_supabase_client()
-        leads_to_process = read_leads_from_supabase(supabase)
-        if not leads_to_process:
-            return
-        for lead in leads_to_process:
-            company_name = lead.get("company", "")
-            person_name = f'{lead.get("first_name", "")} {lead.get("last_name", "")}'
-            result = await self.enrich_single_lead(
-                company_name=company_name, person_name=person_name
+            summary = await self._process_pages(
+                claimed_pages, supabase, max_concurrency, page_size, write_batch_size, flush_interval,
+                on_finished=leases.finish,
+                reuse_max_age=get_max_age() if reuse_enrichments else None,
+                claimed_by=leases.worker_id,
             )
-            update_lead_in_supabase(supabase, lead['id'], result)
-
-def read_leads_from_supabase(supabase: Client) -> List[Dict[str, Any]]:
-    """Reads unenriched leads from the Supabase 'leads_table'."""
-    try:
-        response = supabase.table('leads_table').select('*').eq('enrichment_flag', 'false').execute()
-        return response.data
-    except Exception as e:
-        logger.error(f"Error reading from Supabase: {e}")
-        return []
-
-def update_lead_in_supabase(supabase: Client, lead_id: int, enriched_data: Dict[str, Any]):
-    """Updates a lead in the Supabase 'leads_table' with enriched data."""
-    try:
-        update_data = enriched_data
-        update_data['enrichment_status'] = 'Success'
-        update_data['enrichment_flag'] = True
-        update_data['enriched_at'] = pd.to_datetime('now').isoformat()
-        for key in ["company_technologies", "company_hiring_trends", "company_recent_news", "person_work_history", "person_skills"]:
-            if key in update_data and isinstance(update_data[key], list):
-                update_data[key] = update_data[key]
-        supabase.table('leads_table').update(update_data).eq('id', lead_id).execute()
-        logger.info(f"Successfully updated lead {lead_id} in Supabase.")
-    except Exception as e:
-        logger.error(f"Error updating lead {lead_id} in Supabase: {e}")
+        summary["leases"] = leases.stats()
+        return summary
+
+    async def _process_pages(
+        self,
+        pages: Callable[[], AsyncIterator[List[Dict[str, Any]]]],
+        supabase: Client,
+        max_concurrency: int,
+        page_size: int,
+        write_batch_size: int,
+        flush_interval: float,
+        on_finished: Optional[Callable[[List[int]], None]] = None,
+        reuse_max_age: Optional[timedelta] = None,
+        budget: Optional[BatchBudget] = None,
+        claimed_by: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        summary = {
+            "processed": 0, "failed": 0, "reused": 0, "skipped": 0,
+            "elapsed_seconds": 0.0, "leads_per_minute": 0.0,
+        }
+        budget = budget or BatchBudget()
+        refreshed_groups: Dict[str, int] = {}
+        workers = max(max_concurrency, 1)
+        # Bounded so the reader only runs about one page ahead of the workers.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(page_size, workers))
+        started_at = time.monotonic()
+
+        dedup_before = self.dedup_stats()
+
+        async def producer(writer: BufferedLeadWriter) -> None:
+            try:
+                async for page in pages():
+                    if reuse_max_age is not None:
+                        page, reused_ids = await self._reuse_enrichments(page, supabase, reuse_max_age, writer)
+                        summary["processed"] += len(reused_ids)
+                        summary["reused"] += len(reused_ids)
+                        if on_finished is not None:
+                            on_finished(reused_ids)
+                    for group in group_duplicate_leads(page):
+                        await queue.put(group)
+                    if budget.exhausted():
+                        break
+            finally:
+                for _ in range(workers):
+                    await queue.put(None)
+
+        async def worker(writer: BufferedLeadWriter) -> None:
+            while True:
+                group = await queue.get()
+                if group is None:
+                    return
+                lead_ids = group["lead_ids"]
+                refresh_groups = group["refresh_groups"]
+                if not await budget.acquire():
+                    # Not finished: claimed leads are handed back when the run stops.
+                    summary["skipped"] += len(lead_ids)
+                    continue
+                usage = None
+                try:
+                    result = await self.enrich_single_lead(
+                        company_name=group["company_name"],
+                        person_name=group["person_name"],
+                        # A refresh stamps the groups as researched now, so it cannot use a
+                        # cached company report (the fresh one is still cached).
+                        force_refresh=refresh_groups is not None,
+                        groups=refresh_groups,
+                    )
+                    usage = result.get("usage")
+                    await writer.add(lead_ids[0], result, refresh_groups)
+                    if len(lead_ids) > 1:
+                        # The run's usage is stored once; duplicates point to the lead that has it.
+                        shared = {**result, "usage": {"shared_with": lead_ids[0]}} if usage is not None else result
+                        for lead_id in lead_ids[1:]:
+                            await writer.add(lead_id, shared, refresh_groups)
+                except Exception:
+                    logger.exception(f"Unexpected error processing leads {lead_ids}")
+                    summary["failed"] += len(lead_ids)
+                    if on_finished is not None:
+                        on_finished(lead_ids)
+                    continue
+                finally:
+                    budget.record(usage)
+                # Not called when cancelled: unfinished leads stay claimed until they are released.
+                if on_finished is not None:
+                    on_finished(lead_ids)
+                if result.get("enrichment_status") == "Error":
+                    summary["failed"] += len(lead_ids)
+                summary["processed"] += len(lead_ids)
+                self.runs_saved += len(lead_ids) - 1
+                for refresh_group in refresh_groups or ():
+                    refreshed_groups[refresh_group] = refreshed_groups.get(refresh_group, 0) + len(lead_ids)
+                    metrics.increment("lead_enrichment_refreshed_groups_total", len(lead_ids), group=refresh_group)
+
+        async with BufferedLeadWriter(supabase, write_batch_size, flush_interval, claimed_by) as writer:
+            await asyncio.gather(producer(writer), *(worker(writer) for _ in range(workers)))
+        summary.update(writer.stats())
+        summary["company_cache"] = get_company_cache().stats()
+        summary["rate_limiters"] = limiter_stats()
+        summary["model_routing"] = routing_stats()
+        summary["usage"] = budget.usage
+        summary["budget"] = budget.stats()
+        summary["runs_started"] = self.runs_started - dedup_before["runs_started"]
+        summary["runs_saved"] = self.runs_saved - dedup_before["runs_saved"]
+        if refreshed_groups:
+            summary["refreshed_groups"] = refreshed_groups
+        if not summary["processed"]:
+            return summary
+
+        elapsed = time.monotonic() - started_at
+        summary["elapsed_seconds"] = elapsed
+        summary["leads_per_minute"] = summary["processed"] / elapsed * 60 if elapsed else 0.0
+        logger.info(
+            f"Enriched {summary['processed']} leads ({summary['failed']} failed) with "
+            f"{workers} workers in {elapsed:.1f}s: {summary['leads_per_minute']:.1f} leads/min"
+        )
+        logger.info(
+            f"Pipeline runs: {summary['runs_started']} started, "
+            f"{summary['runs_saved']} saved by deduplication, "
+            f"{summary['reused']} leads reused an earlier enrichment"
+        )
+        if refreshed_groups:
+            logger.info(f"Refreshed field groups: {refreshed_groups}")
+        usage = budget.usage
+        logger.info(
+            f"Model usage: {usage.get('model_calls', 0)} calls, {usage.get('input_tokens', 0)} input / "
+            f"{usage.get('output_tokens', 0)} output tokens, {usage.get('search_queries', 0)} search queries, "
+            f"${budget.spent:.4f} estimated (${budget.spent / summary['processed']:.4f} per lead)"
+        )
+        if budget.stopped:
+            logger.warning(f"Stopped at the budget of ${budget.max_cost_usd:.4f}, {summary['skipped']} leads left for later runs")
+        logger.info(f"Company research cache: {summary['company_cache']}")
+        logger.info(f"Model rate limiters: {summary['rate_limiters']}")
+        logger.info(f"Model routing: {summary['model_routing']}")
+        logger.info(f"Pipeline metrics: {metrics.snapshot()}")
+        return summary
+
+    async def _reuse_enrichments(
+        self,
+        page: List[Dict[str, Any]],
+        supabase: Client,
+        max_age: timedelta,
+        writer: BufferedLeadWriter,
+    ) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """Write the leads of a page that match the entity index; return the rest and the reused ids."""
+        try:
+            matches = await find_enriched_matches(supabase, [lead["id"] for lead in page], max_age)
+        except Exception as e:
+            logger.error(f"Entity index lookup failed, enriching all {len(page)} leads of the page: {e}")
+            return page, []
+        for lead_id, match in matches.items():
+            await writer.add_update(build_reused_lead_update(lead_id, match["source"]))
+        return [lead for lead in page if lead["id"] not in matches], list(matches)
+
+def group_duplicate_leads(leads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Group leads that refer to the same normalized company and person.
+
+    Leads selected for a refresh (with `stale_groups`) are only grouped with leads
+    that need the same groups refreshed.
+
+    Returns:
+        One dictionary per distinct pair with `company_name`, `person_name` (taken from
+        the first lead of the group), the `refresh_groups` (None for a full enrichment)
+        and the `lead_ids` of every lead in the group.
+    """
+    groups: Dict[Tuple[str, str, Optional[Tuple[str, ...]]], Dict[str, Any]] = {}
+    for lead in leads:
+        company_name = lead.get("company", "")
+        person_name = f'{lead.get("first_name", "")} {lead.get("last_name", "")}'
+        refresh_groups = lead.get("stale_groups")
+        refresh_key = tuple(sorted(refresh_groups)) if refresh_groups is not None else None
+        group = groups.setdefault(
+            (*lead_key(company_name, person_name), refresh_key),
+            {
+                "company_name": company_name,
+                "person_name": person_name,
+                "refresh_groups": list(refresh_key) if refresh_key is not None else None,
+                "lead_ids": [],
+            },
+        )
+        group["lead_ids"].append(lead["id"])
+    return list(groups.values())
 
 async def main():
     """Main function to run the lead enrichment process."""
-    processor = LeadEnrichmentProcessor()
-    await processor.process_leads_from_supabase()
+    parser = argparse.ArgumentParser(description="Enrich the Supabase leads backlog.")
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="re-enrich only the stale field groups of enriched leads (TTLs from REFRESH_TTL_DAYS)",
+    )
+    args = parser.parse_args()
+    load_dotenv()
+    max_concurrency = int(os.getenv("ENRICHMENT_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+    write_batch_size = int(os.getenv("ENRICHMENT_WRITE_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+    flush_interval = float(os.getenv("ENRICHMENT_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL))
+    budget = BatchBudget(
+        max_cost_usd=float(os.getenv("ENRICHMENT_BUDGET_USD", 0)) or None,
+        max_cost_per_hour=float(os.getenv("ENRICHMENT_MAX_USD_PER_HOUR", 0)) or None,
+    )
+    processor = LeadEnrichmentProcessor(langfuse=init_langfuse())
+    if args.refresh:
+        await processor.refresh_stale_leads(
+            max_concurrency=max_concurrency,
+            page_size=int(os.getenv("ENRICHMENT_PAGE_SIZE", DEFAULT_PAGE_SIZE)),
+            write_batch_size=write_batch_size,
+            flush_interval=flush_interval,
+            budget=budget,
+        )
+    else:
+        await processor.process_leads_from_supabase(
+            max_concurrency=max_concurrency,
+            claim_batch_size=int(os.getenv("ENRICHMENT_CLAIM_BATCH_SIZE", 0)) or None,
+            write_batch_size=write_batch_size,
+            flush_interval=flush_interval,
+            lease_seconds=int(os.getenv("ENRICHMENT_LEASE_SECONDS", DEFAULT_LEASE_SECONDS)),
+            budget=budget,
+        )
 
 if __name__ == "__main__":
     asyncio.run(main())
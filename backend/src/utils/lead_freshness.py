@@ -0,0 +1,126 @@
+"""
+Per-field-group freshness of enriched leads.
+
+The enrichment columns of `leads_table` are split into groups that go stale at
+different rates: company firmographics change over months, news and hiring within
+weeks. Each group has its own `<group>_refreshed_at` column and TTL, so a refresh only
+researches the groups that are stale and merges their fields into the row, instead of
+running the whole pipeline and overwriting every column.
+
+The ADK callbacks below skip the research agents a refresh does not need; the
+`refresh_groups` session state holds the groups being refreshed (None for a full
+enrichment). google-adk is only imported by the callbacks, so the lead reader and
+writer (and the API) can use the field groups without loading it.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.genai import types
+
+
+# Enrichment fields of each group (every DataEnrichment field belongs to exactly one).
+FIELD_GROUPS: Dict[str, List[str]] = {
+    "company_profile": [
+        "company_name",
+        "company_website",
+        "company_industry",
+        "company_employee_count",
+        "company_annual_revenue",
+        "company_headquarters",
+        "company_founded_year",
+        "company_technologies",
+        "company_funding_details",
+    ],
+    "company_news": ["company_hiring_trends", "company_recent_news"],
+    "person_profile": [
+        "person_full_name",
+        "person_job_title",
+        "person_seniority_level",
+        "person_department",
+        "person_location",
+        "person_work_history",
+        "person_skills",
+    ],
+}
+DEFAULT_TTL_DAYS: Dict[str, float] = {
+    "company_profile": 90,
+    "company_news": 14,
+    "person_profile": 60,
+}
+
+
+def refreshed_at_column(group: str) -> str:
+    """Name of the leads_table column holding when a group was last refreshed."""
+    return f"{group}_refreshed_at"
+
+
+REFRESHED_AT_COLUMNS = [refreshed_at_column(group) for group in FIELD_GROUPS]
+
+
+def fields_of(groups: Iterable[str]) -> List[str]:
+    """Enrichment fields belonging to the given groups."""
+    return [field for group in groups for field in FIELD_GROUPS[group]]
+
+
+def get_group_ttls() -> Dict[str, timedelta]:
+    """
+    Return the TTL of each group.
+
+    Defaults can be overridden with REFRESH_TTL_DAYS, e.g. 'company_news=7,person_profile=30'.
+    """
+    days = dict(DEFAULT_TTL_DAYS)
+    for item in os.getenv("REFRESH_TTL_DAYS", "").split(","):
+        if "=" not in item:
+            continue
+        group, value = item.split("=", 1)
+        if group.strip() not in FIELD_GROUPS:
+            raise ValueError(f"Unknown field group in REFRESH_TTL_DAYS: {group.strip()}")
+        days[group.strip()] = float(value)
+    return {group: timedelta(days=value) for group, value in days.items()}
+
+
+def stale_cutoffs(ttls: Dict[str, timedelta], now: Optional[datetime] = None) -> Dict[str, datetime]:
+    """Refresh timestamps older than these cutoffs are stale."""
+    now = now or datetime.now(timezone.utc)
+    return {group: now - ttl for group, ttl in ttls.items()}
+
+
+def stale_groups(lead: Dict[str, Any], cutoffs: Dict[str, datetime]) -> List[str]:
+    """Return the groups of a lead row that were never refreshed or are older than their cutoff."""
+    stale = []
+    for group, cutoff in cutoffs.items():
+        refreshed_at = lead.get(refreshed_at_column(group))
+        if isinstance(refreshed_at, str):
+            refreshed_at = datetime.fromisoformat(refreshed_at.replace("Z", "+00:00"))
+        if refreshed_at is None or refreshed_at < cutoff:
+            stale.append(group)
+    return stale
+
+
+def _skipped(agent: str) -> "types.Content":
+    from google.genai import types
+
+    return types.Content(role="model", parts=[types.Part(text=f"{agent} not needed for this refresh")])
+
+
+def skip_unless_refreshing(*groups: str):
+    """Return a before_agent_callback that skips the agent when a refresh needs none of `groups`."""
+
+    def callback(callback_context: "CallbackContext") -> Optional["types.Content"]:
+        refresh_groups = callback_context.state.get("refresh_groups")
+        if refresh_groups is None or any(group in refresh_groups for group in groups):
+            return None
+        return _skipped(callback_context.agent_name)
+
+    return callback
+
+
+def run_for_news_only_refresh(callback_context: "CallbackContext") -> Optional["types.Content"]:
+    """Callback to run the news agent only when news, but not the full company profile, is refreshed"""
+    refresh_groups = callback_context.state.get("refresh_groups")
+    if refresh_groups and "company_news" in refresh_groups and "company_profile" not in refresh_groups:
+        return None
+    return _skipped(callback_context.agent_name)
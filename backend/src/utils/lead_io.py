@@ -0,0 +1,407 @@
+"""
+Bulk import and export of leads as CSV or JSONL.
+
+Imports are streamed: the file is read line by line, rows are validated against the
+`Contact` schema and collected into chunks, and each chunk is written with one
+multi-row insert, so memory stays bounded by the chunk size whatever the size of the
+file. Invalid rows are skipped and reported with their row number. With enrichment
+enabled, inserted chunks are fed straight into the batch processor
+(`LeadEnrichmentProcessor.process_lead_pages`) while the import goes on, or, for API
+imports, submitted as background jobs to an `EnrichmentJobQueue`.
+
+Exports stream enriched rows page by page with keyset pagination.
+
+Usage:
+    python -m src.utils.lead_io import leads.csv --enrich
+    python -m src.utils.lead_io export enriched.jsonl
+"""
+import argparse
+import asyncio
+import codecs
+import csv
+import io
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from pydantic import ValidationError
+from src.config.logging_config import logger
+from src.config.supebase_config import get_supabase_client
+from src.schemas.lead import Contact, DataEnrichment, EnrichedLead
+from src.utils.enrichment_jobs import EnrichmentJobQueue, QueueFullError
+from src.utils.entity_index import entity_keys, find_enriched_matches, get_max_age, reuse_enrichment
+from src.utils.lead_reader import DEFAULT_PAGE_SIZE, iter_enriched_leads_from_supabase
+from supabase import Client
+
+if TYPE_CHECKING:
+    # Imports google-adk; only needed when imported leads are enriched.
+    from src.utils.lead_enrichment import LeadEnrichmentProcessor
+
+
+FORMATS = ("csv", "jsonl")
+DEFAULT_CHUNK_SIZE = 500
+# Row errors kept for the report; further errors are only counted.
+MAX_REPORTED_ERRORS = 1000
+# Contact field -> leads_table column.
+CONTACT_COLUMNS = {
+    "firstName": "first_name",
+    "lastName": "last_name",
+    "email": "email",
+    "contactNumber": "contact_number",
+    "city": "city",
+    "country": "country",
+    "company": "company",
+    "interestedIn": "interested_in",
+    "inquiry": "inquiry",
+}
+EXPORT_COLUMNS = [
+    "id",
+    *CONTACT_COLUMNS.values(),
+    "created_date",
+    "enrichment_status",
+    "enrichment_error",
+    "enriched_at",
+    *DataEnrichment.model_fields,
+]
+
+# (row number, parsed record or None, error or None)
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def contact_row(contact: Contact) -> Dict[str, Any]:
+    """Turn a validated contact into a new, unenriched leads_table row, with its entity keys."""
+    row = {column: getattr(contact, field) for field, column in CONTACT_COLUMNS.items()}
+    row["interested_in"] = ", ".join(contact.interestedIn)
+    row["enrichment_flag"] = False
+    row.update(entity_keys(contact.firstName, contact.lastName, contact.email, contact.company))
+    return row
+
+
+def to_contact_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map a CSV/JSONL record to `Contact` fields.
+
+    Both the `Contact` field names and the leads_table column names (as written by
+    the export) are accepted; `interestedIn` may be a list or a ';'/',' separated string.
+    """
+    columns = {column: field for field, column in CONTACT_COLUMNS.items()}
+    fields = {columns.get(key, key): value for key, value in record.items()}
+    interested_in = fields.get("interestedIn")
+    if isinstance(interested_in, str):
+        fields["interestedIn"] = [item.strip() for item in interested_in.replace(";", ",").split(",") if item.strip()]
+    return fields
+
+
+async def iter_text_lines(chunks: AsyncIterable[bytes], encoding: str = "utf-8-sig") -> AsyncIterator[str]:
+    """Decode a stream of bytes (e.g. an HTTP request body) into lines without line endings."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_file_lines(path: Path) -> AsyncIterator[str]:
+    """Yield the lines of a text file without line endings."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+async def parse_records(lines: AsyncIterable[str], fmt: str) -> AsyncIterator[Record]:
+    """
+    Parse CSV (with a header row) or JSONL lines into records.
+
+    CSV values may contain quoted line breaks; a record ends at the first line break
+    outside quotes. Row numbers count data rows from 1 (JSONL blank lines excluded).
+
+    Yields:
+        (row number, record, None) for parsed rows and (row number, None, error) for
+        rows that cannot be parsed.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}, expected one of {FORMATS}")
+    row_number = 0
+    if fmt == "jsonl":
+        async for line in lines:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row_number, None, f"invalid JSON: {e}"
+                continue
+            if isinstance(record, dict):
+                yield row_number, record, None
+            else:
+                yield row_number, None, "expected a JSON object"
+        return
+
+    header: Optional[List[str]] = None
+    buffer = ""
+    async for line in lines:
+        buffer = f"{buffer}\n{line}" if buffer else line
+        if buffer.count('"') % 2:
+            continue  # inside a quoted value that spans lines
+        values = next(csv.reader([buffer])) if buffer else []
+        buffer = ""
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if not any(value.strip() for value in values):
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, None, f"expected {len(header)} columns, got {len(values)}"
+        else:
+            yield row_number, dict(zip(header, values)), None
+    if buffer:
+        yield row_number + 1, None, "unterminated quoted value"
+
+
+class LeadImporter:
+    """
+    Validates parsed records and inserts them into leads_table in chunks.
+
+    Usage:
+        importer = LeadImporter(supabase)
+        async for inserted_rows in importer.insert_chunks(parse_records(lines, "csv")):
+            ...
+        importer.stats()
+    """
+
+    def __init__(
+        self,
+        supabase: Client,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_errors: int = MAX_REPORTED_ERRORS,
+    ):
+        """
+        Initialize the importer.
+
+        Args:
+            supabase: Supabase client.
+            chunk_size: Rows written per multi-row insert.
+            max_errors: Row errors kept for `stats()`; further errors are only counted.
+        """
+        self.supabase = supabase
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.rows = 0
+        self.inserted = 0
+        self.invalid = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    async def insert_chunks(self, records: AsyncIterable[Record]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Validate and insert the records, yielding the inserted rows of every chunk."""
+        chunk: List[Tuple[int, Dict[str, Any]]] = []
+        async for row_number, record, error in records:
+            self.rows += 1
+            if error is None:
+                try:
+                    row = contact_row(Contact.model_validate(to_contact_fields(record)))
+                except ValidationError as e:
+                    error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            if error is not None:
+                self.invalid += 1
+                self._add_error(row_number, error)
+                continue
+            chunk.append((row_number, row))
+            if len(chunk) >= self.chunk_size:
+                inserted, chunk = await self._insert(chunk), []
+                if inserted:
+                    yield inserted
+        if chunk:
+            inserted = await self._insert(chunk)
+            if inserted:
+                yield inserted
+
+    async def _insert(self, chunk: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        query = self.supabase.table('leads_table').insert([row for _, row in chunk])
+        try:
+            response = await asyncio.to_thread(query.execute)
+        except Exception as e:
+            logger.error(f"Error inserting rows {chunk[0][0]}-{chunk[-1][0]}: {e}")
+            self.failed += len(chunk)
+            for row_number, _ in chunk:
+                self._add_error(row_number, f"insert failed: {e}")
+            return []
+        self.inserted += len(response.data)
+        return response.data
+
+    def _add_error(self, row_number: int, error: str) -> None:
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "error": error})
+
+    def stats(self) -> Dict[str, Any]:
+        """Return row counts and the first `max_errors` row errors."""
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "invalid": self.invalid,
+            "failed": self.failed,
+            "errors": list(self.errors),
+            "errors_truncated": self.invalid + self.failed - len(self.errors),
+        }
+
+
+async def import_leads(
+    lines: AsyncIterable[str],
+    fmt: str,
+    supabase: Client,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    processor: Optional["LeadEnrichmentProcessor"] = None,
+    max_concurrency: Optional[int] = None,
+    job_queue: Optional[EnrichmentJobQueue] = None,
+) -> Dict[str, Any]:
+    """
+    Import CSV or JSONL lines into leads_table.
+
+    Args:
+        lines: Lines of the file (see `iter_file_lines` and `iter_text_lines`).
+        fmt: "csv" or "jsonl".
+        supabase: Supabase client.
+        chunk_size: Rows written per multi-row insert.
+        processor: Enrich the imported leads with this processor while importing;
+            they are left for the next batch run when omitted.
+        max_concurrency: Maximum number of leads enriched at the same time
+            (ENRICHMENT_MAX_CONCURRENCY by default).
+        job_queue: Submit an enrichment job for every imported lead to this queue
+            instead of enriching them before returning (ignored with `processor`).
+            Leads that do not fit in the queue are left for the next batch run.
+
+    Returns:
+        The importer's `stats()`, plus under `enrichment` the processor summary, or
+        the `job_ids` of the submitted jobs and the number of leads `not_queued`.
+    """
+    importer = LeadImporter(supabase, chunk_size)
+    records = parse_records(lines, fmt)
+    summary: Dict[str, Any] = {}
+    if processor is None and job_queue is not None:
+        jobs: Dict[str, Any] = {"job_ids": [], "reused": 0, "not_queued": 0}
+        async for inserted_rows in importer.insert_chunks(records):
+            await _submit_enrichment_jobs(inserted_rows, job_queue, supabase, jobs)
+        summary["enrichment"] = jobs
+    elif processor is None:
+        async for _ in importer.insert_chunks(records):
+            pass
+    else:
+        from src.utils.lead_enrichment import DEFAULT_MAX_CONCURRENCY
+
+        max_concurrency = max_concurrency or int(os.getenv("ENRICHMENT_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+        summary["enrichment"] = await processor.process_lead_pages(
+            lambda: importer.insert_chunks(records), supabase, max_concurrency, page_size=chunk_size
+        )
+    summary = {**importer.stats(), **summary}
+    logger.info(
+        f"Imported {summary['inserted']} of {summary['rows']} rows "
+        f"({summary['invalid']} invalid, {summary['failed']} failed to insert)"
+    )
+    return summary
+
+
+async def _submit_enrichment_jobs(
+    rows: List[Dict[str, Any]], job_queue: EnrichmentJobQueue, supabase: Client, jobs: Dict[str, Any]
+) -> None:
+    """Submit a job per inserted lead, or record a finished one for leads that reuse an enrichment (like `/enrich-lead`)."""
+    max_age = get_max_age()
+    matches: Dict[int, Any] = {}
+    if max_age is not None:
+        try:
+            # One lookup per chunk; only the leads that match pay for a claim and a copy.
+            matches = await find_enriched_matches(supabase, [row["id"] for row in rows], max_age)
+        except Exception as e:
+            logger.error(f"Entity index lookup failed, queueing all {len(rows)} imported leads: {e}")
+    for row in rows:
+        lead = EnrichedLead(
+            lead_id=row["id"],
+            company_name=row.get("company") or "",
+            person_name=f'{row.get("first_name", "")} {row.get("last_name", "")}',
+        )
+        result = await reuse_enrichment(supabase, lead.lead_id, max_age) if lead.lead_id in matches else None
+        if result is not None:
+            job = await job_queue.record(lead, result)
+            jobs["reused"] += 1
+        else:
+            try:
+                job = await job_queue.submit(lead)
+            except QueueFullError:
+                jobs["not_queued"] += 1
+                continue
+        jobs["job_ids"].append(job["id"])
+
+
+def _csv_value(value: Any) -> Any:
+    return "; ".join(map(str, value)) if isinstance(value, list) else value
+
+
+async def export_leads(
+    supabase: Client, fmt: str, page_size: int = DEFAULT_PAGE_SIZE
+) -> AsyncIterator[str]:
+    """
+    Stream enriched leads as CSV or JSONL text, one chunk per page.
+
+    CSV list values (technologies, news, ...) are joined with '; '.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}, expected one of {FORMATS}")
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    if fmt == "csv":
+        writer.writeheader()
+    async for page in iter_enriched_leads_from_supabase(supabase, EXPORT_COLUMNS, page_size):
+        for row in page:
+            if fmt == "csv":
+                writer.writerow({key: _csv_value(value) for key, value in row.items()})
+            else:
+                buffer.write(json.dumps(row, default=str) + "\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def main():
+    """Import or export leads from the command line."""
+    parser = argparse.ArgumentParser(description="Bulk import/export of leads as CSV or JSONL.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="insert the leads of a file into leads_table")
+    import_parser.add_argument("path", type=Path)
+    import_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    import_parser.add_argument("--enrich", action="store_true", help="enrich the imported leads right away")
+    export_parser = commands.add_parser("export", help="write the enriched leads to a file")
+    export_parser.add_argument("path", type=Path)
+    for command in (import_parser, export_parser):
+        command.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    args = parser.parse_args()
+    load_dotenv()
+    fmt = args.format or args.path.suffix.lstrip(".").lower()
+    supabase = get_supabase_client()
+
+    if args.command == "import":
+        processor = None
+        if args.enrich:
+            from src.utils.lead_enrichment import LeadEnrichmentProcessor
+
+            processor = LeadEnrichmentProcessor()
+        summary = await import_leads(iter_file_lines(args.path), fmt, supabase, args.chunk_size, processor)
+        for error in summary["errors"]:
+            print(f"row {error['row']}: {error['error']}")
+        print(json.dumps({key: value for key, value in summary.items() if key != "errors"}, default=str))
+    else:
+        with open(args.path, "w", newline="") as f:
+            async for text in export_leads(supabase, fmt):
+                f.write(text)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,221 @@
+"""
+Lease-based claiming of unenriched leads, so several batch workers can share the backlog.
+
+A worker claims a batch of leads with the `claim_leads` RPC in `supabase.sql`, which
+locks the rows with `FOR UPDATE SKIP LOCKED` and marks them 'processing' with the
+worker's `claimed_by` and a `lease_expires_at`. Concurrent workers skip locked and
+leased rows, so no lead is enriched twice. While a lead is being enriched its lease is
+renewed (`renew_lead_leases`); when a worker crashes its leases expire and the leads
+are claimed again by the next worker. Writing the result (`bulk_update_leads`) clears
+the claim, and leads still held when a worker stops are handed back (`release_leads`).
+
+Paths that enrich given leads (the API and imports with enrichment) claim them by id
+with `claim_leads_by_id` (see `claimed_lead`), and results are only written while the
+writer still holds the claim, so a worker that lost its lease does not overwrite a lead.
+"""
+import asyncio
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+from src.config.logging_config import logger
+from src.utils.metrics import metrics
+from supabase import Client
+
+
+DEFAULT_LEASE_SECONDS = 300
+
+
+class LeadClaimedError(Exception):
+    """Raised when a lead is claimed by another worker."""
+
+
+def default_worker_id() -> str:
+    """ENRICHMENT_WORKER_ID, or a unique id built from the host name and process id."""
+    return os.getenv("ENRICHMENT_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class LeadLeaseQueue:
+    """
+    Claims unenriched leads for one worker and keeps their leases alive.
+
+    Leads are held from the moment they are claimed until `finish` is called for them;
+    held leads are renewed every third of the lease, and released on exit.
+
+    Usage:
+        async with LeadLeaseQueue(supabase, batch_size=8) as leases:
+            async for page in leases.claimed_pages():
+                ...
+                leases.finish(lead_ids)
+    """
+
+    def __init__(
+        self,
+        supabase: Client,
+        batch_size: int,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+        worker_id: Optional[str] = None,
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            supabase: Supabase client.
+            batch_size: Maximum number of leads claimed per round trip.
+            lease_seconds: How long a claim lasts without renewal; a crashed worker's
+                leads are picked up by other workers after this time.
+            worker_id: Identifies this worker in `claimed_by` (`default_worker_id()` if omitted).
+        """
+        if batch_size < 1 or lease_seconds < 1:
+            raise ValueError("batch_size and lease_seconds must be positive")
+        self.supabase = supabase
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or default_worker_id()
+        self.held: Set[int] = set()
+        self.claimed = 0
+        self.recovered = 0
+        self.lost = 0
+        self.released = 0
+        self.round_trips = 0
+        self._renewer: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "LeadLeaseQueue":
+        self._renewer = asyncio.create_task(self._renew_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def claimed_pages(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield batches of newly claimed leads until no lead is left to claim."""
+        while True:
+            page = await self.claim()
+            if not page:
+                return
+            yield page
+
+    async def claim(self) -> List[Dict[str, Any]]:
+        """Claim up to `batch_size` leads; returns an empty list when none is claimable or on error."""
+        try:
+            rows = await self._rpc(
+                'claim_leads',
+                {'worker_id': self.worker_id, 'batch_size': self.batch_size, 'lease_seconds': self.lease_seconds},
+            )
+        except Exception as e:
+            logger.error(f"Error claiming leads for worker {self.worker_id}: {e}")
+            return []
+        return self._claimed(rows)
+
+    async def claim_ids(self, lead_ids: List[int]) -> List[Dict[str, Any]]:
+        """Claim the given leads; leads leased to another worker are left out (all of them on error)."""
+        if not lead_ids:
+            return []
+        try:
+            rows = await self._rpc(
+                'claim_leads_by_id',
+                {'worker_id': self.worker_id, 'lead_ids': lead_ids, 'lease_seconds': self.lease_seconds},
+            )
+        except Exception as e:
+            logger.error(f"Error claiming leads {lead_ids} for worker {self.worker_id}: {e}")
+            return []
+        return self._claimed(rows)
+
+    def finish(self, lead_ids: Iterable[int]) -> None:
+        """Stop renewing the leases of these leads (their result is being written)."""
+        self.held.difference_update(lead_ids)
+
+    async def renew(self) -> None:
+        """Extend the leases of all held leads; leads whose lease was lost are no longer held."""
+        if not self.held:
+            return
+        lead_ids = sorted(self.held)
+        try:
+            rows = await self._rpc(
+                'renew_lead_leases',
+                {'worker_id': self.worker_id, 'lead_ids': lead_ids, 'lease_seconds': self.lease_seconds},
+            )
+        except Exception as e:
+            logger.error(f"Error renewing {len(lead_ids)} leases of worker {self.worker_id}: {e}")
+            return
+        renewed = {row['lead_id'] for row in rows}
+        # Only leads still held: some may have finished while the call was in flight.
+        lost = self.held.intersection(lead_ids) - renewed
+        if lost:
+            self.held -= lost
+            self.lost += len(lost)
+            metrics.increment("lead_enrichment_leases_total", len(lost), event="lost")
+            logger.warning(f"Worker {self.worker_id} lost the leases of leads {sorted(lost)}")
+
+    async def close(self) -> None:
+        """Stop renewing and hand unfinished leads back to the queue."""
+        if self._renewer is not None:
+            self._renewer.cancel()
+            self._renewer = None
+        if self.held:
+            lead_ids = sorted(self.held)
+            try:
+                rows = await self._rpc('release_leads', {'worker_id': self.worker_id, 'lead_ids': lead_ids})
+            except Exception as e:
+                logger.error(f"Error releasing {len(lead_ids)} leads of worker {self.worker_id}, "
+                             f"they are claimable again after {self.lease_seconds}s: {e}")
+            else:
+                self.released += len(rows)
+                metrics.increment("lead_enrichment_leases_total", len(rows), event="released")
+            self.held.clear()
+        logger.info(f"Lease queue of worker {self.worker_id} finished: {self.stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return claim accounting of this worker."""
+        return {
+            "worker_id": self.worker_id,
+            "claimed": self.claimed,
+            "recovered": self.recovered,
+            "lost": self.lost,
+            "released": self.released,
+            "lease_round_trips": self.round_trips,
+        }
+
+    def _claimed(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        recovered = sum(1 for row in rows if row.pop('recovered', False))
+        self.held.update(row['id'] for row in rows)
+        self.claimed += len(rows)
+        self.recovered += recovered
+        metrics.increment("lead_enrichment_leases_total", len(rows), event="claimed")
+        if recovered:
+            metrics.increment("lead_enrichment_leases_total", recovered, event="recovered")
+            logger.info(f"Worker {self.worker_id} recovered {recovered} leads with expired leases")
+        return rows
+
+    async def _renew_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self.renew()
+
+    async def _rpc(self, fn: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        self.round_trips += 1
+        response = await asyncio.to_thread(self.supabase.rpc(fn, params).execute)
+        return response.data or []
+
+
+@asynccontextmanager
+async def claimed_lead(
+    supabase: Client, lead_id: int, lease_seconds: int = DEFAULT_LEASE_SECONDS
+) -> AsyncIterator[Optional[str]]:
+    """
+    Hold a lease on one lead for the duration of the block.
+
+    Yields the worker id that holds the claim (to write the result with), or None when
+    another worker is enriching the lead. The lease is renewed while the block runs and
+    handed back at the end unless the result was written.
+
+    Usage:
+        async with claimed_lead(supabase, lead_id) as worker_id:
+            if worker_id is not None:
+                ...
+                update_lead_in_supabase(supabase, lead_id, enriched_data, claimed_by=worker_id)
+    """
+    async with LeadLeaseQueue(supabase, batch_size=1, lease_seconds=lease_seconds) as leases:
+        claimed = await leases.claim_ids([lead_id])
+        yield leases.worker_id if claimed else None
@@ -0,0 +1,128 @@
+"""
+Paged reads of leads_table.
+
+Leads are read with keyset pagination on `id` (`id > last seen id`, ordered by `id`),
+so every page costs the same regardless of its position and rows updated in the
+meantime do not shift later pages. Unenriched leads are not read here but claimed
+through `src.utils.lead_queue`. This module only needs the Supabase client, so the
+API can import it without loading the agent pipeline.
+"""
+import asyncio
+from datetime import timedelta
+from typing import Any, AsyncIterator, Callable, Dict, List, Sequence
+from src.config.logging_config import logger
+from src.utils.lead_freshness import REFRESHED_AT_COLUMNS, refreshed_at_column, stale_cutoffs, stale_groups
+from supabase import Client
+
+
+DEFAULT_PAGE_SIZE = 500
+# Columns read by the enrichment pipeline.
+LEAD_COLUMNS = "id, company, first_name, last_name"
+
+
+async def _iter_keyset_pages(
+    build_query: Callable[[int], Any], page_size: int
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield the pages of `build_query(last seen id)`, which must order by `id` and limit to `page_size`."""
+    last_id = 0
+    while True:
+        try:
+            response = await asyncio.to_thread(build_query(last_id).execute)
+        except Exception as e:
+            logger.error(f"Error reading from Supabase after id {last_id}: {e}")
+            return
+        page = response.data
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last_id = page[-1]['id']
+
+async def iter_enriched_leads_from_supabase(
+    supabase: Client, columns: Sequence[str], page_size: int = DEFAULT_PAGE_SIZE
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yields pages of enriched leads (successful or failed) from the Supabase 'leads_table'.
+
+    Uses the keyset pagination described in the module docstring.
+
+    Args:
+        supabase: Supabase client.
+        columns: Columns to fetch; must include `id`.
+        page_size: Maximum number of rows per page.
+    """
+    async for page in _iter_keyset_pages(
+        lambda last_id: (
+            supabase.table('leads_table')
+            .select(", ".join(columns))
+            .eq('enrichment_flag', 'true')
+            .gt('id', last_id)
+            .order('id')
+            .limit(page_size)
+        ),
+        page_size,
+    ):
+        yield page
+
+async def iter_stale_leads_from_supabase(
+    supabase: Client, ttls: Dict[str, timedelta], page_size: int = DEFAULT_PAGE_SIZE
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yields pages of successfully enriched leads with at least one stale field group.
+
+    Uses the keyset pagination described in the module docstring. Each lead gets a
+    `stale_groups` list with the groups whose refresh timestamp is missing or older
+    than their TTL.
+
+    Args:
+        supabase: Supabase client.
+        ttls: Age after which each field group is stale.
+        page_size: Maximum number of rows per page.
+    """
+    cutoffs = stale_cutoffs(ttls)
+    stale_filter = ",".join(
+        f"{refreshed_at_column(group)}.is.null,{refreshed_at_column(group)}.lt.{cutoff.isoformat()}"
+        for group, cutoff in cutoffs.items()
+    )
+    async for page in _iter_keyset_pages(
+        lambda last_id: (
+            supabase.table('leads_table')
+            .select(", ".join([LEAD_COLUMNS, *REFRESHED_AT_COLUMNS]))
+            .eq('enrichment_status', 'Success')
+            .or_(stale_filter)
+            .gt('id', last_id)
+            .order('id')
+            .limit(page_size)
+        ),
+        page_size,
+    ):
+        for lead in page:
+            lead["stale_groups"] = stale_groups(lead, cutoffs)
+        yield [lead for lead in page if lead["stale_groups"]]
+
+async def iter_unindexed_leads_from_supabase(
+    supabase: Client, page_size: int = DEFAULT_PAGE_SIZE
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yields pages of leads without entity keys (see `src.utils.entity_index`).
+
+    Uses the keyset pagination described in the module docstring.
+
+    Args:
+        supabase: Supabase client.
+        page_size: Maximum number of rows per page.
+    """
+    async for page in _iter_keyset_pages(
+        lambda last_id: (
+            supabase.table('leads_table')
+            .select("id, first_name, last_name, email, company")
+            .is_('email_key', 'null')
+            .is_('person_key', 'null')
+            .gt('id', last_id)
+            .order('id')
+            .limit(page_size)
+        ),
+        page_size,
+    ):
+        yield page
@@ -0,0 +1,285 @@
+"""
+Write-back of enrichment results to the Supabase 'leads_table'.
+
+`update_lead_in_supabase` writes a single lead (used by the API). `BufferedLeadWriter`
+collects finished enrichments from batch runs and flushes them in bulk through the
+`bulk_update_leads` RPC defined in `supabase.sql`, one round trip per batch. Given
+the worker id that claimed the leads (see `src.utils.lead_queue`), both only write
+leads that are still claimed by that worker.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+from src.config.logging_config import logger
+from src.schemas.lead import DataEnrichment
+from src.utils.lead_freshness import FIELD_GROUPS, REFRESHED_AT_COLUMNS, fields_of, refreshed_at_column
+from src.utils.lead_queue import LeadClaimedError
+from supabase import Client
+
+
+# Columns of leads_table that an enrichment result may set.
+ENRICHMENT_COLUMNS = set(DataEnrichment.model_fields)
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 2.0
+# Claim columns cleared when a lead is finished.
+RELEASED_CLAIM = {"claimed_by": None, "lease_expires_at": None, "status_before_claim": None}
+# Key of a `bulk_update_leads` row holding the worker that must still hold the claim.
+EXPECTED_CLAIM = "claimed_by_expected"
+
+
+def build_lead_update(
+    lead_id: int, enriched_data: Dict[str, Any], groups: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """
+    Turn the output of `enrich_single_lead` into a leads_table row update.
+
+    A full enrichment sets every enrichment column. A refresh of some field groups is
+    merged field-wise: only the fields of those groups are set, and fields the refresh
+    did not find keep their previous value.
+
+    Args:
+        lead_id: ID of the lead in leads_table.
+        enriched_data: Enrichment result, or the error dictionary of a failed run.
+        groups: Field groups that were refreshed; None for a full enrichment.
+
+    Returns:
+        A dictionary with `id`, the enrichment columns and the status columns, and the
+        run's `enrichment_usage` when the result reports one. Full enrichments and
+        failures also release the lead's claim (see `src.utils.lead_queue`).
+    """
+    enriched_at = datetime.now(timezone.utc).isoformat()
+    usage = {"enrichment_usage": enriched_data["usage"]} if "usage" in enriched_data else {}
+    if enriched_data.get("enrichment_status") == "Error":
+        if groups is not None:
+            # A failed refresh keeps the previous data; the groups stay stale and are retried.
+            return {"id": lead_id, "enrichment_error": enriched_data.get("error_details"), **usage}
+        return {
+            "id": lead_id,
+            "enrichment_status": "Error",
+            "enrichment_error": enriched_data.get("error_details"),
+            "enrichment_flag": True,
+            "enriched_at": enriched_at,
+            **usage,
+            **RELEASED_CLAIM,
+        }
+    if groups is None:
+        row = {key: value for key, value in enriched_data.items() if key in ENRICHMENT_COLUMNS}
+        row.update(RELEASED_CLAIM)
+        groups = list(FIELD_GROUPS)
+    else:
+        refreshed = set(fields_of(groups))
+        row = {
+            key: value for key, value in enriched_data.items()
+            if key in refreshed and value not in (None, "", [])
+        }
+    row.update({refreshed_at_column(group): enriched_at for group in groups})
+    row.update(usage)
+    row.update(
+        id=lead_id,
+        enrichment_status="Success",
+        enrichment_error=None,
+        enrichment_flag=True,
+        enriched_at=enriched_at,
+    )
+    return row
+
+
+def build_reused_lead_update(lead_id: int, source: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Row update that copies the enrichment of another lead of the same person.
+
+    The enrichment and freshness timestamps are copied as they are, so the copy is
+    refreshed and reused no longer than the original (see `src.utils.entity_index`).
+
+    Args:
+        lead_id: ID of the lead to update.
+        source: The enriched leads_table row to copy from.
+    """
+    row = {key: source.get(key) for key in ENRICHMENT_COLUMNS}
+    row.update({column: source.get(column) for column in REFRESHED_AT_COLUMNS})
+    row.update(
+        id=lead_id,
+        enrichment_status="Success",
+        enrichment_error=None,
+        enrichment_flag=True,
+        enriched_at=source.get("enriched_at"),
+        **RELEASED_CLAIM,
+    )
+    return row
+
+
+def update_lead_in_supabase(
+    supabase: Client, lead_id: int, enriched_data: Dict[str, Any], claimed_by: Optional[str] = None
+):
+    """Updates a lead in the Supabase 'leads_table' with enriched data (see `write_lead_update`)."""
+    write_lead_update(supabase, build_lead_update(lead_id, enriched_data), claimed_by)
+
+
+def write_lead_update(supabase: Client, row: Dict[str, Any], claimed_by: Optional[str] = None) -> None:
+    """
+    Write one row update (with its `id`) to the Supabase 'leads_table'.
+
+    Raises:
+        LeadClaimedError: `claimed_by` is given and the lead is no longer claimed by it.
+    """
+    lead_id = row["id"]
+    update_data = {key: value for key, value in row.items() if key != "id"}
+    query = supabase.table('leads_table').update(update_data).eq('id', lead_id)
+    if claimed_by is not None:
+        query = query.eq('claimed_by', claimed_by)
+    try:
+        response = query.execute()
+    except Exception as e:
+        logger.error(f"Error updating lead {lead_id} in Supabase: {e}")
+        raise
+    if claimed_by is not None and not response.data:
+        logger.warning(f"Lead {lead_id} is no longer claimed by {claimed_by}, its result was not written")
+        raise LeadClaimedError(f"Lead {lead_id} was claimed by another worker")
+    logger.info(f"Successfully updated lead {lead_id} in Supabase.")
+
+
+class BufferedLeadWriter:
+    """
+    Buffers lead updates and writes them in bulk.
+
+    A flush happens when `max_batch_size` rows are buffered, when the oldest buffered
+    row is `flush_interval` seconds old, and on close. If a bulk call fails, the batch
+    is retried row by row so that one bad row only fails itself. With `claimed_by`,
+    rows of leads this worker no longer holds are not written and count as failed.
+
+    Usage:
+        async with BufferedLeadWriter(supabase) as writer:
+            await writer.add(lead_id, enriched_data)
+    """
+
+    def __init__(
+        self,
+        supabase: Client,
+        max_batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        claimed_by: Optional[str] = None,
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            supabase: Supabase client.
+            max_batch_size: Number of buffered rows that triggers a flush.
+            flush_interval: Maximum seconds a row waits in the buffer.
+            claimed_by: Worker that claimed the leads written; None to write
+                unclaimed leads (e.g. refreshes).
+        """
+        self.supabase = supabase
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.claimed_by = claimed_by
+        self.succeeded = 0
+        self.failed = 0
+        self.errors: Dict[int, str] = {}
+        self.round_trips = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._oldest: Optional[float] = None
+        self._pending: set = set()
+        self._timer: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "BufferedLeadWriter":
+        self._timer = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def add(
+        self, lead_id: int, enriched_data: Dict[str, Any], groups: Optional[Sequence[str]] = None
+    ) -> None:
+        """Buffer the update of one lead (see `build_lead_update`), flushing if the batch is full."""
+        await self.add_update(build_lead_update(lead_id, enriched_data, groups))
+
+    async def add_update(self, row: Dict[str, Any]) -> None:
+        """Buffer a prebuilt row update (e.g. from `build_reused_lead_update`)."""
+        if not self._buffer:
+            self._oldest = time.monotonic()
+        if self.claimed_by is not None:
+            row = {**row, EXPECTED_CLAIM: self.claimed_by}
+        self._buffer.append(row)
+        if len(self._buffer) >= self.max_batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write all buffered rows."""
+        if not self._buffer:
+            return
+        rows, self._buffer, self._oldest = self._buffer, [], None
+        task = asyncio.create_task(asyncio.to_thread(self._write_batch, rows))
+        self._pending.add(task)
+        try:
+            await task
+        finally:
+            self._pending.discard(task)
+
+    async def close(self) -> None:
+        """Stop the flush timer and write everything still buffered."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+        if self._pending:
+            await asyncio.gather(*self._pending)
+        logger.info(
+            f"Lead writer finished: {self.succeeded} updated, {self.failed} failed, "
+            f"{self.round_trips} round trips."
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return success/error accounting of all rows written so far."""
+        return {
+            "written": self.succeeded,
+            "write_failed": self.failed,
+            "write_round_trips": self.round_trips,
+            "write_errors": dict(self.errors),
+        }
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval / 2)
+            if self._oldest is not None and time.monotonic() - self._oldest >= self.flush_interval:
+                await self.flush()
+
+    def _write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        self.round_trips += 1
+        try:
+            response = self.supabase.rpc('bulk_update_leads', {'payload': rows}).execute()
+        except Exception as e:
+            logger.error(f"Bulk update of {len(rows)} leads failed, retrying row by row: {e}")
+            self._write_rows(rows)
+            return
+        updated = {item['lead_id'] for item in response.data or []}
+        for row in rows:
+            if row['id'] in updated:
+                self.succeeded += 1
+            else:
+                self._record_error(row['id'], "Lead not found in leads_table or claimed by another worker")
+        logger.info(f"Bulk updated {len(updated)} of {len(rows)} leads in Supabase.")
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            update_data = {key: value for key, value in row.items() if key not in ('id', EXPECTED_CLAIM)}
+            query = self.supabase.table('leads_table').update(update_data).eq('id', row['id'])
+            if EXPECTED_CLAIM in row:
+                query = query.eq('claimed_by', row[EXPECTED_CLAIM])
+            self.round_trips += 1
+            try:
+                response = query.execute()
+            except Exception as e:
+                self._record_error(row['id'], str(e))
+            else:
+                if response.data:
+                    self.succeeded += 1
+                else:
+                    self._record_error(row['id'], "Lead not found in leads_table or claimed by another worker")
+
+    def _record_error(self, lead_id: int, error: str) -> None:
+        self.failed += 1
+        self.errors[lead_id] = error
+        logger.error(f"Error updating lead {lead_id} in Supabase: {error}")
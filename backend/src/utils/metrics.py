@@ -0,0 +1,210 @@
+"""
+In-process metrics for the lead enrichment pipeline.
+
+The ADK callbacks below record per-agent wall time, per-model-call latency and token
+usage, and google_search usage into a process-wide registry. `render_prometheus`
+exposes the registry in the Prometheus text format (served at `/metrics`).
+
+google_search is a built-in Gemini tool that runs inside the model call, so search
+usage is read from the grounding metadata of the response: the number of queries is
+counted, and the latency of model calls that searched is recorded as search latency.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+Labels = Tuple[Tuple[str, str], ...]
+
+QUANTILES = (0.5, 0.95)
+RESERVOIR_SIZE = 1024
+# Timers of runs that never reach their "after" callback (errors) are dropped past this.
+MAX_PENDING_TIMERS = 10000
+
+
+class Summary:
+    """Count, sum and quantiles over the most recent `RESERVOIR_SIZE` observations."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples: Deque[float] = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters, gauges and summaries keyed by name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._summaries: Dict[str, Dict[Labels, Summary]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self._help[name] = (kind, help_text)
+
+    def increment(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._summaries.setdefault(name, {}).setdefault(key, Summary()).observe(value)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Return counters, gauges and summary quantiles as plain dictionaries (for logs and reports)."""
+        result: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for name, series in (*self._counters.items(), *self._gauges.items()):
+                for labels, value in series.items():
+                    result.setdefault(name, {})[_format_labels(labels)] = value
+            for name, series in self._summaries.items():
+                for labels, summary in series.items():
+                    entry = {"count": summary.count, "sum": summary.total}
+                    entry.update({f"p{int(q * 100)}": summary.quantile(q) for q in QUANTILES})
+                    result.setdefault(name, {})[_format_labels(labels)] = entry
+        return result
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                self._header(lines, name, "counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            for name, series in sorted(self._gauges.items()):
+                self._header(lines, name, "gauge")
+                for labels, value in series.items():
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            for name, series in sorted(self._summaries.items()):
+                self._header(lines, name, "summary")
+                for labels, summary in series.items():
+                    for q in QUANTILES:
+                        quantile_labels = labels + (("quantile", str(q)),)
+                        lines.append(f"{name}{_format_labels(quantile_labels)} {summary.quantile(q)}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {summary.total}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {summary.count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: List[str], name: str, default_kind: str) -> None:
+        kind, help_text = self._help.get(name, (default_kind, name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+metrics = MetricsRegistry()
+metrics.describe("lead_enrichment_agent_seconds", "summary", "Wall time of each agent run.")
+metrics.describe("lead_enrichment_model_call_seconds", "summary", "Latency of each model call, including rate limiter wait and retries.")
+metrics.describe("lead_enrichment_model_calls_total", "counter", "Model calls per agent and model.")
+metrics.describe("lead_enrichment_model_tokens_total", "counter", "Tokens used per agent, model and direction (prompt/completion).")
+metrics.describe("lead_enrichment_tool_calls_total", "counter", "Tool calls per agent and tool (google_search counts search queries).")
+metrics.describe("lead_enrichment_tool_seconds", "summary", "Latency of model calls that ran the tool.")
+metrics.describe("lead_enrichment_limiter_wait_seconds", "summary", "Time each model call attempt waited for the rate limiter.")
+metrics.describe("lead_enrichment_model_retries_total", "counter", "Retried model calls per model and failure status.")
+metrics.describe("lead_enrichment_model_throttled_total", "counter", "Model calls answered with 429/503 per model.")
+metrics.describe("lead_enrichment_model_concurrency_limit", "gauge", "Current adaptive limit on model calls in flight.")
+metrics.describe("lead_enrichment_routed_answers_total", "counter", "Routed model calls per agent and the model tier that answered.")
+metrics.describe("lead_enrichment_escalations_total", "counter", "Escalations to a stronger model per agent, model escalated from and reason.")
+metrics.describe("lead_enrichment_output_completeness", "summary", "Completeness score of each routed model answer per agent and model.")
+metrics.describe("lead_enrichment_refreshed_groups_total", "counter", "Leads re-enriched per stale field group.")
+metrics.describe("lead_enrichment_structuring_input_tokens", "summary", "Estimated report tokens in the structuring prompt before (raw) and after compaction.")
+metrics.describe("lead_enrichment_leases_total", "counter", "Lead leases of batch workers per event (claimed, recovered from an expired lease, lost, released).")
+metrics.describe("lead_enrichment_entity_matches_total", "counter", "Leads that reused the enrichment of an earlier lead of the same person, per matched key.")
+metrics.describe("lead_enrichment_cost_usd_total", "counter", "Estimated USD cost of model calls per agent and model (see src/utils/cost_accounting.py).")
+metrics.describe("lead_enrichment_budget_events_total", "counter", "Batch runs stopped at their budget and waits at the hourly spend ceiling.")
+metrics.describe("lead_enrichment_structuring_total", "counter", "Structured leads per path (local report parser or LLM fallback).")
+
+_timers: "OrderedDict[Tuple[str, str, str], Tuple[float, str]]" = OrderedDict()
+
+
+def _start_timer(kind: str, callback_context, detail: str = "") -> None:
+    _timers[(kind, callback_context.invocation_id, callback_context.agent_name)] = (time.perf_counter(), detail)
+    while len(_timers) > MAX_PENDING_TIMERS:
+        _timers.popitem(last=False)
+
+
+def _stop_timer(kind: str, callback_context) -> Optional[Tuple[float, str]]:
+    started = _timers.pop((kind, callback_context.invocation_id, callback_context.agent_name), None)
+    if started is None:
+        return None
+    return time.perf_counter() - started[0], started[1]
+
+
+def start_agent_timer(callback_context) -> None:
+    """before_agent_callback that starts timing the agent run."""
+    _start_timer("agent", callback_context)
+    return None
+
+
+def record_agent_time(callback_context) -> None:
+    """after_agent_callback that records the agent's wall time."""
+    elapsed = _stop_timer("agent", callback_context)
+    if elapsed is not None:
+        metrics.observe("lead_enrichment_agent_seconds", elapsed[0], agent=callback_context.agent_name)
+    return None
+
+
+def start_model_timer(callback_context, llm_request) -> None:
+    """before_model_callback that starts timing the model call."""
+    _start_timer("model", callback_context, llm_request.model or "")
+    return None
+
+
+def record_model_usage(agent: str, model: str, llm_response) -> None:
+    """Count one model call of an agent with its token and google_search usage."""
+    metrics.increment("lead_enrichment_model_calls_total", agent=agent, model=model)
+    usage = llm_response.usage_metadata
+    if usage is not None:
+        metrics.increment("lead_enrichment_model_tokens_total", usage.prompt_token_count or 0,
+                          agent=agent, model=model, type="prompt")
+        metrics.increment("lead_enrichment_model_tokens_total", usage.candidates_token_count or 0,
+                          agent=agent, model=model, type="completion")
+    grounding = llm_response.grounding_metadata
+    if grounding is not None and grounding.web_search_queries:
+        metrics.increment("lead_enrichment_tool_calls_total", len(grounding.web_search_queries),
+                          agent=agent, tool="google_search")
+
+
+def record_model_call(callback_context, llm_response) -> None:
+    """after_model_callback that records latency, token usage and google_search usage."""
+    timed = _stop_timer("model", callback_context)
+    if timed is None:
+        return None
+    elapsed, model = timed
+    # A routed call reports the model that actually answered (see src.utils.model_routing).
+    model = (llm_response.custom_metadata or {}).get("model", model)
+    agent = callback_context.agent_name
+    metrics.observe("lead_enrichment_model_call_seconds", elapsed, agent=agent, model=model)
+    record_model_usage(agent, model, llm_response)
+    grounding = llm_response.grounding_metadata
+    if grounding is not None and grounding.web_search_queries:
+        metrics.observe("lead_enrichment_tool_seconds", elapsed, agent=agent, tool="google_search")
+    return None
@@ -0,0 +1,179 @@
+"""
+Tiered model routing with escalation on incomplete answers.
+
+Each agent answers with the cheapest model of its tier list first. The answer is
+scored by completeness against the `DataEnrichment` fields the agent is responsible
+for; only when the score is below the agent's threshold (or a cheaper tier fails) is
+the request sent again to the next, stronger model. Deterministic paths run before
+any tier: the company report cache and the report parser skip the model entirely.
+
+Tiers and thresholds are read from the environment on first use:
+    MODEL_TIERS="StructuringAgent=gemini-2.0-flash-lite>gemini-2.0-flash,..."
+    ESCALATION_THRESHOLDS="company_research_agent=0.6,StructuringAgent=0.7"
+    DEFAULT_ESCALATION_THRESHOLD=0.6
+"""
+import json
+import os
+from typing import Any, AsyncGenerator, Callable, Dict, Iterable, List, Optional
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from pydantic import Field, PrivateAttr, ValidationError
+from src.config.logging_config import logger
+from src.schemas.lead import DataEnrichment
+from src.utils.cost_accounting import response_tokens
+from src.utils.metrics import metrics, record_model_usage
+from src.utils.rate_limiter import RateLimitedModel
+from src.utils.report_parser import company_report_fields, person_report_fields
+
+
+DEFAULT_ESCALATION_THRESHOLD = 0.6
+
+_REQUIRED_FIELDS = [name for name, field in DataEnrichment.model_fields.items() if field.is_required()]
+_routing_stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+
+
+def completeness(fields: Dict[str, Any], expected: Iterable[str], required: Iterable[str] = ()) -> float:
+    """
+    Share of the expected fields that have a value; 0 when a required field is missing.
+
+    Empty strings and lists count as missing, like 'Not Found' answers.
+    """
+    def filled(name: str) -> bool:
+        return fields.get(name) not in (None, "", [])
+
+    if not all(filled(name) for name in required):
+        return 0.0
+    expected = [name for name in expected if name not in required]
+    return sum(1 for name in expected if filled(name)) / len(expected) if expected else 1.0
+
+
+def score_company_report(text: str) -> float:
+    """Completeness of a company research report."""
+    fields = company_report_fields(text)
+    return completeness(fields, [f for f in DataEnrichment.model_fields if f.startswith("company_")], ["company_name"])
+
+
+def score_person_report(text: str) -> float:
+    """Completeness of a person research report."""
+    fields = person_report_fields(text)
+    return completeness(fields, [f for f in DataEnrichment.model_fields if f.startswith("person_")], ["person_full_name"])
+
+
+def score_structured_output(text: str) -> float:
+    """Completeness of a `DataEnrichment` JSON answer; 0 when it does not validate."""
+    try:
+        fields = DataEnrichment.model_validate(json.loads(text)).model_dump()
+    except (ValueError, ValidationError):
+        return 0.0
+    return completeness(fields, DataEnrichment.model_fields, _REQUIRED_FIELDS)
+
+
+def _parse_map(raw: str, value: Callable[[str], Any]) -> Dict[str, Any]:
+    """Parse 'key=value,key=value' into a dictionary."""
+    parsed = {}
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        key, raw_value = item.split("=", 1)
+        parsed[key.strip()] = value(raw_value.strip())
+    return parsed
+
+
+def routing_stats() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Return per agent and tier model how many calls were answered or escalated, and the escalation rate."""
+    report: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for agent, tiers in _routing_stats.items():
+        for model, counts in tiers.items():
+            attempts = counts["answered"] + counts["escalated"]
+            report.setdefault(agent, {})[model] = {
+                **counts,
+                "escalation_rate": counts["escalated"] / attempts if attempts else 0.0,
+            }
+    return report
+
+
+def _count(agent: str, model: str, outcome: str) -> None:
+    tiers = _routing_stats.setdefault(agent, {})
+    tiers.setdefault(model, {"answered": 0, "escalated": 0})[outcome] += 1
+
+
+class TieredModel(BaseLlm):
+    """
+    Model that tries its tiers from cheapest to strongest and answers with the first
+    one whose output scores at least the threshold (or with the last tier).
+
+    Every tier is called through its own `RateLimitedModel`. `model` is the default
+    strongest tier; ADK uses it to configure tools such as google_search.
+
+    Usage:
+        LlmAgent(model=TieredModel(model="gemini-2.0-flash", agent="MyAgent",
+                                   default_tiers=["gemini-2.0-flash-lite", "gemini-2.0-flash"],
+                                   scorer=score_structured_output), ...)
+    """
+
+    agent: str
+    default_tiers: List[str]
+    scorer: Callable[[str], float]
+    # Optional backend per tier model, e.g. fakes in benchmarks; Gemini otherwise.
+    backends: Dict[str, BaseLlm] = Field(default_factory=dict)
+    tiers: Optional[List[str]] = None
+    threshold: Optional[float] = None
+    _models: Dict[str, RateLimitedModel] = PrivateAttr(default_factory=dict)
+
+    def configure(self) -> None:
+        """Read this agent's tiers and threshold from the environment (defaults otherwise)."""
+        self._models = {}
+        tiers = _parse_map(os.getenv("MODEL_TIERS", ""), lambda value: value.split(">")).get(self.agent)
+        self.tiers = [tier.strip() for tier in tiers] if tiers else list(self.default_tiers)
+        thresholds = _parse_map(os.getenv("ESCALATION_THRESHOLDS", ""), float)
+        self.threshold = thresholds.get(
+            self.agent, float(os.getenv("DEFAULT_ESCALATION_THRESHOLD", DEFAULT_ESCALATION_THRESHOLD))
+        )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.tiers is None or self.threshold is None:
+            self.configure()
+        discarded: List[Dict[str, Any]] = []
+        for index, tier in enumerate(self.tiers):
+            last = index == len(self.tiers) - 1
+            if tier not in self._models:
+                self._models[tier] = RateLimitedModel(model=tier, backend=self.backends.get(tier))
+            model = self._models[tier]
+            request = llm_request.model_copy(update={"model": tier})
+            try:
+                responses = [response async for response in model.generate_content_async(request, stream)]
+            except Exception as e:
+                if last:
+                    raise
+                logger.warning(f"{self.agent}: {tier} failed ({e}), escalating")
+                metrics.increment("lead_enrichment_escalations_total", agent=self.agent, model=tier, reason="error")
+                _count(self.agent, tier, "escalated")
+                continue
+            text = "".join(
+                part.text or ""
+                for response in responses if response.content
+                for part in response.content.parts or []
+            )
+            score = self.scorer(text)
+            metrics.observe("lead_enrichment_output_completeness", score, agent=self.agent, model=tier)
+            if last or score >= self.threshold:
+                metrics.increment("lead_enrichment_routed_answers_total", agent=self.agent, model=tier)
+                _count(self.agent, tier, "answered")
+                for response in responses:
+                    response.custom_metadata = {**(response.custom_metadata or {}), "model": tier, "completeness": score}
+                if discarded and responses:
+                    # Reported with the final response, so the run's usage includes them.
+                    responses[-1].custom_metadata["discarded_usage"] = discarded
+                for response in responses:
+                    yield response
+                return
+            # The discarded answer was paid for: count its usage under its own model.
+            for response in responses:
+                record_model_usage(self.agent, tier, response)
+                tokens = response_tokens(response)
+                if tokens is not None:
+                    discarded.append({"model": tier, **tokens})
+            metrics.increment("lead_enrichment_escalations_total", agent=self.agent, model=tier, reason="incomplete")
+            _count(self.agent, tier, "escalated")
+            logger.info(f"{self.agent}: {tier} answer {score:.0%} complete, escalating to {self.tiers[index + 1]}")
@@ -0,0 +1,315 @@
+"""
+Client-side rate limiting and retries for model calls.
+
+Every model gets one shared `AdaptiveRateLimiter`: a token bucket paces request starts
+under the per-minute Gemini quota, and an AIMD limit on requests in flight backs off
+when the API answers 429/503 (the limit is halved) and grows again by one request per
+round of successful calls. `RateLimitedModel` wraps the Gemini model of each agent,
+takes a slot from the limiter for every attempt, and retries throttled and transient
+failures with jittered exponential backoff.
+
+google_search is a built-in Gemini tool that runs inside the model call, so search
+calls are limited and retried together with the model call that makes them.
+"""
+import asyncio
+import math
+import os
+import random
+import re
+import time
+from typing import AsyncGenerator, Dict, Optional, Tuple
+from google.adk.models import BaseLlm, Gemini, LlmRequest, LlmResponse
+from google.genai import errors
+from src.config.logging_config import logger
+from src.utils.metrics import metrics
+
+
+# Status codes that mean "slow down": they shrink the concurrency limit.
+THROTTLE_STATUSES = {429, 503}
+# Status codes worth retrying.
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_RETRY_BASE_SECONDS = 1.0
+DEFAULT_RETRY_MAX_SECONDS = 30.0
+
+
+class AdaptiveRateLimiter:
+    """Token bucket on request starts plus an AIMD limit on requests in flight."""
+
+    def __init__(
+        self,
+        requests_per_minute: int = 0,
+        max_concurrency: int = 0,
+        min_concurrency: int = 1,
+        burst: Optional[int] = None,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Sustained request starts per minute; 0 disables pacing.
+            max_concurrency: Upper bound of the adaptive in-flight limit; 0 leaves it
+                unbounded until the first throttled response.
+            min_concurrency: The in-flight limit never drops below this.
+            burst: Requests that may start back to back (bucket size); a tenth of the
+                per-minute budget by default.
+        """
+        if requests_per_minute < 0 or max_concurrency < 0 or min_concurrency < 1:
+            raise ValueError("limits must be positive (or 0 to disable)")
+        self.requests_per_minute = requests_per_minute
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.burst = burst or max(1, requests_per_minute // 10)
+        self.concurrency_limit = float(max_concurrency) if max_concurrency else math.inf
+        self.in_flight = 0
+        self.total_requests = 0
+        self.total_wait_seconds = 0.0
+        self.throttled = 0
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._slot_freed: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def acquire(self) -> float:
+        """
+        Wait for a free in-flight slot and a token, then take both.
+
+        A call cancelled while it waits for the token gives its slot back.
+
+        Returns:
+            The concurrency limit at the time of acquisition; pass it to `release`.
+        """
+        waited_from = time.monotonic()
+        slot_freed = self._condition()
+        async with slot_freed:
+            await slot_freed.wait_for(lambda: self.in_flight < self.concurrency_limit)
+            self.in_flight += 1
+        acquired_limit = self.concurrency_limit
+        try:
+            while self.requests_per_minute:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._refilled_at) * self.requests_per_minute / 60
+                )
+                self._refilled_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) * 60 / self.requests_per_minute)
+        except BaseException:
+            # Cancelled (client gone, job cancelled, timeout): the slot was never used.
+            self.in_flight -= 1
+            asyncio.ensure_future(self._notify_slot_freed())
+            raise
+        self.total_requests += 1
+        self.total_wait_seconds += time.monotonic() - waited_from
+        return acquired_limit
+
+    async def release(self, acquired_limit: float, throttled: bool = False) -> None:
+        """
+        Free the slot of a finished attempt and adapt the concurrency limit.
+
+        A throttled response halves the limit (once per round: responses to requests
+        started under an older, higher limit do not halve it again); a successful one
+        raises it by 1/limit, i.e. by one request per round of successes.
+        """
+        slot_freed = self._condition()
+        async with slot_freed:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                if acquired_limit <= self.concurrency_limit:
+                    current = min(self.concurrency_limit, self.in_flight + 1)
+                    self.concurrency_limit = max(float(self.min_concurrency), current / 2)
+            elif not math.isinf(self.concurrency_limit):
+                self.concurrency_limit += 1 / self.concurrency_limit
+                if self.max_concurrency:
+                    self.concurrency_limit = min(self.concurrency_limit, float(self.max_concurrency))
+            slot_freed.notify_all()
+
+    async def _notify_slot_freed(self) -> None:
+        slot_freed = self._condition()
+        async with slot_freed:
+            slot_freed.notify_all()
+
+    def _condition(self) -> asyncio.Condition:
+        # Limiters are process-wide; asyncio primitives belong to one event loop.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._slot_freed = loop, asyncio.Condition()
+        return self._slot_freed
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Return request, wait and throttling counters (a concurrency limit of None means unlimited)."""
+        return {
+            "requests": self.total_requests,
+            "wait_seconds": self.total_wait_seconds,
+            "throttled": self.throttled,
+            "in_flight": self.in_flight,
+            "concurrency_limit": None if math.isinf(self.concurrency_limit) else self.concurrency_limit,
+        }
+
+
+_limits: Optional[Dict[str, int]] = None
+_default_limit: int = 0
+_concurrency: Dict[str, int] = {}
+_default_concurrency: int = 0
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_retry_policy: Optional[Tuple[int, float, float]] = None
+
+
+def _parse_limits(raw: str) -> Dict[str, int]:
+    """Parse 'model=rpm,model=rpm' into a dictionary."""
+    limits = {}
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        model, rpm = item.split("=", 1)
+        limits[model.strip()] = int(rpm)
+    return limits
+
+
+def configure_rate_limits(
+    limits: Dict[str, int],
+    default: int = 0,
+    concurrency: Optional[Dict[str, int]] = None,
+    default_concurrency: int = 0,
+) -> None:
+    """
+    Set the per-minute request budget and the in-flight ceiling of each model.
+
+    Args:
+        limits: Mapping of model name to requests per minute.
+        default: Budget for models not listed in `limits`; 0 disables pacing.
+        concurrency: Mapping of model name to the maximum requests in flight.
+        default_concurrency: Ceiling for models not listed in `concurrency`; 0 leaves
+            the adaptive limit unbounded until the API throttles.
+    """
+    global _limits, _default_limit, _concurrency, _default_concurrency
+    _limits = dict(limits)
+    _default_limit = default
+    _concurrency = dict(concurrency or {})
+    _default_concurrency = default_concurrency
+    _limiters.clear()
+
+
+def configure_retries(
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    base_delay: float = DEFAULT_RETRY_BASE_SECONDS,
+    max_delay: float = DEFAULT_RETRY_MAX_SECONDS,
+) -> None:
+    """
+    Set how model calls are retried.
+
+    Args:
+        max_retries: Retries after the first attempt; 0 disables retrying.
+        base_delay: Upper bound of the first backoff; it doubles with every retry.
+        max_delay: Upper bound of any backoff.
+    """
+    global _retry_policy
+    _retry_policy = (max_retries, base_delay, max_delay)
+
+
+def get_rate_limiter(model: str) -> AdaptiveRateLimiter:
+    """Return the limiter shared by every call to a model."""
+    if _limits is None:
+        configure_rate_limits(
+            _parse_limits(os.getenv("MODEL_REQUESTS_PER_MINUTE", "")),
+            int(os.getenv("DEFAULT_REQUESTS_PER_MINUTE", "0")),
+            _parse_limits(os.getenv("MODEL_MAX_CONCURRENCY", "")),
+            int(os.getenv("DEFAULT_MODEL_MAX_CONCURRENCY", "0")),
+        )
+    if model not in _limiters:
+        _limiters[model] = AdaptiveRateLimiter(
+            requests_per_minute=_limits.get(model, _default_limit),
+            max_concurrency=_concurrency.get(model, _default_concurrency),
+        )
+    return _limiters[model]
+
+
+def limiter_stats() -> Dict[str, Dict[str, float]]:
+    """Return the counters of every model's limiter."""
+    return {model: limiter.stats() for model, limiter in _limiters.items()}
+
+
+def get_retry_policy() -> Tuple[int, float, float]:
+    """Return (max_retries, base_delay, max_delay), read from the environment on first use."""
+    if _retry_policy is None:
+        configure_retries(
+            int(os.getenv("MODEL_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+            float(os.getenv("MODEL_RETRY_BASE_SECONDS", DEFAULT_RETRY_BASE_SECONDS)),
+            float(os.getenv("MODEL_RETRY_MAX_SECONDS", DEFAULT_RETRY_MAX_SECONDS)),
+        )
+    return _retry_policy
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than a delay requested by the API."""
+    delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+    return max(delay, min(retry_after or 0.0, max_delay))
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status of a failed model call (None for errors that are not API errors)."""
+    if isinstance(error, errors.APIError):
+        return error.code
+    if isinstance(error, (ConnectionError, asyncio.TimeoutError)):
+        return 503
+    return None
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Read the RetryInfo delay ('7s') that Gemini attaches to quota errors."""
+    match = re.search(r"retryDelay'?\"?:\s*'?\"?(\d+(?:\.\d+)?)s", str(getattr(error, "details", "")))
+    return float(match.group(1)) if match else None
+
+
+class RateLimitedModel(BaseLlm):
+    """
+    Model wrapper that paces, adapts and retries the calls of the wrapped model.
+
+    Usage:
+        LlmAgent(model=RateLimitedModel(model="gemini-2.0-flash"), ...)
+    """
+
+    # Model that makes the calls; Gemini with the same model name when omitted.
+    backend: Optional[BaseLlm] = None
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.backend is None:
+            self.backend = Gemini(model=self.model)
+        limiter = get_rate_limiter(self.model)
+        max_retries, base_delay, max_delay = get_retry_policy()
+        attempt = 0
+        while True:
+            waited_from = time.monotonic()
+            acquired_limit = await limiter.acquire()
+            metrics.observe("lead_enrichment_limiter_wait_seconds", time.monotonic() - waited_from, model=self.model)
+            throttled = False
+            answered = False
+            try:
+                async for response in self.backend.generate_content_async(llm_request, stream):
+                    answered = True
+                    yield response
+                return
+            except Exception as e:
+                status = error_status(e)
+                throttled = status in THROTTLE_STATUSES
+                if throttled:
+                    metrics.increment("lead_enrichment_model_throttled_total", model=self.model)
+                # A partially streamed answer cannot be retried transparently.
+                if answered or status not in RETRYABLE_STATUSES or attempt >= max_retries:
+                    raise
+                delay = backoff_delay(attempt, base_delay, max_delay, _retry_after(e))
+                metrics.increment("lead_enrichment_model_retries_total", model=self.model, status=str(status))
+                logger.warning(
+                    f"{self.model} call failed with {status}, retry {attempt + 1}/{max_retries} in {delay:.1f}s"
+                )
+            finally:
+                await limiter.release(acquired_limit, throttled)
+                if not math.isinf(limiter.concurrency_limit):
+                    metrics.set_gauge("lead_enrichment_model_concurrency_limit", limiter.concurrency_limit, model=self.model)
+            await asyncio.sleep(delay)
+            attempt += 1
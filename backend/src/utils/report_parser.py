@@ -0,0 +1,298 @@
+"""
+Deterministic parser from research reports to `DataEnrichment`.
+
+The company and person research agents are instructed to answer with fixed markdown
+bullets ("- **Employee Count:** 500"). This module reads those bullets, strips
+citations, and coerces numbers, years and lists, so the structuring LLM call is only
+needed when a report does not follow the format.
+
+For that LLM call, `compact_report` shrinks each report to what the `DataEnrichment`
+fields need: citations, headings and unmapped sections are dropped and each section
+is capped, so the structuring prompt no longer grows with the length of the reports.
+"""
+import ast
+import re
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from pydantic import ValidationError
+from src.schemas.lead import DataEnrichment
+
+
+# Share of expected labels that must be present in the reports to trust the parse.
+MIN_LABEL_COVERAGE = 0.8
+# Caps applied by `compact_report`.
+MAX_SECTION_ITEMS = 5
+MAX_SECTION_CHARS = 400
+MAX_REPORT_CHARS = 4000
+# Sections the research agents are asked for that map to no DataEnrichment field.
+UNMAPPED_LABELS = {"recent activities"}
+
+_MISSING = {"", "not found", "n/a", "na", "none", "unknown", "not available", "not disclosed", "-"}
+_BULLET = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+(.*)$")
+_LABELLED = re.compile(r"^\s*(?:[-*+]\s+)?\*\*(?P<label>[^*]+?)\*\*\s*:?\s*(?P<value>.*)$")
+_CITATION = re.compile(
+    r"\s*(?:\((?:source|sources|via|according to)\b[^)]*\)|\[(?:source|\d+)[^\]]*\]"
+    r"|[;|—-]?\s*\(?\b(?:source|sources)\s*:.*$)",
+    re.IGNORECASE,
+)
+_LINK = re.compile(r"\[([^\]]+)\]\((https?://[^)]+)\)")
+_NUMBER = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(k|m|mn|million|b|bn|billion|thousand)?\b", re.IGNORECASE)
+_MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "mn": 1e6, "million": 1e6, "b": 1e9, "bn": 1e9, "billion": 1e9}
+_NON_USD = re.compile(r"(€|£|¥|₹|\b(?:eur|gbp|aed|sar|inr|jpy|egp|chf|cad|aud)\b)", re.IGNORECASE)
+
+
+def _clean(value: str) -> Optional[str]:
+    """Strip citations, markdown and quotes; None for 'Not Found' style values."""
+    value = _LINK.sub(r"\1", value)
+    value = _CITATION.sub("", value)
+    value = value.replace("**", "").replace("`", "").strip().strip("'\"").strip().rstrip(".,;")
+    if value.lower() in _MISSING or value.lower().startswith("not found"):
+        return None
+    return value
+
+
+def _to_text(value: str, items: List[str]) -> Optional[str]:
+    if value:
+        return _clean(value)
+    cleaned = [item for item in (_clean(i) for i in items) if item]
+    return "; ".join(cleaned) or None
+
+
+def _to_list(value: str, items: List[str], separators: str = r"[;,]") -> List[str]:
+    """List from sub-bullets, an inline Python-style list, or separated inline values."""
+    if items:
+        return [item for item in (_clean(i) for i in items) if item]
+    value = _CITATION.sub("", value).strip()
+    if value.startswith("[") and value.endswith("]"):
+        try:
+            parsed = ast.literal_eval(value)
+            return [item for item in (_clean(str(v)) for v in parsed) if item]
+        except (ValueError, SyntaxError):
+            value = value[1:-1]
+    if _clean(value) is None:
+        return []
+    return [item for item in (_clean(part) for part in re.split(separators, value)) if item]
+
+
+def _to_sentences(value: str, items: List[str]) -> List[str]:
+    """Like `_to_list`, but inline entries are only split on ';' as they contain commas."""
+    return _to_list(value, items, separators=r";")
+
+
+def _to_number(text: str) -> Optional[float]:
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    number = float(match.group(1).replace(",", ""))
+    suffix = (match.group(2) or "").lower()
+    return number * _MULTIPLIERS.get(suffix, 1)
+
+
+def _to_int(value: str, items: List[str]) -> Optional[int]:
+    text = _to_text(value, items)
+    number = _to_number(text) if text else None
+    return int(number) if number is not None else None
+
+
+def _to_revenue(value: str, items: List[str]) -> Optional[float]:
+    text = _to_text(value, items)
+    if not text or _NON_USD.search(text):
+        return None  # DataEnrichment stores USD; other currencies are left empty
+    # Drop a trailing fiscal year ("$10M USD, 2024") so it is not read as the amount.
+    text = re.sub(r"[,(]\s*(?:fy\s*)?(19|20)\d{2}\)?\s*$", "", text, flags=re.IGNORECASE)
+    return _to_number(text)
+
+
+def _to_year(value: str, items: List[str]) -> Optional[int]:
+    text = _to_text(value, items)
+    for match in re.findall(r"\b(1[89]\d{2}|20\d{2})\b", text or ""):
+        if int(match) <= date.today().year:
+            return int(match)
+    return None
+
+
+def _to_url(value: str, items: List[str]) -> Optional[str]:
+    raw = _LINK.sub(r"\2", value)
+    match = re.search(r"https?://[^\s)\]>,]+", raw) or re.search(r"\b(?:www\.)?[a-z0-9-]+(?:\.[a-z0-9-]+)+\b", raw, re.IGNORECASE)
+    if not match:
+        return None
+    url = match.group(0).rstrip("./")
+    return url if url.startswith("http") else f"https://{url}"
+
+
+_Coercer = Callable[[str, List[str]], Any]
+
+# Report label (lowercase, without parenthesised notes) -> (DataEnrichment field, coercer).
+COMPANY_LABELS: Dict[str, Tuple[str, _Coercer]] = {
+    "company name": ("company_name", _to_text),
+    "official website url": ("company_website", _to_url),
+    "industry/sector": ("company_industry", _to_text),
+    "employee count": ("company_employee_count", _to_int),
+    "revenue": ("company_annual_revenue", _to_revenue),
+    "hq location": ("company_headquarters", _to_text),
+    "year founded": ("company_founded_year", _to_year),
+    "major technologies & tools": ("company_technologies", _to_list),
+    "funding stage / total funding": ("company_funding_details", _to_text),
+    "hiring trends": ("company_hiring_trends", _to_sentences),
+    "recent news": ("company_recent_news", _to_sentences),
+}
+PERSON_LABELS: Dict[str, Tuple[str, _Coercer]] = {
+    "full name": ("person_full_name", _to_text),
+    "job title": ("person_job_title", _to_text),
+    "seniority level": ("person_seniority_level", _to_text),
+    "department": ("person_department", _to_text),
+    "professional location": ("person_location", _to_text),
+    "work history": ("person_work_history", _to_sentences),
+    "key skills": ("person_skills", _to_list),
+}
+
+
+def _normalize_label(label: str) -> str:
+    label = re.sub(r"\([^)]*\)", "", label)
+    return " ".join(label.strip().rstrip(":").lower().split())
+
+
+def _labelled_values(report: str) -> Dict[str, Tuple[str, List[str]]]:
+    """Map each bold label of a report to its inline value and its sub-bullet items."""
+    values: Dict[str, Tuple[str, List[str]]] = {}
+    current: Optional[str] = None
+    for line in report.splitlines():
+        labelled = _LABELLED.match(line)
+        if labelled:
+            current = _normalize_label(labelled.group("label"))
+            values[current] = (labelled.group("value").strip(), [])
+            continue
+        if line.lstrip().startswith("#"):
+            current = None
+            continue
+        bullet = _BULLET.match(line)
+        if current is not None and bullet:
+            values[current][1].append(bullet.group(1).strip())
+    return values
+
+
+def _parse(report: str, labels: Dict[str, Tuple[str, _Coercer]]) -> Dict[str, Any]:
+    found = _labelled_values(report or "")
+    fields: Dict[str, Any] = {}
+    for label, (field, coerce) in labels.items():
+        if label in found:
+            fields[field] = coerce(*found[label])
+    return fields
+
+
+def company_report_fields(report: str) -> Dict[str, Any]:
+    """Fields labelled in a company report (None for 'Not Found' values)."""
+    return _parse(report, COMPANY_LABELS)
+
+
+def person_report_fields(report: str) -> Dict[str, Any]:
+    """Fields labelled in a person report (None for 'Not Found' values)."""
+    return _parse(report, PERSON_LABELS)
+
+
+def parse_reports(
+    company_report: str,
+    person_report: str,
+    company_name: str = "",
+    person_name: str = "",
+    expected_fields: Optional[Iterable[str]] = None,
+) -> Tuple[Optional[DataEnrichment], float]:
+    """
+    Parse the company and person reports into `DataEnrichment`.
+
+    Args:
+        company_report: Markdown output of the company research agent.
+        person_report: Markdown output of the person research agent.
+        company_name: Fallback when the report has no company name.
+        person_name: Fallback when the report has no full name.
+        expected_fields: Fields the reports are expected to cover (all fields by
+            default; a refresh only researches some of them).
+
+    Returns:
+        The parsed model (None if it fails validation) and the share of expected
+        labels found in the reports.
+    """
+    fields = {**_parse(company_report, COMPANY_LABELS), **_parse(person_report, PERSON_LABELS)}
+    expected: Set[str] = set(expected_fields) if expected_fields is not None else set(DataEnrichment.model_fields)
+    expected &= {field for field, _ in (*COMPANY_LABELS.values(), *PERSON_LABELS.values())}
+    coverage = sum(1 for field in expected if field in fields) / len(expected) if expected else 1.0
+    fields["company_name"] = fields.get("company_name") or company_name
+    fields["person_full_name"] = fields.get("person_full_name") or person_name
+    fields = {key: value for key, value in fields.items() if value is not None}
+    try:
+        return DataEnrichment(**fields), coverage
+    except ValidationError:
+        return None, coverage
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count of a text (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0].rstrip(",;:") + " ..."
+
+
+def compact_report(
+    report: str,
+    labels: Dict[str, Tuple[str, _Coercer]],
+    max_section_items: int = MAX_SECTION_ITEMS,
+    max_section_chars: int = MAX_SECTION_CHARS,
+    max_chars: int = MAX_REPORT_CHARS,
+) -> str:
+    """
+    Shrink a research report to the content the structuring agent needs.
+
+    Sections that map to a `DataEnrichment` field are rewritten as "- <field>: <value>"
+    without citations, with at most `max_section_items` sub-bullets and
+    `max_section_chars` characters. Sections in `UNMAPPED_LABELS`, 'Not Found' values
+    and headings are dropped. Sections with other labels and unlabelled text (reports
+    that ignored the format, which is when the LLM is needed) are kept without
+    citations and links. The result is capped at `max_chars`.
+
+    Args:
+        report: Markdown output of a research agent.
+        labels: `COMPANY_LABELS` or `PERSON_LABELS`.
+        max_section_items: Sub-bullets kept per section.
+        max_section_chars: Characters kept per section.
+        max_chars: Characters kept in total.
+
+    Returns:
+        The compacted report.
+    """
+    sections: Dict[str, Tuple[str, List[str]]] = {}
+    free_text: List[str] = []
+    current: Optional[str] = None
+    for line in (report or "").splitlines():
+        labelled = _LABELLED.match(line)
+        if labelled:
+            current = labelled.group("label").strip().rstrip(":")
+            sections[current] = (labelled.group("value").strip(), [])
+            continue
+        if line.lstrip().startswith("#"):
+            current = None
+            continue
+        bullet = _BULLET.match(line)
+        if current is not None and bullet:
+            sections[current][1].append(bullet.group(1).strip())
+            continue
+        text = _CITATION.sub("", _LINK.sub(r"\1", line)).strip()
+        if text:
+            current = None
+            free_text.append(text)
+
+    lines = []
+    for label, (value, items) in sections.items():
+        normalized = _normalize_label(label)
+        if normalized in UNMAPPED_LABELS:
+            continue
+        cleaned = [item for item in (_clean(i) for i in items) if item][:max_section_items]
+        text = _clean(value) if value else "; ".join(cleaned)
+        if text:
+            name = labels[normalized][0] if normalized in labels else label
+            lines.append(f"- {name}: {_truncate(text, max_section_chars)}")
+    lines.extend(free_text)
+    return _truncate("\n".join(lines), max_chars)
@@ -0,0 +1,8 @@
+"""
+Shared test setup: run from `backend` with `python -m pytest -q`.
+"""
+import sys
+from pathlib import Path
+
+# Tests import `src` and `benchmarks` the way `python -m` does from `backend`.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
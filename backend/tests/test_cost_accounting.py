@@ -0,0 +1,41 @@
+"""
+Tests for the batch budget's run accounting.
+"""
+import asyncio
+
+from src.utils.cost_accounting import BatchBudget
+
+
+def test_shared_runs_do_not_lower_the_cost_of_runs_in_flight():
+    budget = BatchBudget(max_cost_usd=1.0)
+
+    async def scenario():
+        for usage in ({"cost_usd": 0.1}, {"shared_run": True}, {"shared_run": True}, {"shared_run": True}):
+            assert await budget.acquire()
+            budget.record(usage)
+        for _ in range(2):
+            assert await budget.acquire()
+
+    asyncio.run(scenario())
+    assert budget.in_flight_cost() == 2 * 0.1
+    assert budget.stats()["runs"] == 4
+    assert budget.stats()["shared_runs"] == 3
+    assert budget.stats()["cost_per_run_usd"] == 0.1
+
+
+def test_budget_stops_when_the_spend_and_runs_in_flight_reach_the_cap():
+    budget = BatchBudget(max_cost_usd=0.25)
+
+    async def scenario():
+        assert await budget.acquire()
+        budget.record({"cost_usd": 0.1})
+        assert await budget.acquire()
+        budget.record({"shared_run": True})
+        assert await budget.acquire()
+        assert await budget.acquire()
+        # 0.1 spent plus two runs in flight at 0.1 reach the cap (at 0.05, the average
+        # over the shared run too, they would not).
+        return await budget.acquire()
+
+    assert asyncio.run(scenario()) is False
+    assert budget.stopped
@@ -0,0 +1,109 @@
+"""
+Tests for the background enrichment job queue, with the in-memory job store.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.schemas.lead import EnrichedLead
+from src.utils.enrichment_jobs import EnrichmentJobQueue, InMemoryJobStore, QueueFullError, _new_job
+
+LEAD = EnrichedLead(lead_id=1, company_name="Tabby", person_name="Hosam Arab")
+
+
+async def enrich(lead: EnrichedLead) -> dict:
+    return {"enrichment_status": "Success", "company_name": lead.company_name}
+
+
+async def finished(jobs: EnrichmentJobQueue, job_id: str) -> dict:
+    async for job in jobs.watch(job_id, poll_interval=0.01):
+        pass
+    return job
+
+
+def test_submitted_job_runs_and_succeeds():
+    async def scenario():
+        store = InMemoryJobStore()
+        jobs = EnrichmentJobQueue(enrich, store, owner="api-1")
+        await jobs.start()
+        try:
+            job = await jobs.submit(LEAD)
+            assert job["status"] == "queued"
+            return await asyncio.wait_for(finished(jobs, job["id"]), 5)
+        finally:
+            await jobs.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"enrichment_status": "Success", "company_name": "Tabby"}
+    assert job["owner"] == "api-1"
+
+
+def test_failed_enrichment_marks_the_job_failed():
+    async def failing(lead: EnrichedLead) -> dict:
+        raise RuntimeError("model unavailable")
+
+    async def scenario():
+        jobs = EnrichmentJobQueue(failing, InMemoryJobStore())
+        await jobs.start()
+        try:
+            job = await jobs.submit(LEAD)
+            return await asyncio.wait_for(finished(jobs, job["id"]), 5)
+        finally:
+            await jobs.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "failed"
+    assert job["error"] == "model unavailable"
+
+
+def test_submit_raises_queue_full_without_waiting():
+    async def scenario():
+        store = InMemoryJobStore()
+        # Not started: nothing takes the queued job.
+        jobs = EnrichmentJobQueue(enrich, store, max_queue_size=1)
+        await jobs.submit(LEAD)
+        with pytest.raises(QueueFullError):
+            await asyncio.wait_for(jobs.submit(LEAD), 1)
+        return store
+
+    store = asyncio.run(scenario())
+    # The rejected submission left no job behind.
+    assert [job["status"] for job in store.jobs.values()] == ["queued"]
+
+
+def test_jobs_of_a_stale_owner_are_taken_over():
+    store = InMemoryJobStore()
+    stale = (datetime.now(timezone.utc) - timedelta(minutes=10)).isoformat()
+    for status in ("queued", "running", "succeeded"):
+        job = _new_job(LEAD, status=status, owner="api-stopped")
+        job["heartbeat_at"] = stale
+        store.save(job)
+    # A live owner's job is left to it.
+    live = _new_job(LEAD, status="queued", owner="api-live")
+    store.save(live)
+
+    async def taken_over_jobs_succeeded() -> None:
+        while sum(job["owner"] == "api-new" and job["status"] == "succeeded" for job in store.jobs.values()) < 2:
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        jobs = EnrichmentJobQueue(enrich, store, max_queue_size=1, owner="api-new", heartbeat_seconds=0.05)
+        # Only as many jobs as there are free slots are taken over; the heartbeat
+        # takes over the other one once the workers free the slot.
+        assert await jobs.recover() == 1
+        assert await jobs.recover() == 0
+        await jobs.start()
+        try:
+            await asyncio.wait_for(taken_over_jobs_succeeded(), 5)
+        finally:
+            await jobs.stop()
+
+    asyncio.run(scenario())
+    by_owner = {}
+    for job in store.jobs.values():
+        by_owner.setdefault(job["owner"], []).append(job["status"])
+    assert sorted(by_owner["api-new"]) == ["succeeded", "succeeded"]
+    assert by_owner["api-stopped"] == ["succeeded"]
+    assert by_owner["api-live"] == ["queued"]
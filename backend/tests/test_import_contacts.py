@@ -0,0 +1,49 @@
+"""
+Tests for `/api/import-contacts`, with the in-memory Supabase client and job store.
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_supabase import FakeSupabaseClient
+from src.api.routes.contacts import router
+from src.utils.enrichment_jobs import EnrichmentJobQueue, InMemoryJobStore
+
+CSV = "firstName,lastName,email,contactNumber,city,country,company,interestedIn,inquiry\n" + "".join(
+    f"First{i},Last{i},lead{i}@company{i}.com,+971500000000,Dubai,UAE,Company {i},Payments,Demo\n" for i in range(3)
+)
+
+
+async def enrich(lead):
+    raise AssertionError("the import must not wait for the enrichment")
+
+
+def client(max_queue_size: int) -> TestClient:
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.state.supabase = FakeSupabaseClient()
+    # Not started: submitted jobs stay queued.
+    app.state.job_queue = EnrichmentJobQueue(enrich, InMemoryJobStore(), max_queue_size=max_queue_size)
+    return TestClient(app)
+
+
+def test_import_without_enrichment_returns_the_stats():
+    response = client(max_queue_size=10).post("/api/import-contacts?format=csv", content=CSV)
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 3
+    assert "enrichment" not in response.json()
+
+
+def test_import_with_enrichment_queues_jobs_and_returns_202():
+    test_client = client(max_queue_size=2)
+    response = test_client.post("/api/import-contacts?format=csv&enrich=true", content=CSV)
+    assert response.status_code == 202
+    summary = response.json()
+    assert summary["inserted"] == 3
+    assert len(summary["enrichment"]["job_ids"]) == 2
+    assert summary["enrichment"]["not_queued"] == 1
+    store = test_client.app.state.job_queue.store
+    jobs = [store.get(job_id) for job_id in summary["enrichment"]["job_ids"]]
+    assert [(job["lead_id"], job["person_name"], job["status"]) for job in jobs] == [
+        (1, "First0 Last0", "queued"),
+        (2, "First1 Last1", "queued"),
+    ]
@@ -0,0 +1,105 @@
+"""
+Tests for lead claims: `claimed_lead`, the lease queue's release, and claim-checked writes.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from benchmarks.fake_supabase import FakeSupabaseClient, seed_leads
+from src.utils.lead_queue import LeadClaimedError, LeadLeaseQueue, claimed_lead
+from src.utils.lead_writer import BufferedLeadWriter, update_lead_in_supabase
+
+RESULT = {"company_name": "Company 0", "person_full_name": "First0 Last0", "enrichment_status": "Success"}
+
+
+def leads(count: int = 2) -> FakeSupabaseClient:
+    supabase = FakeSupabaseClient()
+    seed_leads(supabase, count)
+    return supabase
+
+
+def lead(supabase: FakeSupabaseClient, lead_id: int) -> dict:
+    return next(row for row in supabase.tables["leads_table"].rows if row["id"] == lead_id)
+
+
+def test_unwritten_claim_is_released_as_pending():
+    supabase = leads()
+
+    async def scenario():
+        async with claimed_lead(supabase, 1) as worker_id:
+            assert worker_id is not None
+            assert lead(supabase, 1)["enrichment_status"] == "processing"
+
+    asyncio.run(scenario())
+    row = lead(supabase, 1)
+    assert row["enrichment_status"] == "pending"
+    assert row["claimed_by"] is None and row["status_before_claim"] is None
+
+
+def test_written_claim_is_not_released():
+    supabase = leads()
+
+    async def scenario():
+        async with claimed_lead(supabase, 1) as worker_id:
+            update_lead_in_supabase(supabase, 1, RESULT, claimed_by=worker_id)
+
+    asyncio.run(scenario())
+    row = lead(supabase, 1)
+    assert row["enrichment_status"] == "Success"
+    assert row["enrichment_flag"] is True
+    assert row["claimed_by"] is None
+
+
+def test_claimed_lead_yields_none_while_another_worker_holds_it():
+    supabase = leads()
+
+    async def scenario():
+        async with claimed_lead(supabase, 1) as first:
+            async with claimed_lead(supabase, 1) as second:
+                return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is not None and second is None
+    assert lead(supabase, 1)["enrichment_status"] == "pending"
+
+
+def test_released_claim_of_an_enriched_lead_keeps_its_status():
+    supabase = leads()
+    update_lead_in_supabase(supabase, 1, RESULT)
+    enriched = dict(lead(supabase, 1))
+
+    async def scenario():
+        async with claimed_lead(supabase, 1) as worker_id:
+            assert worker_id is not None
+
+    asyncio.run(scenario())
+    # Back to the enriched row, not to 'pending'.
+    assert lead(supabase, 1) == enriched
+
+
+def test_lost_lease_skips_the_write():
+    supabase = leads()
+
+    async def scenario():
+        async with LeadLeaseQueue(supabase, batch_size=1, worker_id="worker-a") as first:
+            await first.claim_ids([1, 2])
+            # The lease of lead 1 expires and another worker claims it.
+            lead(supabase, 1)["lease_expires_at"] = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+            async with LeadLeaseQueue(supabase, batch_size=1, worker_id="worker-b") as second:
+                assert [row["id"] for row in await second.claim_ids([1])] == [1]
+                async with BufferedLeadWriter(supabase, claimed_by="worker-a") as writer:
+                    await writer.add(1, RESULT)
+                    await writer.add(2, RESULT)
+                first.finish([1, 2])
+                with pytest.raises(LeadClaimedError):
+                    update_lead_in_supabase(supabase, 1, RESULT, claimed_by="worker-a")
+                second.finish([1])
+                return writer.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["written"] == 1 and stats["write_failed"] == 1
+    assert list(stats["write_errors"]) == [1]
+    row = lead(supabase, 1)
+    assert row["claimed_by"] == "worker-b" and row["enrichment_status"] == "processing"
+    assert lead(supabase, 2)["enrichment_status"] == "Success"
@@ -15,9 +15,28 @@ create table if not exists leads_table (
     created_date timestamptz default now(),
 
     -- Enrichment status and timestamps
-    enrichment_status text default 'pending',
+    enrichment_status text default 'pending',  -- pending, processing, Success, Error
+    enrichment_error text,
     enriched_at timestamptz,
     enrichment_flag boolean default false,
+    -- Model calls, tokens, search queries and estimated cost of the last enrichment
+    -- run (see src/utils/cost_accounting.py)
+    enrichment_usage jsonb,
+
+    -- Batch worker holding the lead while it is 'processing' (see src/utils/lead_queue.py),
+    -- and the status the lead gets back if the claim is released without a result
+    claimed_by text,
+    lease_expires_at timestamptz,
+    status_before_claim text,
+
+    -- Normalized email and "name|company" of the person (see src/utils/entity_index.py)
+    email_key text,
+    person_key text,
+
+    -- When each field group was last researched (see src/utils/lead_freshness.py)
+    company_profile_refreshed_at timestamptz,
+    company_news_refreshed_at timestamptz,
+    person_profile_refreshed_at timestamptz,
 
     -- Company fields
     company_name text ,
@@ -44,3 +63,309 @@ create table if not exists leads_table (
     person_skills text[] default '{}'
 );
 
+-- Tables created before error details were recorded.
+alter table leads_table add column if not exists enrichment_error text;
+
+-- Tables created before incremental refresh: add the freshness columns and treat every
+-- group of an enriched lead as refreshed when the lead was enriched.
+alter table leads_table add column if not exists company_profile_refreshed_at timestamptz;
+alter table leads_table add column if not exists company_news_refreshed_at timestamptz;
+alter table leads_table add column if not exists person_profile_refreshed_at timestamptz;
+
+update leads_table
+set company_profile_refreshed_at = enriched_at,
+    company_news_refreshed_at = enriched_at,
+    person_profile_refreshed_at = enriched_at
+where enrichment_status = 'Success'
+  and company_profile_refreshed_at is null
+  and company_news_refreshed_at is null
+  and person_profile_refreshed_at is null;
+
+-- Tables created before lease-based claiming.
+alter table leads_table add column if not exists claimed_by text;
+alter table leads_table add column if not exists lease_expires_at timestamptz;
+
+-- Tables created before released claims restored the previous status.
+alter table leads_table add column if not exists status_before_claim text;
+
+create index if not exists leads_table_unenriched_idx
+    on leads_table (id)
+    where enrichment_flag = false;
+
+-- Claims up to `batch_size` unenriched leads for `worker_id` (used by LeadLeaseQueue).
+-- Leads that are not being processed, or whose lease expired because their worker
+-- stopped renewing it, are marked 'processing' until now() + `lease_seconds`. Rows
+-- locked by a concurrent claim are skipped, so two workers never receive the same
+-- lead. `recovered` is true for leads taken over from an expired lease.
+create or replace function claim_leads(worker_id text, batch_size int, lease_seconds int)
+returns table (id bigint, company text, first_name text, last_name text, recovered boolean)
+language sql
+as $$
+    with claimable as (
+        select l.id, l.claimed_by is not null as recovered
+        from leads_table as l
+        where l.enrichment_flag = false
+          and (
+              l.enrichment_status is distinct from 'processing'
+              or l.lease_expires_at is null
+              or l.lease_expires_at < now()
+          )
+        order by l.id
+        limit batch_size
+        for update skip locked
+    )
+    update leads_table as l
+    set enrichment_status = 'processing',
+        -- A lease taken over from a crashed worker keeps the status from before its claim.
+        status_before_claim = case
+            when l.enrichment_status = 'processing' then l.status_before_claim
+            else l.enrichment_status
+        end,
+        claimed_by = worker_id,
+        lease_expires_at = now() + make_interval(secs => lease_seconds)
+    from claimable as c
+    where l.id = c.id
+    returning l.id, l.company, l.first_name, l.last_name, c.recovered;
+$$;
+
+-- Claims the given leads for `worker_id` whatever their enrichment state (used by the
+-- API and by imports that enrich their own leads), with the same lease as `claim_leads`.
+-- Leads leased to another worker, or locked by a concurrent claim, are left out.
+create or replace function claim_leads_by_id(worker_id text, lead_ids bigint[], lease_seconds int)
+returns table (id bigint, company text, first_name text, last_name text, recovered boolean)
+language sql
+as $$
+    with claimable as (
+        select l.id, l.claimed_by is not null as recovered
+        from leads_table as l
+        where l.id = any(lead_ids)
+          and (
+              l.enrichment_status is distinct from 'processing'
+              or l.lease_expires_at is null
+              or l.lease_expires_at < now()
+          )
+        for update skip locked
+    )
+    update leads_table as l
+    set enrichment_status = 'processing',
+        -- A lease taken over from a crashed worker keeps the status from before its claim.
+        status_before_claim = case
+            when l.enrichment_status = 'processing' then l.status_before_claim
+            else l.enrichment_status
+        end,
+        claimed_by = worker_id,
+        lease_expires_at = now() + make_interval(secs => lease_seconds)
+    from claimable as c
+    where l.id = c.id
+    returning l.id, l.company, l.first_name, l.last_name, c.recovered;
+$$;
+
+-- Extends the leases `worker_id` still holds on `lead_ids` and returns their ids.
+-- Leads missing from the result were finished or taken over after their lease expired.
+create or replace function renew_lead_leases(worker_id text, lead_ids bigint[], lease_seconds int)
+returns table (lead_id bigint)
+language sql
+as $$
+    update leads_table as l
+    set lease_expires_at = now() + make_interval(secs => lease_seconds)
+    where l.id = any(lead_ids)
+      and l.claimed_by = worker_id
+      and l.enrichment_status = 'processing'
+    returning l.id;
+$$;
+
+-- Hands the leads `worker_id` claimed but did not finish back to the queue (used when
+-- a worker stops), so other workers do not have to wait for the leases to expire.
+-- Leads get back the status they had before the claim, so an enriched lead whose
+-- re-enrichment was given up stays 'Success'.
+create or replace function release_leads(worker_id text, lead_ids bigint[])
+returns table (lead_id bigint)
+language sql
+as $$
+    update leads_table as l
+    set enrichment_status = coalesce(l.status_before_claim, 'pending'),
+        status_before_claim = null,
+        claimed_by = null,
+        lease_expires_at = null
+    where l.id = any(lead_ids)
+      and l.claimed_by = worker_id
+      and l.enrichment_status = 'processing'
+    returning l.id;
+$$;
+
+-- Tables created before the entity index; existing rows are indexed with
+-- `python -m src.utils.entity_index backfill`.
+alter table leads_table add column if not exists email_key text;
+alter table leads_table add column if not exists person_key text;
+
+create index if not exists leads_table_email_key_idx
+    on leads_table (email_key, enriched_at)
+    where enrichment_status = 'Success';
+
+create index if not exists leads_table_person_key_idx
+    on leads_table (person_key, enriched_at)
+    where enrichment_status = 'Success';
+
+-- For each of `lead_ids`, the most recently enriched other lead of the same person,
+-- enriched within the last `max_age_seconds`: a lead with the same email_key is
+-- preferred over one with the same person_key. The matched row is returned whole as
+-- `source`; leads without a match are left out.
+create or replace function match_enriched_leads(lead_ids bigint[], max_age_seconds int)
+returns table (lead_id bigint, matched_on text, source jsonb)
+language sql
+stable
+as $$
+    select l.id, m.matched_on, m.source
+    from leads_table as l
+    cross join lateral (
+        select
+            case when e.email_key = l.email_key then 'email' else 'name_company' end as matched_on,
+            to_jsonb(e) as source
+        from leads_table as e
+        where e.id <> l.id
+          and e.enrichment_status = 'Success'
+          and e.enriched_at >= now() - make_interval(secs => max_age_seconds)
+          and (e.email_key = l.email_key or e.person_key = l.person_key)
+        order by coalesce(e.email_key = l.email_key, false) desc, e.enriched_at desc
+        limit 1
+    ) as m
+    where l.id = any(lead_ids);
+$$;
+
+-- Tables created before usage accounting.
+alter table leads_table add column if not exists enrichment_usage jsonb;
+
+-- Applies a batch of enrichment results in one round trip (used by BufferedLeadWriter).
+-- `payload` is a JSON array of objects with an `id` plus the columns to set; columns
+-- missing from an object keep their current value. An object with `claimed_by_expected`
+-- is only applied while the lead is still claimed by that worker, so a worker that lost
+-- its lease does not overwrite the lead. Returns the ids that were updated.
+create or replace function bulk_update_leads(payload jsonb)
+returns table (lead_id bigint)
+language sql
+as $$
+    update leads_table as l
+    set (
+        enrichment_status,
+        enrichment_error,
+        enriched_at,
+        enrichment_flag,
+        enrichment_usage,
+        claimed_by,
+        lease_expires_at,
+        status_before_claim,
+        email_key,
+        person_key,
+        company_profile_refreshed_at,
+        company_news_refreshed_at,
+        person_profile_refreshed_at,
+        company_name,
+        company_website,
+        company_industry,
+        company_employee_count,
+        company_annual_revenue,
+        company_headquarters,
+        company_founded_year,
+        company_technologies,
+        company_funding_details,
+        company_hiring_trends,
+        company_recent_news,
+        person_full_name,
+        person_job_title,
+        person_seniority_level,
+        person_department,
+        person_location,
+        person_work_history,
+        person_skills
+    ) = (
+        select
+            r.enrichment_status,
+            r.enrichment_error,
+            r.enriched_at,
+            r.enrichment_flag,
+            r.enrichment_usage,
+            r.claimed_by,
+            r.lease_expires_at,
+            r.status_before_claim,
+            r.email_key,
+            r.person_key,
+            r.company_profile_refreshed_at,
+            r.company_news_refreshed_at,
+            r.person_profile_refreshed_at,
+            r.company_name,
+            r.company_website,
+            r.company_industry,
+            r.company_employee_count,
+            r.company_annual_revenue,
+            r.company_headquarters,
+            r.company_founded_year,
+            r.company_technologies,
+            r.company_funding_details,
+            r.company_hiring_trends,
+            r.company_recent_news,
+            r.person_full_name,
+            r.person_job_title,
+            r.person_seniority_level,
+            r.person_department,
+            r.person_location,
+            r.person_work_history,
+            r.person_skills
+        from jsonb_populate_record(l, e.value) as r
+    )
+    from jsonb_array_elements(payload) as e
+    where l.id = (e.value ->> 'id')::bigint
+      and (
+          not (e.value ? 'claimed_by_expected')
+          or l.claimed_by is not distinct from e.value ->> 'claimed_by_expected'
+      )
+    returning l.id;
+$$;
+
+-- Background enrichment jobs created by POST /api/enrich-lead.
+create table if not exists enrichment_jobs (
+    id uuid primary key,
+    lead_id bigint references leads_table (id) on delete cascade,
+    company_name text not null,
+    person_name text not null,
+    force_refresh boolean default false,
+    status text not null default 'queued',  -- queued, running, succeeded, failed
+    result jsonb,
+    error text,
+    owner text,
+    heartbeat_at timestamptz,
+    created_at timestamptz default now(),
+    updated_at timestamptz default now()
+);
+
+create index if not exists enrichment_jobs_unfinished_idx
+    on enrichment_jobs (created_at)
+    where status in ('queued', 'running');
+
+-- Process that runs the job and when it last showed it is alive (see src/utils/enrichment_jobs.py).
+alter table enrichment_jobs add column if not exists owner text;
+alter table enrichment_jobs add column if not exists heartbeat_at timestamptz;
+
+-- Hands up to `max_jobs` of the unfinished jobs whose owner stopped renewing their
+-- heartbeat for `stale_seconds` (or that never had one) to `new_owner`, oldest first,
+-- and returns them. Rows are locked with SKIP LOCKED, so concurrent processes never
+-- take over the same job.
+drop function if exists take_over_enrichment_jobs(text, double precision);
+create or replace function take_over_enrichment_jobs(new_owner text, stale_seconds double precision, max_jobs int)
+returns setof enrichment_jobs
+language sql
+as $$
+    with stale as (
+        select id
+        from enrichment_jobs
+        where status in ('queued', 'running')
+          and (heartbeat_at is null or heartbeat_at < now() - make_interval(secs => stale_seconds))
+        order by created_at
+        limit max_jobs
+        for update skip locked
+    )
+    update enrichment_jobs as j
+    set owner = new_owner, heartbeat_at = now()
+    from stale
+    where j.id = stale.id
+    returning j.*;
+$$;